@@ -0,0 +1,31 @@
+"""
+pytest-benchmark entry point for the engine position corpus
+
+Usage:
+    pytest benchmarks/bench_engine.py --benchmark-only
+    pytest benchmarks/bench_engine.py --benchmark-autosave --benchmark-compare
+"""
+
+import pytest
+
+from game.minimax import MiniMax
+from .engine import build_board, load_corpus
+
+POSITIONS = load_corpus()
+
+
+@pytest.mark.parametrize('position', POSITIONS, ids=[p['name'] for p in POSITIONS])
+def test_calculate_next_move(benchmark, position):
+    board, last_move = build_board(position)
+
+    def search():
+        solver = MiniMax(board)
+        return solver, solver.calculate_next_move(last_move)
+
+    solver, move = benchmark(search)
+
+    benchmark.extra_info['category'] = position['category']
+    benchmark.extra_info['nodes'] = solver.stats['nodes'] + solver.stats['quiescence_nodes']
+    benchmark.extra_info['depth'] = solver.stats['max_depth']
+    benchmark.extra_info['move'] = [int(move[0]), int(move[1])] if move else None
+    assert move is not None
@@ -0,0 +1,103 @@
+"""
+Board size benchmark
+Replays the engine corpus centred on each supported board size and compares
+time-to-move with the default 15x15 board, so larger rooms can be checked
+against the same per-move time budget
+
+Usage:
+    python -m benchmarks.board_size [--sizes 15 19] [--budget 1.25] [--repeat 3]
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from game.minimax import MiniMax
+from game.tables import board_tables
+from .engine import load_corpus
+
+
+def centred_board(position: Dict[str, Any], size: int) -> np.ndarray:
+    """Replay a corpus position with the same stones, shifted to the centre of a size x size board"""
+    shift_row = (size - settings.number_of_row) // 2
+    shift_col = (size - settings.number_of_col) // 2
+    board = np.zeros((size, size), dtype=int)
+    for index, (row, col) in enumerate(position['moves']):
+        board[row + shift_row, col + shift_col] = 1 if index % 2 == 0 else 2
+    return board
+
+
+def time_size(positions: List[Dict[str, Any]], size: int, repeat: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    board_tables.cache_clear()
+    board_tables(size, size)
+    tables_ms = (time.perf_counter() - started) * 1000.0
+
+    per_position = {}
+    for position in positions:
+        board = centred_board(position, size)
+        timings = []
+        for _ in range(repeat):
+            solver = MiniMax(board)
+            started = time.perf_counter()
+            solver.calculate_next_move(None)
+            timings.append(time.perf_counter() - started)
+        per_position[position['name']] = {
+            'time_ms': round(min(timings) * 1000.0, 3),
+            'nodes': solver.stats['nodes'],
+        }
+    times = [result['time_ms'] for result in per_position.values()]
+    return {
+        'tables_ms': round(tables_ms, 3),
+        'total_ms': round(sum(times), 3),
+        'max_ms': max(times),
+        'positions': per_position,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Compare engine time per move across board sizes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=settings.board_sizes)
+    parser.add_argument('--budget', type=float, default=1.25,
+                        help='Allowed total time relative to the default board size')
+    parser.add_argument('--repeat', type=int, default=3, help='Searches per position (fastest is kept)')
+    parser.add_argument('--category', help='Only positions of this category')
+    parser.add_argument('--output', help='Write the JSON result to this file')
+    args = parser.parse_args(argv)
+
+    positions = load_corpus(category=args.category)
+    sizes = sorted(set(args.sizes) | {settings.number_of_row})
+    results = {size: time_size(positions, size, args.repeat) for size in sizes}
+
+    reference = results[settings.number_of_row]['total_ms']
+    failed = False
+    summary = {}
+    for size, result in results.items():
+        ratio = result['total_ms'] / reference if reference else 0.0
+        within = ratio <= args.budget
+        failed |= not within
+        summary[f'{size}x{size}'] = {
+            'total_ms': result['total_ms'],
+            'max_ms': result['max_ms'],
+            'tables_ms': result['tables_ms'],
+            'vs_default': round(ratio, 3),
+            'within_budget': within,
+        }
+        print(f'{size}x{size}: {result["total_ms"]:9.1f} ms total, {result["max_ms"]:7.1f} ms worst, '
+              f'{ratio:5.2f}x default, tables {result["tables_ms"]:.1f} ms'
+              f'{"" if within else "  OVER BUDGET"}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'budget': args.budget, 'sizes': summary,
+                       'positions': {size: result['positions'] for size, result in results.items()}}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+AI engine benchmark over a fixed position corpus
+Runs MiniMax.calculate_next_move on every position in positions.json, records
+time-to-move, nodes/sec (quiescence nodes included), depth reached and the
+chosen move, and compares the results against a stored baseline with
+regression thresholds
+
+Usage:
+    python -m benchmarks.engine                    # run and compare with baseline
+    python -m benchmarks.engine --save-baseline    # refresh benchmarks/baseline.json
+    python -m benchmarks.engine --category tactical --repeat 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from game.minimax import MiniMax
+
+BENCH_DIR = Path(__file__).resolve().parent
+CORPUS_PATH = BENCH_DIR / 'positions.json'
+BASELINE_PATH = BENCH_DIR / 'baseline.json'
+
+
+def load_corpus(path: Path = CORPUS_PATH, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Load benchmark positions, optionally restricted to one category"""
+    with open(path, 'r', encoding='utf-8') as f:
+        positions = json.load(f)
+    if category:
+        positions = [p for p in positions if p['category'] == category]
+    return positions
+
+
+def build_board(position: Dict[str, Any]) -> Tuple[np.ndarray, Optional[Tuple[int, int]]]:
+    """
+    Replay a position's move list on an empty board
+    Moves alternate starting with the human (1); the AI (2) is to move
+    """
+    board = np.zeros((settings.number_of_row, settings.number_of_col), dtype=int)
+    last_move = None
+    for index, (row, col) in enumerate(position['moves']):
+        board[row, col] = 1 if index % 2 == 0 else 2
+        last_move = (row, col)
+    return board, last_move
+
+
+def run_position(position: Dict[str, Any], repeat: int = 5) -> Dict[str, Any]:
+    """Search one position `repeat` times and keep the fastest timing"""
+    board, last_move = build_board(position)
+    timings = []
+    for _ in range(repeat):
+        solver = MiniMax(board)
+        started = time.perf_counter()
+        move = solver.calculate_next_move(last_move)
+        timings.append(time.perf_counter() - started)
+
+    elapsed = min(timings)
+    nodes = solver.stats['nodes'] + solver.stats['quiescence_nodes']
+    return {
+        'name': position['name'],
+        'category': position['category'],
+        'time_ms': round(elapsed * 1000.0, 3),
+        'nodes': nodes,
+        'quiescence_nodes': solver.stats['quiescence_nodes'],
+        'nodes_per_sec': round(nodes / elapsed, 1) if elapsed else 0.0,
+        'depth': solver.stats['max_depth'],
+        'move': [int(move[0]), int(move[1])] if move else None,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+            max_slowdown: float, max_node_growth: float,
+            min_delta_ms: float = 5.0) -> List[Dict[str, Any]]:
+    """
+    Compare results with a baseline
+    Timing regressions below `min_delta_ms` in absolute terms are ignored as noise
+    Returns one entry per position with its ratios and any regressions found
+    """
+    reference = {entry['name']: entry for entry in baseline.get('results', [])}
+    report = []
+    for result in results:
+        base = reference.get(result['name'])
+        entry = {'name': result['name'], 'regressions': []}
+        if base is None:
+            entry['note'] = 'not in baseline'
+            report.append(entry)
+            continue
+
+        if base['time_ms'] > 0:
+            entry['time_ratio'] = round(result['time_ms'] / base['time_ms'], 3)
+            slower_by = result['time_ms'] - base['time_ms']
+            if entry['time_ratio'] > max_slowdown and slower_by > min_delta_ms:
+                entry['regressions'].append('time')
+        if base['nodes'] > 0:
+            entry['node_ratio'] = round(result['nodes'] / base['nodes'], 3)
+            if entry['node_ratio'] > max_node_growth:
+                entry['regressions'].append('nodes')
+        if result['move'] != base['move']:
+            entry['move_changed'] = {'baseline': base['move'], 'current': result['move']}
+        report.append(entry)
+    return report
+
+
+def print_table(results: List[Dict[str, Any]], report: Optional[List[Dict[str, Any]]]) -> None:
+    comparison = {entry['name']: entry for entry in report or []}
+    header = f"{'position':<24}{'time ms':>10}{'nodes':>8}{'nodes/s':>11}{'depth':>6}  {'move':<9}{'vs base':>9}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        entry = comparison.get(result['name'], {})
+        ratio = f"{entry['time_ratio']:.2f}x" if 'time_ratio' in entry else '-'
+        flags = ' '.join(entry.get('regressions', []))
+        if 'move_changed' in entry:
+            flags = (flags + ' move').strip()
+        print(f"{result['name']:<24}{result['time_ms']:>10.2f}{result['nodes']:>8}"
+              f"{result['nodes_per_sec']:>11.0f}{result['depth']:>6}  {str(result['move']):<9}"
+              f"{ratio:>9} {flags}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Benchmark the Gomoku AI engine')
+    parser.add_argument('--corpus', type=Path, default=CORPUS_PATH)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--category', help='Only run positions of this category')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per position (fastest is kept)')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--max-slowdown', type=float, default=1.25,
+                        help='Fail when time-to-move grows by more than this factor')
+    parser.add_argument('--max-node-growth', type=float, default=1.10,
+                        help='Fail when node count grows by more than this factor')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='Ignore slowdowns smaller than this many milliseconds')
+    parser.add_argument('--output', type=Path, help='Write results JSON to this file')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    positions = load_corpus(args.corpus, args.category)
+    results = [run_position(position, args.repeat) for position in positions]
+
+    payload = {
+        'version': settings.version,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(payload, indent=2) + '\n', encoding='utf-8')
+        print_table(results, None)
+        print(f'\nBaseline written to {args.baseline}')
+        return 0
+
+    report = None
+    if args.baseline.exists():
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report = compare(results, baseline, args.max_slowdown, args.max_node_growth,
+                         args.min_delta_ms)
+        payload['comparison'] = report
+
+    print_table(results, report)
+    if args.output:
+        args.output.write_text(json.dumps(payload, indent=2) + '\n', encoding='utf-8')
+
+    regressions = [entry for entry in report or [] if entry['regressions']]
+    if regressions:
+        print(f'\n{len(regressions)} position(s) regressed beyond thresholds')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,774 @@
+"""
+Socket.IO load generator for the Gomoku server
+Simulates concurrent players speaking the real game protocol and reports
+move round-trip times, error rates and server CPU as JSON
+
+Usage:
+    python -m benchmarks.loadtest --clients 200 --single-ratio 0.5 --output results.json
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --server-pid 1234
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import socketio
+
+try:
+    import psutil
+except ImportError:  # CPU sampling is optional
+    psutil = None
+
+from config import settings
+from game.protocol import PROTOCOL_BINARY, PROTOCOL_JSON, decode
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+ROOM_EXISTS_ERROR = 'Cannot create, room exists'
+
+
+def parse_think_time(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a think-time sampler from a spec string
+    Supported: fixed:S, uniform:A,B, exp:MEAN, lognormal:MU,SIGMA (all in seconds)
+    """
+    kind, _, raw = spec.partition(':')
+    values = [float(v) for v in raw.split(',') if v] if raw else []
+
+    if kind == 'fixed':
+        delay = values[0] if values else 0.0
+        return lambda rng: delay
+    if kind == 'uniform' and len(values) == 2:
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == 'exp' and len(values) == 1:
+        mean = values[0]
+        return lambda rng: rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+    if kind == 'lognormal' and len(values) == 2:
+        mu, sigma = values
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise argparse.ArgumentTypeError(f'Invalid think-time spec: {spec}')
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Summarize latency samples (seconds) as milliseconds percentiles"""
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(samples),
+        'mean': round(float(values.mean()), 3),
+        'p50': round(float(p50), 3),
+        'p95': round(float(p95), 3),
+        'p99': round(float(p99), 3),
+        'max': round(float(values.max()), 3),
+    }
+
+
+class Stats:
+    """Shared counters collected by all simulated clients"""
+
+    def __init__(self) -> None:
+        self.rtt: Dict[str, List[float]] = {settings.game_type_single: [], settings.game_type_pvp: []}
+        self.requests = 0
+        self.errors: Counter = Counter()
+        self.games_completed: Counter = Counter()
+        self.id_collisions = 0
+        self.rooms_created = 0
+        self.single_rooms: List[int] = []
+        self.move_sent: Dict[Tuple[int, int], float] = {}   # (game ID, version) -> send time
+        self.spectator_lag: List[float] = []
+        self.spectator_updates = 0
+        self.spectators_joined = 0
+        self.resumes = 0
+        self.resume_rtt: List[float] = []
+        self.abuse_sent = 0
+        self.abuse_reconnects = 0
+        self.abuse_rejections: Counter = Counter()
+
+    def record_error(self, kind: str) -> None:
+        self.errors[kind] += 1
+
+
+class Board:
+    """Client-side view of the board used to pick plausible moves"""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.occupied: Set[Tuple[int, int]] = set()
+
+    def reset(self) -> None:
+        self.occupied.clear()
+
+    def play(self, move: List[int]) -> None:
+        if move:
+            self.occupied.add((int(move[0]), int(move[1])))
+
+    def pick_move(self) -> List[int]:
+        """Pick an empty cell, preferring cells close to existing stones"""
+        rows, cols = settings.number_of_row, settings.number_of_col
+        if self.occupied:
+            stones = list(self.occupied)
+            for _ in range(20):
+                row, col = self.rng.choice(stones)
+                row += self.rng.randint(-2, 2)
+                col += self.rng.randint(-2, 2)
+                if 0 <= row < rows and 0 <= col < cols and (row, col) not in self.occupied:
+                    return [row, col]
+        free = [(r, c) for r in range(rows) for c in range(cols) if (r, c) not in self.occupied]
+        row, col = self.rng.choice(free) if free else (rows // 2, cols // 2)
+        return [row, col]
+
+
+class Player:
+    """A single simulated Socket.IO client"""
+
+    def __init__(self, url: str, name: str, stats: Stats, rng: random.Random,
+                 think_time: Callable[[random.Random], float], timeout: float,
+                 protocol: str = PROTOCOL_JSON) -> None:
+        self.url = url
+        self.name = name
+        self.stats = stats
+        self.rng = rng
+        self.think_time = think_time
+        self.timeout = timeout
+        self.protocol = protocol
+        self.board = Board(rng)
+        self.session_token: Optional[str] = None
+        self.version = 0
+        self.events: Dict[str, asyncio.Queue] = {
+            event: asyncio.Queue()
+            for event in ('start_game', 'move', 'rematch', 'error', 'end_game',
+                          'protocol', 'sync', 'resume')
+        }
+        self.client = self._new_client()
+
+    def _new_client(self) -> socketio.AsyncClient:
+        client = socketio.AsyncClient(reconnection=False)
+        for event in self.events:
+            client.on(event, self._make_handler(event))
+        client.on('session', self._on_session)
+        return client
+
+    async def _on_session(self, data) -> None:
+        self.session_token = data['token']
+
+    def _make_handler(self, event: str):
+        async def handler(data=None):
+            received_at = time.perf_counter()
+            if isinstance(data, bytes):
+                data = decode(data)
+            self.events[event].put_nowait((received_at, data))
+        return handler
+
+    async def connect(self) -> None:
+        await self.client.connect(self.url, transports=['websocket'])
+        if self.protocol != PROTOCOL_JSON:
+            await self.emit('set_protocol', {'protocol': self.protocol})
+            event, _, data = await self.wait_for('protocol')
+            if event == 'error':
+                raise RuntimeError(f"Protocol negotiation failed: {data.get('error_msg')}")
+
+    async def drop_and_resume(self, blip: float) -> None:
+        """Simulate a network blip: drop the connection, reconnect and resume the session"""
+        await self.client.disconnect()
+        await asyncio.sleep(blip)
+        self.client = self._new_client()
+        await self.connect()
+        sent_at = await self.emit('resume_session', {
+            'token': self.session_token,
+            'version': self.version,
+        })
+        event, received_at, data = await self.wait_for('resume')
+        if event == 'error':
+            raise RuntimeError(f"Resume failed: {data.get('error_msg')}")
+        await self.wait_for('sync')
+        self.stats.resumes += 1
+        self.stats.resume_rtt.append(received_at - sent_at)
+
+    async def close(self) -> None:
+        if self.client.connected:
+            await self.client.disconnect()
+
+    async def emit(self, event: str, data: Dict[str, Any]) -> float:
+        self.stats.requests += 1
+        sent_at = time.perf_counter()
+        await self.client.emit(event, data)
+        return sent_at
+
+    async def wait_for(self, *event_names: str, errors_from: Tuple['Player', ...] = ()) -> Tuple[str, float, Any]:
+        """
+        Wait for the first of the given events (or an error) to arrive
+        Errors sent to the players in `errors_from` end the wait too, so a
+        refused request surfaces as its error instead of a timeout
+        """
+        names = set(event_names) | {'error'}
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            for name in names:
+                queue = self.events[name]
+                if not queue.empty():
+                    received_at, data = queue.get_nowait()
+                    return name, received_at, data
+            for other in errors_from:
+                if not other.events['error'].empty():
+                    received_at, data = other.events['error'].get_nowait()
+                    return 'error', received_at, data
+            if time.perf_counter() > deadline:
+                raise asyncio.TimeoutError(f'{self.name} timed out waiting for {sorted(names)}')
+            await asyncio.sleep(0.002)
+
+    async def think(self) -> None:
+        delay = self.think_time(self.rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def new_game_id(self) -> int:
+        return self.rng.randint(1, settings.max_number_of_room)
+
+
+async def create_room(player: Player, game_type: str, expect_start: bool) -> Optional[int]:
+    """Create a room, retrying with a new ID when the random ID collides"""
+    for _ in range(10):
+        game_id = player.new_game_id()
+        await player.emit('init_game', {
+            'gameID': game_id,
+            'gameType': game_type,
+            'playerName': player.name,
+        })
+        if not expect_start:
+            # PvP hosts get no reply until the guest joins; give errors a moment to arrive
+            await asyncio.sleep(0.05)
+            if player.events['error'].empty():
+                player.stats.rooms_created += 1
+                return game_id
+            _, data = player.events['error'].get_nowait()
+        else:
+            event, _, data = await player.wait_for('start_game')
+            if event == 'start_game':
+                player.stats.rooms_created += 1
+                player.stats.single_rooms.append(game_id)
+                return game_id
+        if data and data.get('error_msg') == ROOM_EXISTS_ERROR:
+            player.stats.id_collisions += 1
+            continue
+        player.stats.record_error(data.get('error_msg', 'unknown') if data else 'unknown')
+        return None
+    return None
+
+
+async def run_single_player(player: Player, games: int, stop_at: float,
+                            disconnect_rate: float = 0.0, blip: float = 0.1) -> None:
+    """
+    Play `games` games against the server AI
+    With `disconnect_rate` > 0 the connection drops after a move with that probability
+    and the bot resumes its session instead of recreating the room
+    """
+    await player.connect()
+    try:
+        game_id = await create_room(player, settings.game_type_single, expect_start=True)
+        if game_id is None:
+            return
+        for game_number in range(games):
+            player.board.reset()
+            game_over = False
+            while not game_over and time.perf_counter() < stop_at:
+                await player.think()
+                move = player.board.pick_move()
+                player.board.play(move)
+                sent_at = await player.emit('move', {'gameID': game_id, 'moveIndex': move})
+                player.stats.move_sent[(game_id, player.version + 1)] = sent_at
+                event, received_at, data = await player.wait_for('move')
+                if event == 'error':
+                    player.stats.record_error(data.get('error_msg', 'unknown'))
+                    return
+                player.stats.rtt[settings.game_type_single].append(received_at - sent_at)
+                for cell in data.get('cells', [data.get('move_index')]):
+                    player.board.play(cell)
+                player.version = data.get('version', player.version)
+                game_over = data.get('game_over', False)
+                if not game_over and player.rng.random() < disconnect_rate:
+                    await player.drop_and_resume(blip)
+
+            if not game_over:
+                return
+            player.stats.games_completed[settings.game_type_single] += 1
+            if game_number + 1 < games:
+                await player.emit('rematch', {'gameID': game_id, 'command': 'request'})
+                event, _, data = await player.wait_for('rematch')
+                if event == 'error':
+                    player.stats.record_error(data.get('error_msg', 'unknown'))
+                    return
+                player.version = data.get('version', player.version)
+    except asyncio.TimeoutError:
+        player.stats.record_error('timeout')
+    finally:
+        await player.close()
+
+
+async def run_pvp_pair(host: Player, guest: Player, games: int, stop_at: float) -> None:
+    """Play `games` games between two simulated clients in one PvP room"""
+    await host.connect()
+    await guest.connect()
+    try:
+        game_id = await create_room(host, settings.game_type_pvp, expect_start=False)
+        if game_id is None:
+            return
+        await guest.emit('join_current_game', {'gameID': game_id, 'playerName': guest.name})
+        for player in (host, guest):
+            event, _, data = await player.wait_for('start_game')
+            if event == 'error':
+                player.stats.record_error(data.get('error_msg', 'unknown'))
+                return
+
+        turn = 1
+        for game_number in range(games):
+            host.board.reset()
+            guest.board.reset()
+            game_over = False
+            while not game_over and time.perf_counter() < stop_at:
+                mover, waiter = (host, guest) if turn == 1 else (guest, host)
+                await mover.think()
+                move = mover.board.pick_move()
+                mover.board.play(move)
+                waiter.board.play(move)
+                sent_at = await mover.emit('move', {'gameID': game_id, 'moveIndex': move})
+                # A refused move is answered to the mover only
+                event, received_at, data = await waiter.wait_for('move', errors_from=(mover,))
+                if event == 'error':
+                    waiter.stats.record_error(data.get('error_msg', 'unknown'))
+                    return
+                host.stats.rtt[settings.game_type_pvp].append(received_at - sent_at)
+                game_over = data.get('game_over', False)
+                if game_over:
+                    # The mover also receives the final move broadcast to the room
+                    await mover.wait_for('move')
+                turn = 3 - turn
+
+            if not game_over:
+                return
+            host.stats.games_completed[settings.game_type_pvp] += 1
+            if game_number + 1 < games:
+                await host.emit('rematch', {'gameID': game_id, 'command': 'request'})
+                await guest.wait_for('rematch')
+                await guest.emit('rematch', {'gameID': game_id, 'command': 'accept'})
+                for player in (host, guest):
+                    event, _, data = await player.wait_for('rematch')
+                    if event == 'error':
+                        player.stats.record_error(data.get('error_msg', 'unknown'))
+                        return
+                turn = data.get('player_turn', 1)
+    except asyncio.TimeoutError:
+        host.stats.record_error('timeout')
+    finally:
+        await guest.close()
+        await host.close()
+
+
+async def run_viewer(url: str, index: int, stats: Stats, rooms: int, protocol: str,
+                     timeout: float, done: asyncio.Event, connect_limit: asyncio.Semaphore) -> None:
+    """
+    Watch a single-player room as a spectator until every player has finished
+    Update lag is measured from the moment the watched player sent the move
+    """
+    deadline = time.perf_counter() + timeout
+    while not stats.single_rooms:
+        if time.perf_counter() > deadline or done.is_set():
+            stats.record_error('spectator_no_room')
+            return
+        await asyncio.sleep(0.05)
+    game_id = stats.single_rooms[index % min(rooms, len(stats.single_rooms))]
+
+    updates: asyncio.Queue = asyncio.Queue()
+    client = socketio.AsyncClient(reconnection=False)
+
+    async def on_spectate(data):
+        updates.put_nowait((time.perf_counter(), decode(data) if isinstance(data, bytes) else data))
+
+    async def on_end_game(data=None):
+        updates.put_nowait((time.perf_counter(), None))
+
+    client.on('spectate', on_spectate)
+    client.on('end_game', on_end_game)
+    async with connect_limit:
+        await client.connect(url, transports=['websocket'])
+        if protocol != PROTOCOL_JSON:
+            await client.emit('set_protocol', {'protocol': protocol})
+        await client.emit('spectate', {'gameID': game_id})
+    stats.spectators_joined += 1
+
+    try:
+        while not done.is_set():
+            try:
+                received_at, data = await asyncio.wait_for(updates.get(), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            if data is None:
+                break
+            if data.get('type') != 'delta':
+                continue
+            stats.spectator_updates += 1
+            cells = data.get('cells', [])
+            first_version = data['version'] - len(cells) + 1
+            for offset in range(len(cells)):
+                sent_at = stats.move_sent.get((game_id, first_version + offset))
+                if sent_at is not None:
+                    stats.spectator_lag.append(received_at - sent_at)
+                    break
+    finally:
+        if client.connected:
+            await client.disconnect()
+
+
+async def run_abuser(url: str, index: int, stats: Stats, rng: random.Random,
+                     done: asyncio.Event) -> None:
+    """
+    Flood the server with moves, rematches and room creations without waiting for replies
+    until every well-behaved player has finished, reconnecting whenever the
+    server drops the connection; rejections are counted, not errors
+    """
+    async def on_error(data=None):
+        stats.abuse_rejections[(data or {}).get('error_msg', 'unknown')] += 1
+
+    sent = 0
+    while not done.is_set():
+        client = socketio.AsyncClient(reconnection=False)
+        client.on('error', on_error)
+        await client.connect(url, transports=['websocket'])
+        game_id = rng.randint(1, settings.max_number_of_room)
+        await client.emit('init_game', {'gameID': game_id, 'gameType': settings.game_type_single,
+                                        'playerName': f'abuser-{index}'})
+        try:
+            while client.connected and not done.is_set():
+                if sent % 50 == 25:
+                    await client.emit('init_game', {'gameID': rng.randint(1, settings.max_number_of_room),
+                                                    'gameType': settings.game_type_single,
+                                                    'playerName': f'abuser-{index}'})
+                elif sent % 10 == 0:
+                    await client.emit('rematch', {'gameID': game_id, 'command': 'request'})
+                else:
+                    move = [rng.randrange(settings.number_of_row), rng.randrange(settings.number_of_col)]
+                    await client.emit('move', {'gameID': game_id, 'moveIndex': move})
+                sent += 1
+                stats.abuse_sent += 1
+                await asyncio.sleep(0)
+        except socketio.exceptions.SocketIOError:
+            pass
+        finally:
+            if client.connected:
+                await client.disconnect()
+        stats.abuse_reconnects += 1
+
+
+def abuse_process(url: str, abusers: int, seed: float, stop, results) -> None:
+    """
+    Run the flooding clients in a child process so their send loops do not
+    slow down the players being measured; reports counters through `results`
+    """
+    async def flood() -> None:
+        stats = Stats()
+        done = asyncio.Event()
+        rng = random.Random(seed)
+        tasks = [asyncio.ensure_future(run_abuser(url, index, stats, random.Random(rng.random()), done))
+                 for index in range(abusers)]
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        results.put({
+            'sent': stats.abuse_sent,
+            'reconnects': stats.abuse_reconnects,
+            'rejections': dict(stats.abuse_rejections),
+        })
+        done.set()
+        await asyncio.wait(tasks, timeout=5)
+
+    asyncio.run(flood())
+
+
+class ServerProcess:
+    """Uvicorn server hosting main:socket_app, spawned or in-process"""
+
+    def __init__(self, host: str, port: int, in_process: bool) -> None:
+        self.host = host
+        self.port = port
+        self.in_process = in_process
+        self.process: Optional[subprocess.Popen] = None
+        self.server = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid if self.process else os.getpid()
+
+    def start(self) -> None:
+        if self.in_process:
+            import uvicorn
+            config = uvicorn.Config('main:socket_app', host=self.host, port=self.port,
+                                    log_level='warning')
+            self.server = uvicorn.Server(config)
+            self.thread = threading.Thread(target=self.server.run, daemon=True)
+            self.thread.start()
+        else:
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'uvicorn', 'main:socket_app',
+                 '--host', self.host, '--port', str(self.port), '--log-level', 'warning'],
+                cwd=str(ROOT_DIR),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.should_exit = True
+            self.thread.join(timeout=10)
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    """Poll the health endpoint until the server answers"""
+    import aiohttp
+
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() < deadline:
+            try:
+                async with session.get(f'{url}/health') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'Server at {url} did not become ready')
+
+
+def cpu_snapshot(pid: Optional[int]) -> Optional[Tuple[float, float]]:
+    if psutil is None or pid is None:
+        return None
+    times = psutil.Process(pid).cpu_times()
+    return times.user, times.system
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    think_time = parse_think_time(args.think_time)
+    stats = Stats()
+
+    server = None
+    url = args.url
+    pid = args.server_pid
+    if url is None:
+        server = ServerProcess('127.0.0.1', args.port or find_free_port(), args.in_process)
+        server.start()
+        url = server.url
+        pid = server.pid
+    try:
+        await wait_until_ready(url)
+
+        single_clients = round(args.clients * args.single_ratio)
+        pvp_pairs = (args.clients - single_clients) // 2
+        stop_at = time.perf_counter() + args.duration
+
+        def make_player(name: str) -> Player:
+            return Player(url, name, stats, random.Random(rng.random()), think_time, args.timeout,
+                          args.protocol)
+
+        tasks = []
+        total_sessions = single_clients + pvp_pairs
+        for index in range(total_sessions):
+            if args.ramp_up and total_sessions > 1:
+                delay = args.ramp_up * index / (total_sessions - 1)
+            else:
+                delay = 0.0
+            if index < single_clients:
+                coro = run_single_player(make_player(f'bot-{index}'), args.games, stop_at,
+                                         args.disconnect_rate, args.blip)
+            else:
+                coro = run_pvp_pair(make_player(f'host-{index}'), make_player(f'guest-{index}'),
+                                    args.games, stop_at)
+            tasks.append(asyncio.ensure_future(_delayed(coro, delay)))
+
+        done = asyncio.Event()
+        connect_limit = asyncio.Semaphore(100)
+        viewers = [
+            asyncio.ensure_future(run_viewer(url, index, stats, args.spectate_rooms, args.protocol,
+                                             args.timeout, done, connect_limit))
+            for index in range(args.spectators)
+        ]
+
+        abuser = None
+        if args.abusers:
+            abuse_stop, abuse_results = multiprocessing.Event(), multiprocessing.Queue()
+            abuser = multiprocessing.Process(target=abuse_process, daemon=True,
+                                             args=(url, args.abusers, rng.random(), abuse_stop, abuse_results))
+            abuser.start()
+
+        cpu_before = cpu_snapshot(pid)
+        started = time.perf_counter()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        cpu_after = cpu_snapshot(pid)
+        done.set()
+        results += await asyncio.gather(*viewers, return_exceptions=True)
+        if abuser is not None:
+            abuse_stop.set()
+            abuse = await asyncio.get_running_loop().run_in_executor(None, abuse_results.get, True, 30)
+            stats.abuse_sent = abuse['sent']
+            stats.abuse_reconnects = abuse['reconnects']
+            stats.abuse_rejections.update(abuse['rejections'])
+            abuser.join(timeout=10)
+            if abuser.is_alive():
+                abuser.terminate()
+    finally:
+        if server is not None:
+            server.stop()
+
+    for result in results:
+        if isinstance(result, Exception):
+            stats.record_error(type(result).__name__)
+
+    all_rtt = stats.rtt[settings.game_type_single] + stats.rtt[settings.game_type_pvp]
+    total_errors = sum(stats.errors.values())
+    server_cpu = None
+    if cpu_before and cpu_after:
+        user = cpu_after[0] - cpu_before[0]
+        system = cpu_after[1] - cpu_before[1]
+        server_cpu = {
+            'user_s': round(user, 3),
+            'system_s': round(system, 3),
+            'percent': round(100.0 * (user + system) / elapsed, 1) if elapsed else 0.0,
+            'scope': 'process' if server is not None and server.in_process else 'server',
+        }
+
+    return {
+        'tool': 'loadtest',
+        'version': settings.version,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'url': url,
+            'clients': args.clients,
+            'single_ratio': args.single_ratio,
+            'games_per_client': args.games,
+            'think_time': args.think_time,
+            'protocol': args.protocol,
+            'disconnect_rate': args.disconnect_rate,
+            'spectators': args.spectators,
+            'spectate_rooms': args.spectate_rooms,
+            'abusers': args.abusers,
+            'duration_limit_s': args.duration,
+            'ramp_up_s': args.ramp_up,
+            'seed': args.seed,
+        },
+        'duration_s': round(elapsed, 3),
+        'sessions': {'single': single_clients, 'pvp_pairs': pvp_pairs},
+        'games_completed': dict(stats.games_completed),
+        'moves': len(all_rtt),
+        'moves_per_s': round(len(all_rtt) / elapsed, 2) if elapsed else 0.0,
+        'rtt_ms': {
+            'all': summarize(all_rtt),
+            'single': summarize(stats.rtt[settings.game_type_single]),
+            'pvp': summarize(stats.rtt[settings.game_type_pvp]),
+        },
+        'errors': {
+            'total': total_errors,
+            'rate': round(total_errors / stats.requests, 5) if stats.requests else 0.0,
+            'by_type': dict(stats.errors),
+            'id_collisions': stats.id_collisions,
+        },
+        'churn': {
+            'rooms_created': stats.rooms_created,
+            'resumes': stats.resumes,
+            'resume_rtt_ms': summarize(stats.resume_rtt),
+        },
+        'spectators': {
+            'joined': stats.spectators_joined,
+            'updates': stats.spectator_updates,
+            'lag_ms': summarize(stats.spectator_lag),
+        },
+        'abuse': {
+            'sent': stats.abuse_sent,
+            'reconnects': stats.abuse_reconnects,
+            'rejections': dict(stats.abuse_rejections),
+        },
+        'server_cpu': server_cpu,
+    }
+
+
+async def _delayed(coro, delay: float):
+    if delay:
+        await asyncio.sleep(delay)
+    return await coro
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Socket.IO load test for the Gomoku server')
+    parser.add_argument('--url', help='Target an already running server instead of spawning one')
+    parser.add_argument('--server-pid', type=int, help='PID of the target server for CPU sampling')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Run the server inside this process instead of a subprocess')
+    parser.add_argument('--port', type=int, help='Port for the spawned server (default: random)')
+    parser.add_argument('--clients', type=int, default=20, help='Number of simulated clients')
+    parser.add_argument('--single-ratio', type=float, default=0.5,
+                        help='Fraction of clients playing against the AI (rest play PvP in pairs)')
+    parser.add_argument('--games', type=int, default=1, help='Games per client before leaving')
+    parser.add_argument('--protocol', choices=(PROTOCOL_JSON, PROTOCOL_BINARY), default=PROTOCOL_JSON,
+                        help='Wire protocol negotiated by every client')
+    parser.add_argument('--think-time', default='exp:0.2',
+                        help='Think-time distribution: fixed:S, uniform:A,B, exp:MEAN, lognormal:MU,SIGMA')
+    parser.add_argument('--disconnect-rate', type=float, default=0.0,
+                        help='Probability that a single-player bot drops its connection after a move')
+    parser.add_argument('--blip', type=float, default=0.1,
+                        help='Seconds a dropped bot stays offline before resuming')
+    parser.add_argument('--spectators', type=int, default=0,
+                        help='Number of read-only viewers watching single-player rooms')
+    parser.add_argument('--spectate-rooms', type=int, default=1,
+                        help='Spread viewers over the first N single-player rooms')
+    parser.add_argument('--abusers', type=int, default=0,
+                        help='Clients flooding moves and room creations without waiting for replies')
+    parser.add_argument('--duration', type=float, default=60.0, help='Stop starting new moves after N seconds')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='Spread client start over N seconds')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-reply timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write results JSON to this file')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    parse_think_time(args.think_time)
+    results = asyncio.run(run_load(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    print(output)
+    return 0 if results['errors']['total'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
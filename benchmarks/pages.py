@@ -0,0 +1,148 @@
+"""
+Page load benchmark
+Measures time to first byte of the index page and the bytes a browser
+downloads for it: a first visit fetches the page and every local asset it
+links, a repeat visit only revalidates assets that are not cacheable for good.
+Compressed bytes are counted as sent, with the encodings a browser accepts.
+
+Usage:
+    python -m benchmarks.pages [--requests 500] [--output pages.json]
+    python -m benchmarks.pages --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from .loadtest import ROOT_DIR, find_free_port
+from .startup import wait_for_ready
+
+ACCEPT_ENCODING = 'br, gzip, deflate'
+ASSET_PATTERN = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+# Requests the page's script makes on every load (skipped when the server does not answer them)
+PAGE_CALLS = ('/api/game-id',)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def measure_ttfb(session, url: str, requests: int) -> Dict[str, float]:
+    """Sequential GET / requests: time until the response headers arrive"""
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        async with session.get(f'{url}/') as response:
+            timings.append((time.perf_counter() - started) * 1000.0)
+            await response.read()
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+    }
+
+
+async def fetch(session, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    async with session.get(url, headers=headers) as response:
+        body = await response.read()
+        return {
+            'status': response.status,
+            'bytes': len(body),
+            'encoding': response.headers.get('Content-Encoding', 'identity'),
+            'etag': response.headers.get('ETag'),
+            'cache_control': response.headers.get('Cache-Control', ''),
+        }
+
+
+async def measure_visits(session, url: str) -> Dict[str, Any]:
+    headers = {'Accept-Encoding': ACCEPT_ENCODING}
+    async with session.get(f'{url}/', headers={'Accept-Encoding': 'identity'}) as response:
+        html = (await response.read()).decode()
+    assets = sorted(set(ASSET_PATTERN.findall(html)))
+    first = {path: await fetch(session, url + path, headers) for path in ['/'] + assets}
+    page = first.pop('/')
+    calls = {path: await fetch(session, url + path, headers) for path in PAGE_CALLS}
+    calls = {path: result for path, result in calls.items() if result['status'] == 200}
+    calls_bytes = sum(call['bytes'] for call in calls.values())
+
+    # Repeat visit: immutable assets come from the browser cache, the rest are revalidated
+    repeat_requests = len(calls)
+    repeat_bytes = calls_bytes
+    for path, result in [('/', page)] + list(first.items()):
+        if 'immutable' in result['cache_control']:
+            continue
+        revalidate = dict(headers, **({'If-None-Match': result['etag']} if result['etag'] else {}))
+        repeat_requests += 1
+        repeat_bytes += (await fetch(session, url + path, revalidate))['bytes']
+
+    return {
+        'page': page,
+        'assets': first,
+        'calls': calls,
+        'first_visit': {
+            'requests': 1 + len(assets) + len(calls),
+            'bytes': page['bytes'] + sum(a['bytes'] for a in first.values()) + calls_bytes,
+        },
+        'repeat_visit': {'requests': repeat_requests, 'bytes': repeat_bytes},
+    }
+
+
+async def run(url: str, requests: int) -> Dict[str, Any]:
+    import aiohttp
+
+    async with aiohttp.ClientSession(auto_decompress=False) as session:
+        await measure_ttfb(session, url, 20)    # warm up
+        return {
+            'ttfb': await measure_ttfb(session, url, requests),
+            **await measure_visits(session, url),
+        }
+
+
+async def run_spawned(requests: int, timeout: float) -> Dict[str, Any]:
+    port = find_free_port()
+    url = f'http://127.0.0.1:{port}'
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:socket_app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=str(ROOT_DIR), env=dict(os.environ, RECORDS_DIR=''),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_for_ready(url, process, timeout)
+        return await run(url, requests)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Measure index page TTFB and bytes per visit')
+    parser.add_argument('--url', help='Target an already running server instead of spawning one')
+    parser.add_argument('--requests', type=int, default=500, help='GET / requests timed for TTFB')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--output', help='Write the JSON result to this file')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        result = asyncio.run(run(args.url.rstrip('/'), args.requests))
+    else:
+        result = asyncio.run(run_spawned(args.requests, args.timeout))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
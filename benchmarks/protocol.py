@@ -0,0 +1,132 @@
+"""
+Wire protocol benchmark
+Replays a recorded game and measures encode CPU time and Socket.IO wire bytes
+per move for the legacy JSON path (recursive NumPy conversion), the native JSON
+path and the compact binary delta protocol, plus full-board vs sparse snapshots
+
+Usage:
+    python -m benchmarks.protocol [--position late-game-d] [--rounds 2000]
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from socketio import packet
+
+from config import settings
+from game.game import Game
+from game.protocol import encode_delta, encode_snapshot, snapshot_message
+from .engine import load_corpus
+
+
+def legacy_convert(obj):
+    """The recursive converter every emit used to go through"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, list):
+        return [legacy_convert(item) for item in obj]
+    elif isinstance(obj, tuple):
+        return tuple(legacy_convert(item) for item in obj)
+    elif isinstance(obj, dict):
+        return {key: legacy_convert(value) for key, value in obj.items()}
+    return obj
+
+
+def wire_size(event: str, data: Any) -> int:
+    """Bytes on the wire for one Socket.IO event (engine.io prefix included)"""
+    encoded = packet.Packet(packet.EVENT, data=[event, data]).encode()
+    if isinstance(encoded, list):
+        return sum(len(part) + 1 for part in encoded)
+    return len(encoded.encode('utf-8')) + 1
+
+
+def measure(encoders: Dict[str, Callable[[], Any]], rounds: int) -> Dict[str, Dict[str, float]]:
+    """Time payload construction plus Socket.IO packet encoding for each encoder"""
+    results = {}
+    for name, encode in encoders.items():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            packet.Packet(packet.EVENT, data=['move', encode()]).encode()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            'encode_us': round(elapsed / rounds * 1e6, 3),
+            'bytes': wire_size('move', encode()),
+        }
+    return results
+
+
+def replay(moves: List[List[int]], rounds: int) -> Dict[str, Any]:
+    game = Game(1, settings.game_type_pvp)
+    game.add_player('p1', 'p1')
+    game.add_player('p2', 'p2')
+
+    totals: Dict[str, Dict[str, float]] = {}
+    for index, (row, col) in enumerate(moves):
+        start_version = game.version
+        player_id = 'p1' if index % 2 == 0 else 'p2'
+        game.process_move(player_id, (row, col))
+        cells = game.moves_since(start_version)
+        # Moves used to come straight out of NumPy
+        numpy_move = (np.int64(row), np.int64(col))
+
+        per_move = measure({
+            'legacy_json': lambda: legacy_convert({
+                'status': 'success', 'game_over': game.game_over, 'your_turn': True,
+                'move_index': numpy_move,
+            }),
+            'json': lambda: {
+                'status': 'success', 'game_over': game.game_over, 'your_turn': True,
+                'move_index': (row, col), 'version': game.version,
+            },
+            'binary_delta': lambda: encode_delta(game.version, cells, game.game_over, True),
+        }, rounds)
+        for name, values in per_move.items():
+            total = totals.setdefault(name, {'encode_us': 0.0, 'bytes': 0})
+            total['encode_us'] += values['encode_us']
+            total['bytes'] += values['bytes']
+
+    count = len(moves)
+    per_move_avg = {
+        name: {'encode_us': round(total['encode_us'] / count, 3),
+               'bytes': round(total['bytes'] / count, 1)}
+        for name, total in totals.items()
+    }
+
+    snapshots = {
+        'legacy_full_board': wire_size('sync', legacy_convert({
+            'game_over': game.game_over, 'current_turn': game.current_turn,
+            'winning_line': game.winning_line, 'board': game.game_board,
+        })),
+        'json_snapshot': wire_size('sync', snapshot_message(game)),
+        'binary_snapshot': wire_size('sync', encode_snapshot(game)),
+    }
+    return {'moves': count, 'per_move': per_move_avg, 'snapshot_bytes': snapshots}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the game wire protocols')
+    parser.add_argument('--position', default='late-game-d', help='Corpus position to replay')
+    parser.add_argument('--rounds', type=int, default=2000, help='Encodes per move and protocol')
+    args = parser.parse_args(argv)
+
+    positions = {p['name']: p for p in load_corpus()}
+    result = replay(positions[args.position]['moves'], args.rounds)
+
+    legacy = result['per_move']['legacy_json']
+    for name, values in result['per_move'].items():
+        values['cpu_vs_legacy'] = round(values['encode_us'] / legacy['encode_us'], 3)
+        values['bytes_vs_legacy'] = round(values['bytes'] / legacy['bytes'], 3)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Game record store benchmark
+Measures the event-loop cost of RecordWriter.submit, writer throughput, and
+how fast RecordReader scans summaries, scans raw moves and decodes full records
+
+Usage:
+    python -m benchmarks.records [--games 1000000] [--directory /tmp/gomoku-records]
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from config import settings
+from game.game import Game
+from game.records import RecordReader, RecordWriter
+
+
+def sample_games(count: int, seed: int) -> List[Game]:
+    """Random finished-looking games of 10-60 moves"""
+    rng = random.Random(seed)
+    cells = [(row, col) for row in range(settings.number_of_row) for col in range(settings.number_of_col)]
+    games = []
+    for index in range(count):
+        game = Game(index + 1, settings.game_type_pvp)
+        game.add_player('p1', 'p1')
+        game.add_player('p2', 'p2')
+        for move in rng.sample(cells, rng.randint(10, 60)):
+            if game.game_over:
+                break
+            game.process_move(game.player_id[game.current_turn - 1], move)
+        games.append(game)
+    return games
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the game record store')
+    parser.add_argument('--games', type=int, default=1000000, help='Games to write')
+    parser.add_argument('--directory', help='Store directory (default: a temporary directory)')
+    parser.add_argument('--decode', type=int, default=100000, help='Full records to decode')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    directory = args.directory or tempfile.mkdtemp(prefix='gomoku-records-')
+    templates = sample_games(200, args.seed)
+    writer = RecordWriter(directory, settings.records_segment_bytes, args.games + 1)
+    writer.start()
+
+    started = time.perf_counter()
+    for index in range(args.games):
+        writer.submit(templates[index % len(templates)])
+    submitted = time.perf_counter() - started
+    writer.stop(timeout=None)
+    written = time.perf_counter() - started
+
+    reader = RecordReader(directory)
+    started = time.perf_counter()
+    summaries = reader.summaries()
+    wins = int((summaries['winner'] != 0).sum())
+    summarized = time.perf_counter() - started
+
+    started = time.perf_counter()
+    moves = sum(len(cells) for _, _, cells in reader.scan())
+    scanned = time.perf_counter() - started
+
+    started = time.perf_counter()
+    decoded = sum(1 for _, _ in zip(range(args.decode), reader.by_date()))
+    decode_s = time.perf_counter() - started
+
+    middle = int(reader.index['record_id'][len(reader) // 2])
+    started = time.perf_counter()
+    for _ in range(1000):
+        reader.get(middle)
+    lookup_us = (time.perf_counter() - started) / 1000 * 1e6
+
+    print(json.dumps({
+        'games': args.games,
+        'bytes': writer.stats['bytes'],
+        'bytes_per_game': round(writer.stats['bytes'] / args.games, 1) if args.games else 0,
+        'submit_us': round(submitted / args.games * 1e6, 3) if args.games else 0,
+        'write_games_per_s': round(args.games / written, 1) if written else None,
+        'summary_scan_games_per_s': round(len(summaries) / summarized, 1) if summarized else None,
+        'move_scan_games_per_s': round(len(summaries) / scanned, 1) if scanned else None,
+        'moves_scanned': moves,
+        'decisive_games': wins,
+        'decode_games_per_s': round(decoded / decode_s, 1) if decode_s else None,
+        'lookup_by_id_us': round(lookup_us, 3),
+    }, indent=2))
+    reader.close()
+    if not args.directory:
+        shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Proof-number solver benchmark over known forced wins
+Solves every position in puzzles.json, checks the result against the expected
+one and records nodes, time and the length of the line found. For won
+positions it also asks MiniMax for its move and checks whether that move
+keeps the win, to show what fixed-depth search misses.
+
+Usage:
+    python -m benchmarks.solver
+    python -m benchmarks.solver --category selfplay --max-nodes 50000 --output solver.json
+    python -m benchmarks.solver --engine lmr=0,extensions=0,quiet=0,sharp=0   # MiniMax options
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from game.arena import format_move, parse_engine, parse_move
+from game.minimax import MiniMax
+from game.solver import LOSS, UNKNOWN, WIN, replay, solve
+
+BENCH_DIR = Path(__file__).resolve().parent
+PUZZLES_PATH = BENCH_DIR / 'puzzles.json'
+VERDICTS = {True: 'ok', False: 'miss', None: '?'}
+
+
+def load_puzzles(path: Path = PUZZLES_PATH, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        puzzles = json.load(f)
+    if category:
+        puzzles = [p for p in puzzles if p['category'] == category]
+    return puzzles
+
+
+def minimax_keeps_win(board: np.ndarray, side: int, engine: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    MiniMax's move for `side` and whether the opponent is still lost after it
+    (None when the solver runs out of budget deciding)
+    """
+    started = time.perf_counter()
+    solver = MiniMax(board if side == 2 else np.where(board == 0, 0, 3 - board), **(engine or {}))
+    move = solver.calculate_next_move(None)
+    elapsed = time.perf_counter() - started
+    after = board.copy()
+    after[move] = side
+    outcome = solve(after, 3 - side)['result']
+    return {
+        'move': format_move(*move),
+        'time_ms': round(elapsed * 1000.0, 3),
+        'nodes': solver.stats['nodes'] + solver.stats['quiescence_nodes'],
+        'keeps_win': None if outcome == UNKNOWN else outcome == LOSS,
+    }
+
+
+def run_puzzle(puzzle: Dict[str, Any], max_nodes: int, engine: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    moves = [parse_move(move) for move in puzzle['moves'].split()]
+    board, side = replay(moves, settings.number_of_row, settings.number_of_col)
+    result = solve(board, side, max_nodes=max_nodes)
+    entry = {
+        'name': puzzle['name'],
+        'category': puzzle['category'],
+        'expected': puzzle['expected'],
+        'result': result['result'],
+        'solved': result['result'] == puzzle['expected'],
+        'nodes': result['nodes'],
+        'time_ms': result['time_ms'],
+        'nodes_per_s': result['nodes_per_s'],
+        'line': ' '.join(format_move(*move) for move in result['line']),
+    }
+    if result['result'] == WIN:
+        entry['minimax'] = minimax_keeps_win(board, side, engine)
+    return entry
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = f"{'puzzle':<18}{'expected':>14}{'result':>14}{'nodes':>9}{'time ms':>11}{'line':>6}  {'minimax':<10}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        minimax = result.get('minimax')
+        verdict = f"{minimax['move']} {VERDICTS[minimax['keeps_win']]}" if minimax else '-'
+        flag = '' if result['solved'] else '  FAILED'
+        print(f"{result['name']:<18}{result['expected']:>14}{result['result']:>14}{result['nodes']:>9}"
+              f"{result['time_ms']:>11.1f}{len(result['line'].split()):>6}  {verdict:<10}{flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the proof-number solver on known forced wins')
+    parser.add_argument('--puzzles', type=Path, default=PUZZLES_PATH)
+    parser.add_argument('--category', help='Only run puzzles of this category')
+    parser.add_argument('--max-nodes', type=int, default=settings.solver_max_nodes, help='Node budget per puzzle')
+    parser.add_argument('--engine', type=parse_engine, default={}, metavar='OPTIONS',
+                        help='MiniMax options for the move check, as in gomoku-arena (defaults from settings)')
+    parser.add_argument('--output', type=Path, help='Write results JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = [run_puzzle(puzzle, args.max_nodes, args.engine)
+               for puzzle in load_puzzles(args.puzzles, args.category)]
+    print_table(results)
+
+    failed = [result for result in results if not result['solved']]
+    total_ms = sum(result['time_ms'] for result in results)
+    print(f"\n{len(results) - len(failed)}/{len(results)} solved, "
+          f"{sum(result['nodes'] for result in results)} nodes in {total_ms / 1000.0:.2f}s")
+    checked = [result['minimax'] for result in results if 'minimax' in result]
+    if checked:
+        print(f"MiniMax kept {sum(1 for check in checked if check['keeps_win'])}/{len(checked)} wins, "
+              f"{sum(check['nodes'] for check in checked)} nodes in "
+              f"{sum(check['time_ms'] for check in checked) / 1000.0:.2f}s")
+    if args.output:
+        payload = {
+            'version': settings.version,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'max_nodes': args.max_nodes,
+            'results': results,
+        }
+        args.output.write_text(json.dumps(payload, indent=2) + '\n', encoding='utf-8')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Cold start benchmark
+Measures how long `import main` takes, how long a fresh server needs until
+/ready answers, and the latency of the first AI moves and the first analysis
+request on it, with and without the startup prewarm
+
+Usage:
+    python -m benchmarks.startup [--repeat 5] [--output startup.json]
+    python -m benchmarks.startup --importtime   # slowest imports of main
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import socketio
+
+from .loadtest import ROOT_DIR, find_free_port
+
+IMPORT_SNIPPET = 'import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)'
+
+
+def measure_import(repeat: int) -> Dict[str, float]:
+    """Wall time of `import main` in fresh interpreters (bytecode already cached)"""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET], cwd=str(ROOT_DIR),
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]) * 1000.0)
+    return {'median_ms': round(statistics.median(timings), 1), 'min_ms': round(min(timings), 1)}
+
+
+def slowest_imports(limit: int) -> List[Dict[str, Any]]:
+    """Top-level packages of `import main` ranked by cumulative import time"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=str(ROOT_DIR),
+                            capture_output=True, text=True, check=True).stderr
+    packages: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('   ') and not name.startswith('     '):   # direct imports of main only
+            packages[name.strip()] = int(cumulative)
+    ranked = sorted(packages.items(), key=lambda item: -item[1])[:limit]
+    return [{'module': name, 'cumulative_ms': round(us / 1000.0, 1)} for name, us in ranked]
+
+
+async def wait_for_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    import aiohttp
+
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f'server exited with code {process.returncode}')
+            try:
+                async with session.get(f'{url}/ready') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.01)
+    raise RuntimeError(f'server at {url} did not become ready')
+
+
+async def first_moves(url: str, moves: int, timeout: float) -> List[float]:
+    """Round trips of the first AI moves in a new single player game"""
+    client = socketio.AsyncClient()
+    events: asyncio.Queue = asyncio.Queue()
+    for event in ('start_game', 'move', 'error'):
+        client.on(event, lambda data=None, event=event: events.put_nowait((event, data)))
+
+    async def wait_for(name: str) -> Any:
+        while True:
+            event, data = await asyncio.wait_for(events.get(), timeout)
+            if event == 'error':
+                raise RuntimeError(data.get('error_msg'))
+            if event == name:
+                return data
+
+    await client.connect(url, transports=['websocket'])
+    try:
+        await client.emit('init_game', {'gameID': 1, 'gameType': 'single', 'playerName': 'startup'})
+        await wait_for('start_game')
+        timings = []
+        taken = set()
+        # Walk outwards from the centre, skipping cells the AI has taken
+        cells = iter(sorted(((row, col) for row in range(15) for col in range(15)),
+                            key=lambda cell: (abs(cell[0] - 7) + abs(cell[1] - 7), cell)))
+        for _ in range(moves):
+            move = next(cell for cell in cells if cell not in taken)
+            started = time.perf_counter()
+            await client.emit('move', {'gameID': 1, 'moveIndex': list(move)})
+            reply = await wait_for('move')
+            timings.append(round((time.perf_counter() - started) * 1000.0, 3))
+            if reply.get('game_over'):
+                break
+            taken.add(tuple(reply['move_index']))
+        return timings
+    finally:
+        await client.disconnect()
+
+
+async def first_analysis(url: str, timeout: float) -> float:
+    import aiohttp
+
+    board = [[0] * 15 for _ in range(15)]
+    board[7][7] = 1
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        started = time.perf_counter()
+        async with session.post(f'{url}/api/analyze', json={'board': board, 'side': 2}) as response:
+            response.raise_for_status()
+            await response.read()
+        return round((time.perf_counter() - started) * 1000.0, 3)
+
+
+async def measure_server(prewarm: bool, moves: int, timeout: float) -> Dict[str, Any]:
+    port = find_free_port()
+    url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, STARTUP_PREWARM=str(prewarm).lower(), RECORDS_DIR='')
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:socket_app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=str(ROOT_DIR), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_for_ready(url, process, timeout)
+        ready_ms = round((time.perf_counter() - started) * 1000.0, 1)
+        move_ms = await first_moves(url, moves, timeout)
+        analysis_ms = await first_analysis(url, timeout)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {
+        'ready_ms': ready_ms,
+        'first_move_ms': move_ms[0],
+        'later_moves_ms': round(statistics.median(move_ms[1:]), 3) if len(move_ms) > 1 else None,
+        'first_analysis_ms': analysis_ms,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    result: Dict[str, Any] = {'import': measure_import(args.repeat)}
+    for prewarm in (True, False):
+        runs = [await measure_server(prewarm, args.moves, args.timeout) for _ in range(args.repeat)]
+        result['prewarm' if prewarm else 'cold'] = {
+            key: statistics.median(run[key] for run in runs if run[key] is not None)
+            for key in runs[0] if any(run[key] is not None for run in runs)
+        }
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Measure import time, time to ready and first-move latency')
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh processes per measurement (median kept)')
+    parser.add_argument('--moves', type=int, default=4, help='Moves played in the first game')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--importtime', action='store_true', help='Only list the slowest imports of main')
+    parser.add_argument('--output', help='Write the JSON result to this file')
+    args = parser.parse_args(argv)
+
+    if args.importtime:
+        print(json.dumps(slowest_imports(15), indent=2))
+        return 0
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,11 +18,55 @@ class Settings(BaseSettings):
     # Game configuration
     number_of_row: int = 15
     number_of_col: int = 15
+    board_sizes: list = [15, 17, 19]      # sizes a room may be created with (square boards)
     game_type_single: str = 'single'
     game_type_pvp: str = 'pvp'
-    async_mode: str = 'eventlet'
+    async_mode: str = 'asgi'
     max_number_of_room: int = 100000
+    lobby_page_limit: int = 500           # most rooms /api/games returns per page
     ai_id: str = 'AI_0'
+    ai_search_depth: int = 2              # MiniMax search depth in plies, before quiescence
+    ai_beam_width: int = 5                # candidate moves searched per node
+    ai_beam_quiet: int = 3                # beam where neither side has a four or three to make, 0 = ai_beam_width
+    ai_beam_sharp: int = 8                # beam once either side can make a double threat, 0 = ai_beam_width
+    ai_lmr_after: int = 3                 # moves searched at full depth before quiet ones are reduced, 0 disables
+    ai_extension_limit: int = 1           # times a line is extended for moves making a double threat, 0 disables
+    quiescence_depth: int = 2             # plies of forcing moves searched past the depth, 0 disables
+    quiescence_max_nodes: int = 2000      # quiescence nodes per search before the horizon is scored statically
+    ai_workers: int = 2                   # threads running AI searches off the event loop
+    ai_max_searches: int = 16             # AI searches running or queued across all rooms
+    ai_max_searches_per_room: int = 1
+    ai_time_budget: float = 0.25          # seconds of AI search per second per connection, 0 disables
+    ai_time_burst: float = 2.0            # seconds of AI search a connection may use at once
+    engine_weights_file: Optional[str] = None  # tuned pattern weights (python -m game.tuning)
+    analysis_workers: int = 2             # processes serving /api/analyze
+    analysis_cache_size: int = 4096       # analysed positions kept (LRU)
+    analysis_max_depth: int = 4           # deepest search an API client may request
+    analysis_max_beam: int = 10           # widest beam an API client may request
+    heatmap_cache_size: int = 4096        # heatmaps of posted positions kept (LRU)
+    position_cache_entries: int = 1 << 19  # shared evaluation/search cache slots (24 bytes each), 0 disables
+    position_cache_file: Optional[str] = "data/position_cache.npy"  # saved on shutdown, loaded on startup
+    bulk_max_inflight: int = 64           # bulk positions read but not yet answered
+    solver_max_nodes: int = 200000        # proof-number search budget per position
+    solver_table_size: int = 200000       # proof table entries kept before the least searched are dropped
+    records_dir: Optional[str] = "data/records"  # finished-game log, None disables it
+    records_segment_bytes: int = 64 * 1024 * 1024
+    records_queue_size: int = 10000       # games waiting for the writer before new ones are dropped
+    reconnect_grace_period: float = 30.0  # seconds a room waits for a dropped player, 0 disables
+    spectator_tick_interval: float = 0.1  # seconds between coalesced spectator broadcasts
+    spectator_max_queue: int = 64         # queued packets before a viewer is treated as slow
+    spectator_drop_after: float = 10.0    # seconds a slow viewer may lag before being dropped
+    rate_limit_rate: float = 20.0         # Socket.IO events per second per connection, 0 disables
+    rate_limit_burst: float = 40.0
+    room_rate_limit_rate: float = 30.0    # events per second per room, shared by its players
+    room_rate_limit_burst: float = 60.0
+    hint_rate: float = 0.1                # move hints per second per room, 0 disables the limit
+    hint_burst: float = 3.0
+    hint_search_depth: int = 2            # budget of hints the last AI search cannot answer
+    hint_beam_width: int = 3
+    startup_prewarm: bool = True          # build engine tables and start worker pools before serving
+    admin_token: Optional[str] = None     # enables the /admin endpoints for requests carrying it
+    profile_max_seconds: float = 300.0    # longest profiling session, whatever its event limit
     
     # Server settings
     host: str = "0.0.0.0"
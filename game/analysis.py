@@ -0,0 +1,283 @@
+"""
+Position analysis for the HTTP API
+Searches run in a process pool so they never hold up the event loop that
+serves games. Positions are reduced to a canonical form (side to move playing
+as 2, smallest of the board's symmetries) before anything else, so
+identical or mirrored requests share one cache entry and concurrent duplicates
+are merged into a single search.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from config import settings
+from . import position_cache
+from .minimax import MiniMax, warm_up
+
+# Board symmetries: the 4 rotations, each optionally mirrored
+SYMMETRIES: Tuple[Callable[[np.ndarray], np.ndarray], ...] = tuple(
+    (lambda board, k=k, mirror=mirror: np.rot90(board.T if mirror else board, k))
+    for mirror in (False, True) for k in range(4)
+)
+
+
+class AnalysisRequest(BaseModel):
+    """Body of POST /api/analyze"""
+    board: List[List[int]]          # 0 empty, 1 and 2 for the players' stones
+    side: int = 2                   # player to move
+    depth: Optional[int] = None     # search depth, defaults to ai_search_depth
+    beam: Optional[int] = None      # candidate moves per node, defaults to ai_beam_width
+
+
+class HeatmapRequest(BaseModel):
+    """Body of POST /api/heatmap"""
+    board: List[List[int]]
+
+
+def validate_position(board: List[List[int]], side: int) -> np.ndarray:
+    """Check the request describes a playable position; raises ValueError"""
+    if side not in (1, 2):
+        raise ValueError('side must be 1 or 2')
+    try:
+        array = np.array(board, dtype=np.int64)
+    except (TypeError, ValueError):
+        raise ValueError('board must be a rectangular list of rows')
+    if array.ndim != 2 or array.shape[0] != array.shape[1] or array.shape[0] not in settings.board_sizes:
+        raise ValueError(f"board must be square with a side of {', '.join(map(str, settings.board_sizes))}")
+    if not np.isin(array, (0, 1, 2)).all():
+        raise ValueError('board cells must be 0, 1 or 2')
+    if not (array == 0).any():
+        raise ValueError('board is full')
+    return array
+
+
+def canonicalize(board: np.ndarray, side: int) -> Tuple[np.ndarray, np.ndarray, str]:
+    """
+    Reduce a position to its canonical form
+    :return: canonical board (side to move = 2), the flat index map from canonical
+             to original cells, and the position hash
+    """
+    if side == 1:
+        board = np.where(board == 0, 0, 3 - board)
+    indexes = np.arange(board.size).reshape(board.shape)
+
+    best = None
+    for transform in SYMMETRIES:
+        candidate = transform(board)
+        if candidate.shape != board.shape:
+            continue    # quarter turns only apply to square boards
+        data = np.ascontiguousarray(candidate, dtype=np.int8).tobytes()
+        if best is None or data < best[0]:
+            best = (data, candidate, transform(indexes))
+
+    data, canonical, index_map = best
+    digest = hashlib.blake2b(data, digest_size=16, person=bytes(board.shape)).hexdigest()
+    return np.ascontiguousarray(canonical), index_map, digest
+
+
+def search_position(board: np.ndarray, depth: int, beam: int) -> Dict[str, Any]:
+    """Worker entry point: search a canonical position for player 2"""
+    solver = MiniMax(board, limit_depth=depth, beam_width=beam)
+    started = time.perf_counter()
+    move = solver.calculate_next_move(None)
+    elapsed = time.perf_counter() - started
+    return {
+        'move': (int(move[0]), int(move[1])) if move else None,
+        'score': float(solver.last_score),
+        'pv': solver.principal_variation(move) if move else [],
+        'stats': dict(solver.stats, time_ms=round(elapsed * 1000.0, 3)),
+    }
+
+
+class AnalysisService:
+    """Process-pool searches with in-flight coalescing and an LRU result cache"""
+
+    def __init__(self, workers: int, cache_size: int, max_depth: int, max_beam: int):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.max_depth = max_depth
+        self.max_beam = max_beam
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.cache: 'OrderedDict[Tuple[str, int, int], Dict[str, Any]]' = OrderedDict()
+        self.inflight: Dict[Tuple[str, int, int], asyncio.Future] = {}
+        self.stats = {
+            'requests': 0,
+            'cache_hits': 0,
+            'coalesced': 0,
+            'searches': 0,
+            'errors': 0,
+            'bulk_positions': 0,
+        }
+
+    def start(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use, attached to this process's position cache if any"""
+        if self.pool is None:
+            if position_cache.shared is not None:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=position_cache.attach,
+                    initargs=(position_cache.shared.name, multiprocessing.Lock()),
+                )
+            else:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    async def warm_up(self, sizes: List[int]) -> float:
+        """
+        Start every worker process and prepare its engine tables ahead of the
+        first request
+        :return: seconds taken
+        """
+        loop = asyncio.get_running_loop()
+        pool = self.start()
+        started = time.perf_counter()
+        # One task per worker: the pool spawns a process for each queued task
+        await asyncio.gather(*(loop.run_in_executor(pool, warm_up, sizes) for _ in range(self.workers)))
+        return time.perf_counter() - started
+
+    def shutdown(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def analyze(self, request: AnalysisRequest) -> Dict[str, Any]:
+        """Analyse a position; raises ValueError for invalid requests"""
+        board = validate_position(request.board, request.side)
+        depth = min(request.depth or settings.ai_search_depth, self.max_depth)
+        beam = min(request.beam or settings.ai_beam_width, self.max_beam)
+        if depth < 1 or beam < 1:
+            raise ValueError('depth and beam must be positive')
+
+        self.stats['requests'] += 1
+        canonical, index_map, digest = canonicalize(board, request.side)
+        key = (digest, depth, beam)
+
+        result = self.cache.get(key)
+        source = 'cache'
+        if result is not None:
+            self.cache.move_to_end(key)
+            self.stats['cache_hits'] += 1
+        else:
+            pending = self.inflight.get(key)
+            if pending is None:
+                source = 'search'
+                pending = asyncio.ensure_future(self._search(key, canonical, depth, beam))
+                self.inflight[key] = pending
+            else:
+                source = 'coalesced'
+                self.stats['coalesced'] += 1
+            # Shielded so a client going away does not cancel a search others wait on
+            result = await asyncio.shield(pending)
+
+        cols = board.shape[1]
+
+        def restore(move):
+            return list(divmod(int(index_map[move[0], move[1]]), cols))
+
+        return {
+            'position': digest,
+            'side': request.side,
+            'depth': depth,
+            'beam': beam,
+            'best_move': restore(result['move']) if result['move'] else None,
+            'score': result['score'],
+            'pv': [restore(move) for move in result['pv']],
+            'stats': result['stats'],
+            'source': source,
+        }
+
+    async def _search(self, key: Tuple[str, int, int], board: np.ndarray,
+                      depth: int, beam: int) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        try:
+            self.stats['searches'] += 1
+            result = await loop.run_in_executor(self.start(), search_position, board, depth, beam)
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            self.inflight.pop(key, None)
+
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    async def analyze_stream(self, requests: AsyncIterator[AnalysisRequest],
+                             max_inflight: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyse a stream of positions, yielding results as they complete
+        At most `max_inflight` positions are read but not yet yielded, so a slow
+        reader or a huge upload cannot grow memory: intake pauses until results
+        are consumed. Results carry the input `index`; invalid positions yield
+        an `error` instead of ending the stream. The last item is a summary.
+        """
+        slots = asyncio.Semaphore(max_inflight)
+        results: asyncio.Queue = asyncio.Queue()
+        submitted = 0
+        intake_done = False
+        running: Set[asyncio.Future] = set()   # referenced so they are not collected mid-run
+        started = time.perf_counter()
+
+        async def run(index: int, request) -> None:
+            try:
+                if isinstance(request, Exception):
+                    raise request
+                result = await self.analyze(request)
+            except ValueError as e:
+                result = {'error': str(e)}
+            except Exception as e:
+                result = {'error': f'analysis failed: {e}'}
+            result['index'] = index
+            await results.put(result)
+
+        async def intake() -> None:
+            nonlocal submitted, intake_done
+            try:
+                async for request in requests:
+                    await slots.acquire()
+                    task = asyncio.ensure_future(run(submitted, request))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                    submitted += 1
+            finally:
+                intake_done = True
+                await results.put(None)     # wake the consumer to re-check completion
+
+        reader = asyncio.ensure_future(intake())
+        completed = errors = 0
+        try:
+            while not (intake_done and completed == submitted):
+                result = await results.get()
+                if result is None:
+                    continue
+                completed += 1
+                errors += 'error' in result
+                slots.release()
+                yield result
+            await reader     # surface errors from reading the input
+        finally:
+            # The consumer went away (or the input failed): stop work nobody will read
+            reader.cancel()
+            for task in list(running):
+                task.cancel()
+
+        elapsed = time.perf_counter() - started
+        self.stats['bulk_positions'] += completed
+        yield {
+            'done': True,
+            'count': completed,
+            'errors': errors,
+            'elapsed_s': round(elapsed, 3),
+            'positions_per_s': round(completed / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, cached=len(self.cache), inflight=len(self.inflight))
@@ -0,0 +1,250 @@
+"""
+Headless self-play arena
+Plays AI-vs-AI games on game.Game across a process pool and reports win/draw
+rates with Wilson confidence intervals, time per move and compact game records
+
+Every randomised opening is played twice with colours swapped, so neither
+engine profits from a lucky first move.
+
+Usage:
+    gomoku-arena --games 200 --engine-a depth=3,beam=5 --engine-b depth=2,beam=8
+    gomoku-arena --games 200 --engine-a depth=2,quiescence=4 --engine-b depth=3,quiescence=0
+    python -m game.arena --games 20 --workers 4 --records games.jsonl
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from .game import Game
+from .minimax import MiniMax
+
+ENGINE_OPTIONS = {
+    'depth': 'limit_depth',
+    'beam': 'beam_width',
+    'quiescence': 'quiescence_depth',
+    'quiet': 'quiet_beam',
+    'sharp': 'sharp_beam',
+    'lmr': 'lmr_after',
+    'extensions': 'extension_limit',
+}
+# Options that may be switched off with 0
+ZERO_OPTIONS = {'quiescence', 'quiet', 'sharp', 'lmr', 'extensions'}
+COLUMNS = 'abcdefghijklmnopqrstuvwxyz'
+SIDES = ('A', 'B')
+
+
+def parse_engine(spec: str) -> Dict[str, int]:
+    """
+    Parse engine options such as "depth=3,beam=5" into MiniMax keyword arguments
+    Options left out fall back to the settings
+    """
+    options = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        key, _, value = item.partition('=')
+        if key not in ENGINE_OPTIONS or not value.isdigit() or int(value) < (key not in ZERO_OPTIONS):
+            raise argparse.ArgumentTypeError(
+                f"Invalid engine option '{item}' (expected {', '.join(ENGINE_OPTIONS)}=<positive int>, "
+                f"{', '.join(sorted(ZERO_OPTIONS))} may be 0 to disable)")
+        options[ENGINE_OPTIONS[key]] = int(value)
+    return options
+
+
+def random_opening(rng: random.Random, plies: int, radius: int) -> List[Tuple[int, int]]:
+    """Random distinct stones within `radius` of the centre, black first"""
+    center_row, center_col = settings.number_of_row // 2, settings.number_of_col // 2
+    cells = [(row, col)
+             for row in range(max(0, center_row - radius), min(settings.number_of_row, center_row + radius + 1))
+             for col in range(max(0, center_col - radius), min(settings.number_of_col, center_col + radius + 1))]
+    return rng.sample(cells, min(plies, len(cells)))
+
+
+def format_move(row: int, col: int) -> str:
+    """Board notation: column letter followed by the 1-based row"""
+    return f'{COLUMNS[col]}{row + 1}'
+
+
+def parse_move(text: str) -> Tuple[int, int]:
+    """Inverse of format_move"""
+    return int(text[1:]) - 1, COLUMNS.index(text[0])
+
+
+def wilson_interval(successes: float, trials: int, z: float = 1.96) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion"""
+    if trials == 0:
+        return 0.0, 0.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def play_game(index: int, black: str, engines: Dict[str, Dict[str, int]],
+              opening: List[Tuple[int, int]], max_moves: int) -> Dict[str, Any]:
+    """
+    Play one game between engines 'A' and 'B'
+    MiniMax always searches for player 2, so the board is colour-swapped when
+    the engine to move holds player 1's stones
+    """
+    white = 'B' if black == 'A' else 'A'
+    game = Game(index, settings.game_type_pvp)
+    game.add_player(black, black)
+    game.add_player(white, white)
+
+    for move in opening:
+        game.process_move(game.player_id[game.current_turn - 1], move)
+
+    think = {side: 0.0 for side in SIDES}
+    moves = {side: 0 for side in SIDES}
+    nodes = {side: 0 for side in SIDES}
+    while not game.game_over and game.number_of_moves < max_moves:
+        side = game.player_id[game.current_turn - 1]
+        board = game.game_board
+        if game.current_turn == 1:
+            board = np.where(board == 0, 0, 3 - board)
+
+        solver = MiniMax(board, **engines[side])
+        started = time.perf_counter()
+        move = solver.calculate_next_move(None)
+        think[side] += time.perf_counter() - started
+        moves[side] += 1
+        nodes[side] += solver.stats['nodes'] + solver.stats['quiescence_nodes']
+        if move is None or not game.process_move(side, move):
+            break
+
+    winner = game.get_winner()
+    return {
+        'game': index,
+        'black': black,
+        'winner': game.player_id[winner - 1] if winner else None,
+        'opening': len(opening),
+        'moves': ' '.join(format_move(row, col) for row, col, _ in game.move_log),
+        'think': think,
+        'searches': moves,
+        'nodes': nodes,
+    }
+
+
+def summarize(games: List[Dict[str, Any]], engines: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    """Aggregate results from A's point of view"""
+    total = len(games)
+    wins = {side: sum(1 for g in games if g['winner'] == side) for side in SIDES}
+    draws = total - wins['A'] - wins['B']
+    score = wins['A'] + draws / 2
+
+    def rate(count: float) -> Dict[str, float]:
+        low, high = wilson_interval(count, total)
+        return {'rate': round(count / total, 4) if total else 0.0,
+                'ci95': [round(low, 4), round(high, 4)]}
+
+    per_side = {}
+    for side in SIDES:
+        searches = sum(g['searches'][side] for g in games)
+        think = sum(g['think'][side] for g in games)
+        nodes = sum(g['nodes'][side] for g in games)
+        per_side[side] = {
+            'engine': engines[side],
+            'wins': wins[side],
+            'wins_as_black': sum(1 for g in games if g['winner'] == side and g['black'] == side),
+            'searches': searches,
+            'ms_per_move': round(think / searches * 1000.0, 3) if searches else 0.0,
+            'nodes_per_sec': round(nodes / think, 1) if think else 0.0,
+        }
+
+    return {
+        'games': total,
+        'a_wins': rate(wins['A']),
+        'b_wins': rate(wins['B']),
+        'draws': rate(draws),
+        'a_score': rate(score),
+        'avg_game_length': round(sum(len(g['moves'].split()) for g in games) / total, 1) if total else 0.0,
+        'engines': per_side,
+    }
+
+
+def run_arena(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    engines = {'A': args.engine_a, 'B': args.engine_b}
+    max_moves = args.max_moves or settings.number_of_row * settings.number_of_col
+
+    schedule = []
+    for pair in range((args.games + 1) // 2):
+        opening = random_opening(rng, args.opening_plies, args.opening_radius)
+        schedule.append((2 * pair, 'A', opening))
+        schedule.append((2 * pair + 1, 'B', opening))
+    schedule = schedule[:args.games]
+
+    games = []
+    started = time.perf_counter()
+    records = open(args.records, 'w', encoding='utf-8') if args.records else None
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(play_game, index, black, engines, opening, max_moves)
+                       for index, black, opening in schedule]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                games.append(result)
+                if records:
+                    records.write(json.dumps({key: result[key] for key in
+                                              ('game', 'black', 'winner', 'opening', 'moves')}) + '\n')
+                if not args.quiet:
+                    print(f'\r{done}/{len(futures)} games', end='', file=sys.stderr, flush=True)
+    finally:
+        if records:
+            records.close()
+        if not args.quiet:
+            print(file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    summary = summarize(games, engines)
+    summary.update({
+        'workers': args.workers,
+        'opening_plies': args.opening_plies,
+        'seed': args.seed,
+        'duration_s': round(elapsed, 3),
+        'games_per_s': round(len(games) / elapsed, 3) if elapsed else 0.0,
+    })
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Play headless AI-vs-AI Gomoku matches')
+    parser.add_argument('--games', type=int, default=100, help='Number of games to play')
+    parser.add_argument('--engine-a', type=parse_engine, default={}, metavar='OPTIONS',
+                        help='Engine A options, e.g. depth=3,beam=5 (defaults from settings)')
+    parser.add_argument('--engine-b', type=parse_engine, default={}, metavar='OPTIONS',
+                        help='Engine B options')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--opening-plies', type=int, default=4,
+                        help='Random stones placed before the engines take over')
+    parser.add_argument('--opening-radius', type=int, default=3,
+                        help='Opening stones are placed within this distance of the centre')
+    parser.add_argument('--max-moves', type=int, default=0,
+                        help='Adjudicate a draw after this many stones (0 = full board)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the random openings')
+    parser.add_argument('--records', help='Write one JSON game record per line to this file')
+    parser.add_argument('--output', help='Write the summary JSON to this file')
+    parser.add_argument('--quiet', action='store_true', help='Do not print progress')
+    args = parser.parse_args(argv)
+
+    summary = run_arena(args)
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Static asset build and cached pages
+`python -m game.assets` copies every file under static/ into static/dist/
+with a hash of its content in the name (style.3f2a9c1b04.css), next to
+gzip and brotli copies of the files that compress, and writes a manifest
+mapping original to hashed names. Templates link assets through
+`asset_url`, which falls back to the plain /static path when nothing has
+been built. A hashed file never changes, so it is served with immutable
+cache headers and the precompressed copy the client accepts.
+
+Rendered pages that only depend on a few parameters are kept in a PageCache,
+compressed once, and answered with 304 when the client already has them.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:     # optional: pip install -e .[assets]
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / 'static'
+DIST_DIR = STATIC_DIR / 'dist'
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ico', '.json', '.txt', '.html', '.map'}
+MIN_SAVING = 0.1            # keep a compressed copy only if it is at least 10% smaller
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Preferred first; each entry: (Content-Encoding, suffix of the precompressed file)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress(data: bytes) -> Dict[str, bytes]:
+    """The encodings worth sending for `data`, by Content-Encoding name"""
+    encoded = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(data, quality=11)
+    return {name: body for name, body in encoded.items() if len(body) <= len(data) * (1 - MIN_SAVING)}
+
+
+def accepted_encodings(headers: Headers) -> List[str]:
+    """Content codings the client accepts (q=0 excluded)"""
+    accepted = []
+    for item in headers.get('accept-encoding', '').split(','):
+        name, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.append(name.strip().lower())
+    return accepted
+
+
+def build(static_dir: Path = STATIC_DIR, dist_dir: Path = DIST_DIR) -> Dict[str, Dict[str, int]]:
+    """
+    Rebuild dist_dir from static_dir
+    :return: per asset, its size and the size of each compressed copy
+    """
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    dist_dir.mkdir(parents=True)
+
+    manifest = {}
+    sizes = {}
+    for source in sorted(static_dir.rglob('*')):
+        if not source.is_file() or dist_dir in source.parents:
+            continue
+        name = source.relative_to(static_dir).as_posix()
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        hashed = source.relative_to(static_dir).with_name(f'{source.stem}.{digest}{source.suffix}')
+        target = dist_dir / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+
+        encoded = compress(data) if source.suffix.lower() in COMPRESSIBLE else {}
+        for encoding, suffix in ENCODINGS:
+            if encoding in encoded:
+                target.with_name(target.name + suffix).write_bytes(encoded[encoding])
+        manifest[name] = hashed.as_posix()
+        sizes[name] = dict({'identity': len(data)}, **{encoding: len(body) for encoding, body in encoded.items()})
+
+    (dist_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+    return sizes
+
+
+def load_manifest(dist_dir: Path = DIST_DIR) -> Dict[str, str]:
+    try:
+        with open(dist_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+manifest = load_manifest()
+
+
+def asset_url(name: str) -> str:
+    """URL of a static asset: its hashed build when there is one, otherwise the source file"""
+    hashed = manifest.get(name)
+    return f'/static/dist/{hashed}' if hashed else f'/static/{name}'
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Serves the hashed build: the brotli or gzip copy when the client accepts
+    it, with immutable cache headers and an ETag taken from the content hash
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers)
+        media_type = mimetypes.guess_type(str(full_path))[0] or 'application/octet-stream'
+        path, encoding = str(full_path), None
+        for name, suffix in ENCODINGS:
+            if name in accepted and os.path.isfile(path + suffix):
+                path, encoding = path + suffix, name
+                break
+
+        response = FileResponse(path, status_code=status_code, media_type=media_type,
+                                stat_result=os.stat(path) if encoding else stat_result)
+        digest = Path(full_path).stem.rpartition('.')[2]
+        response.headers['etag'] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+        response.headers['cache-control'] = IMMUTABLE
+        response.headers['vary'] = 'Accept-Encoding'
+        if encoding:
+            response.headers['content-encoding'] = encoding
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class CachedPage:
+    """A rendered page with its compressed copies and ETag"""
+
+    def __init__(self, html: str):
+        self.body = html.encode('utf-8')
+        self.encoded = compress(self.body)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+
+
+class PageCache:
+    """
+    Rendered pages by key, rendered and compressed on first request
+    Pages stay cached for the life of the process: template changes need a restart
+    """
+
+    def __init__(self):
+        self.pages: Dict[Hashable, CachedPage] = {}
+        self.stats = {'hits': 0, 'renders': 0, 'not_modified': 0}
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> CachedPage:
+        page = self.pages.get(key)
+        if page is None:
+            self.stats['renders'] += 1
+            page = self.pages[key] = CachedPage(render())
+        else:
+            self.stats['hits'] += 1
+        return page
+
+    def response(self, page: CachedPage, request_headers: Headers) -> Response:
+        """The page in the best encoding the client accepts, or 304 when its copy is current"""
+        headers = {'ETag': page.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if page.etag in [tag.strip().removeprefix('W/') for tag in request_headers.get('if-none-match', '').split(',')]:
+            self.stats['not_modified'] += 1
+            return Response(status_code=304, headers=headers)
+        accepted = accepted_encodings(request_headers)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in page.encoded:
+                headers['Content-Encoding'] = encoding
+                return Response(page.encoded[encoding], media_type='text/html', headers=headers)
+        return Response(page.body, media_type='text/html', headers=headers)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Build hashed, precompressed static assets')
+    parser.add_argument('--static', type=Path, default=STATIC_DIR, help='Source directory')
+    parser.add_argument('--output', type=Path, default=DIST_DIR, help='Build directory (replaced)')
+    args = parser.parse_args(argv)
+
+    if brotli is None:
+        print('brotli is not installed, building gzip copies only (pip install -e .[assets])')
+    sizes = build(args.static, args.output)
+    for name, encoded in sizes.items():
+        variants = '  '.join(f'{encoding} {size}' for encoding, size in encoded.items())
+        print(f'{name:<28}{variants}')
+    print(f'{len(sizes)} assets written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
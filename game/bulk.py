@@ -0,0 +1,229 @@
+"""
+Bulk position analysis
+Parsers for the two upload formats of POST /api/analyze/bulk, and a CLI that
+streams a file of positions either to a running server or to a local worker
+pool, printing results as they finish and progress on stderr.
+
+Formats:
+    ndjson   one AnalysisRequest JSON object per line
+    binary   fixed records of 1 + rows * cols bytes (226 on the 15x15 board):
+             the side to move followed by the cells row by row (0, 1 or 2)
+    records  game records written by gomoku-arena; every position is analysed
+             (CLI only, sent to servers as NDJSON)
+
+Usage:
+    python -m game.bulk positions.ndjson --workers 8 --output results.ndjson
+    python -m game.bulk positions.bin --format binary --url http://localhost:8000
+    python -m game.bulk games.jsonl --format records --depth 2
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from config import settings
+from . import position_cache
+from .analysis import AnalysisRequest, AnalysisService
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+BINARY_CONTENT_TYPE = 'application/octet-stream'
+MAX_LINE_BYTES = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+Parsed = Union[AnalysisRequest, ValueError]
+
+
+def record_size() -> int:
+    return 1 + settings.number_of_row * settings.number_of_col
+
+
+def encode_record(board: np.ndarray, side: int) -> bytes:
+    """One binary bulk record"""
+    return bytes((side,)) + np.asarray(board, dtype=np.uint8).tobytes()
+
+
+def _request(data: Dict[str, Any], defaults: Dict[str, Optional[int]]) -> Parsed:
+    try:
+        fields = {key: value for key, value in defaults.items() if value}
+        fields.update(data)
+        return AnalysisRequest(**fields)
+    except (TypeError, ValueError) as e:
+        return ValueError(f'invalid position: {e}')
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes], depth: Optional[int] = None,
+                       beam: Optional[int] = None) -> AsyncIterator[Parsed]:
+    """Requests from NDJSON lines; malformed lines come through as ValueError items"""
+    defaults = {'depth': depth, 'beam': beam}
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f'line longer than {MAX_LINE_BYTES} bytes')
+        for line in lines:
+            if line.strip():
+                try:
+                    data = json.loads(line)
+                except ValueError as e:
+                    yield ValueError(f'invalid JSON: {e}')
+                    continue
+                yield _request(data if isinstance(data, dict) else {'board': data}, defaults)
+    if buffer.strip():
+        try:
+            yield _request(json.loads(buffer), defaults)
+        except ValueError as e:
+            yield ValueError(f'invalid JSON: {e}')
+
+
+async def parse_binary(chunks: AsyncIterator[bytes], depth: Optional[int] = None,
+                       beam: Optional[int] = None) -> AsyncIterator[Parsed]:
+    """Requests from fixed-size binary records"""
+    size = record_size()
+    shape = (settings.number_of_row, settings.number_of_col)
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        usable = len(buffer) - len(buffer) % size
+        records, buffer = bytes(buffer[:usable]), buffer[usable:]
+        for offset in range(0, usable, size):
+            board = np.frombuffer(records, dtype=np.uint8, count=size - 1, offset=offset + 1)
+            yield _request({'board': board.reshape(shape).tolist(), 'side': records[offset]},
+                           {'depth': depth, 'beam': beam})
+    if buffer:
+        yield ValueError(f'trailing {len(buffer)} bytes do not form a {size}-byte record')
+
+
+def parse_positions(chunks: AsyncIterator[bytes], content_type: str, depth: Optional[int] = None,
+                    beam: Optional[int] = None) -> AsyncIterator[Parsed]:
+    """Pick the parser for a request's content type (NDJSON unless binary)"""
+    if content_type.split(';')[0].strip() == BINARY_CONTENT_TYPE:
+        return parse_binary(chunks, depth, beam)
+    return parse_ndjson(chunks, depth, beam)
+
+
+def _records_to_ndjson(path: str, skip_plies: int) -> Iterator[bytes]:
+    """Every position of every recorded game, as NDJSON lines"""
+    from .arena import parse_move
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            board = np.zeros((settings.number_of_row, settings.number_of_col), dtype=int)
+            for ply, move in enumerate(record['moves'].split()):
+                side = 1 if ply % 2 == 0 else 2
+                if ply >= skip_plies:
+                    yield json.dumps({'board': board.tolist(), 'side': side}).encode() + b'\n'
+                board[parse_move(move)] = side
+
+
+async def _file_chunks(path: str, input_format: str, skip_plies: int) -> AsyncIterator[bytes]:
+    if input_format == 'records':
+        for line in _records_to_ndjson(path, skip_plies):
+            yield line
+            await asyncio.sleep(0)
+        return
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+            await asyncio.sleep(0)
+
+
+async def _local_results(args: argparse.Namespace) -> AsyncIterator[Dict[str, Any]]:
+    if settings.position_cache_entries > 0:
+        position_cache.create(settings.position_cache_entries)
+    service = AnalysisService(args.workers, settings.analysis_cache_size,
+                              max(args.depth or 0, settings.analysis_max_depth),
+                              max(args.beam or 0, settings.analysis_max_beam))
+    chunks = _file_chunks(args.input, args.format, args.skip_plies)
+    content_type = BINARY_CONTENT_TYPE if args.format == 'binary' else NDJSON_CONTENT_TYPE
+    try:
+        async for result in service.analyze_stream(parse_positions(chunks, content_type, args.depth, args.beam),
+                                                   args.max_inflight):
+            yield result
+    finally:
+        service.shutdown()
+        position_cache.release()
+
+
+async def _remote_results(args: argparse.Namespace) -> AsyncIterator[Dict[str, Any]]:
+    try:
+        import aiohttp
+    except ImportError:
+        raise SystemExit('--url needs aiohttp (pip install -e .[bench])')
+
+    params = {key: getattr(args, key) for key in ('depth', 'beam') if getattr(args, key)}
+    content_type = BINARY_CONTENT_TYPE if args.format == 'binary' else NDJSON_CONTENT_TYPE
+    url = args.url.rstrip('/') + '/api/analyze/bulk'
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=args.timeout)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.post(url, params=params, headers={'Content-Type': content_type},
+                                data=_file_chunks(args.input, args.format, args.skip_plies)) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if line.strip():
+                    yield json.loads(line)
+
+
+async def run(args: argparse.Namespace) -> int:
+    results = _remote_results(args) if args.url else _local_results(args)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    started = last_report = time.perf_counter()
+    count = errors = 0
+    summary: Dict[str, Any] = {}
+    try:
+        async for result in results:
+            if result.get('done'):
+                summary = result
+                continue
+            count += 1
+            errors += 'error' in result
+            output.write(json.dumps(result) + '\n')
+            now = time.perf_counter()
+            if not args.quiet and now - last_report >= 1.0:
+                last_report = now
+                print(f'\r{count} positions, {count / (now - started):.1f}/s, {errors} errors',
+                      end='', file=sys.stderr, flush=True)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    if not args.quiet:
+        print(f'\r{count} positions in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f}/s), '
+              f'{errors} errors', file=sys.stderr)
+    return 1 if not summary or summary.get('errors') else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Analyse a file of positions in bulk')
+    parser.add_argument('input', help='Positions file')
+    parser.add_argument('--format', choices=('ndjson', 'binary', 'records'), default='ndjson')
+    parser.add_argument('--url', help='Server to send the positions to (default: analyse locally)')
+    parser.add_argument('--workers', type=int, default=settings.analysis_workers,
+                        help='Worker processes for local analysis')
+    parser.add_argument('--depth', type=int, help='Search depth for positions that do not set one')
+    parser.add_argument('--beam', type=int, help='Beam width for positions that do not set one')
+    parser.add_argument('--max-inflight', type=int, default=settings.bulk_max_inflight,
+                        help='Positions read but not yet answered (bounds memory)')
+    parser.add_argument('--skip-plies', type=int, default=0,
+                        help='With --format records, skip positions before this ply')
+    parser.add_argument('--timeout', type=float, default=300.0, help='Seconds to wait for the next result')
+    parser.add_argument('--output', help='Write results here instead of stdout')
+    parser.add_argument('--quiet', action='store_true', help='Do not print progress')
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,9 +3,6 @@ from config import settings
 from typing import List, Tuple, Optional, Set
 import numpy as np
 
-NUMBER_OF_ROW = settings.number_of_row
-NUMBER_OF_COL = settings.number_of_col
-
 GAME_TYPE_SINGLE = settings.game_type_single
 GAME_TYPE_PVP = settings.game_type_pvp
 
@@ -15,19 +12,25 @@ class Game:
     Optimized for better performance and cleaner code
     """
 
-    def __init__(self, game_id: int, game_type: str):
+    def __init__(self, game_id: int, game_type: str,
+                 rows: int = settings.number_of_row, cols: int = settings.number_of_col):
         self.game_id = game_id      # Unique game ID of each game
         self.game_type = game_type  # game type: single or PvP(player vs player)
+        self.rows = rows            # board dimensions, chosen per game
+        self.cols = cols
         self.player_id: List[str] = []         # sid of player created by socket IO module 
         self.player_names: List[str] = []      # Contains all player's names
         self.player_index: dict = {}      # Player's order: 1 or 2
         self.current_turn = 1       # Decide player's turn (1 or 2)
         # Use numpy array for better performance
-        self.game_board = np.zeros((NUMBER_OF_ROW, NUMBER_OF_COL), dtype=int)
+        self.game_board = np.zeros((rows, cols), dtype=int)
         self.game_over = False     # decide whether game is ended
         self.winning_line: List[Tuple[int, int]] = []      # store the indexes forming a winning line
         self.number_of_moves = 0    # count the number of taken move 
         self.number_of_games = 1    # count the number of games
+        self.move_log: List[Tuple[int, int, int]] = []  # (row, col, player) of the current game
+        self.version = 0            # incremented on every state change, used for delta updates
+        self.base_version = 0       # version at the start of the current game
 
         # Pre-compute direction vectors for winning line detection
         self.directions = [
@@ -52,6 +55,12 @@ class Game:
         self.player_index[player_id] = len(self.player_id)
         self.player_names.append(player_name)
 
+    def replace_player(self, old_player_id: str, new_player_id: str) -> None:
+        """Move a player to a new connection ID, keeping its order and name"""
+        index = self.player_index.pop(old_player_id)
+        self.player_id[index - 1] = new_player_id
+        self.player_index[new_player_id] = index
+
     def get_opponent_id(self, player_id: str) -> str:
         """Get the opponent's ID for a given player"""
         index = self.player_index[player_id]
@@ -71,6 +80,9 @@ class Game:
         self.number_of_moves = 0
         self.number_of_games += 1
         self.game_board.fill(0)
+        self.move_log = []
+        self.version += 1
+        self.base_version = self.version
 
     def process_move(self, player_id: str, move_index: Tuple[int, int]) -> bool:
         """
@@ -87,14 +99,17 @@ class Game:
             player_index == self.current_turn and 
             self.is_valid_move(move_index) and not self.game_over):
             
-            row, col = move_index
+            # Store native ints so nothing downstream has to convert NumPy types
+            row, col = int(move_index[0]), int(move_index[1])
             move_value = player_index
             self.number_of_moves += 1
             self.game_board[row, col] = move_value
+            self.move_log.append((row, col, move_value))
+            self.version += 1
             
             if self.is_winning_move(row, col, move_value):
                 self.game_over = True
-            elif self.number_of_moves == NUMBER_OF_COL * NUMBER_OF_ROW:
+            elif self.number_of_moves == self.rows * self.cols:
                 # Game tie
                 self.game_over = True
             else:
@@ -109,8 +124,8 @@ class Game:
         Check if the move index is valid
         """
         row, col = move_index
-        return (0 <= row < NUMBER_OF_ROW and 
-                0 <= col < NUMBER_OF_COL and 
+        return (0 <= row < self.rows and 
+                0 <= col < self.cols and 
                 self.game_board[row, col] == 0)
 
     def is_winning_move(self, row: int, col: int, target: int) -> bool:
@@ -135,8 +150,8 @@ class Game:
         count = 0
         r, c = row + dr, col + dc
         
-        while (0 <= r < NUMBER_OF_ROW and 
-               0 <= c < NUMBER_OF_COL and 
+        while (0 <= r < self.rows and 
+               0 <= c < self.cols and 
                self.game_board[r, c] == target):
             count += 1
             r += dr
@@ -150,8 +165,8 @@ class Game:
         
         # Add cells in positive direction
         r, c = row + dr, col + dc
-        while (0 <= r < NUMBER_OF_ROW and 
-               0 <= c < NUMBER_OF_COL and 
+        while (0 <= r < self.rows and 
+               0 <= c < self.cols and 
                self.game_board[r, c] == target):
             winning_cells.append((r, c))
             r += dr
@@ -159,8 +174,8 @@ class Game:
         
         # Add cells in negative direction
         r, c = row - dr, col - dc
-        while (0 <= r < NUMBER_OF_ROW and 
-               0 <= c < NUMBER_OF_COL and 
+        while (0 <= r < self.rows and 
+               0 <= c < self.cols and 
                self.game_board[r, c] == target):
             winning_cells.append((r, c))
             r -= dr
@@ -172,12 +187,29 @@ class Game:
         """Get current board state as numpy array"""
         return self.game_board.copy()
 
+    def get_winner(self) -> int:
+        """Return the winner's player index, or 0 if nobody has won"""
+        if not self.winning_line:
+            return 0
+        row, col = self.winning_line[0]
+        return int(self.game_board[row, col])
+
+    def moves_since(self, version: int) -> Optional[List[Tuple[int, int, int]]]:
+        """
+        Return the moves played after `version`
+        None means the version is not part of the current game and a full snapshot is needed
+        """
+        if not self.base_version <= version <= self.version:
+            return None
+        return self.move_log[version - self.base_version:]
+
     def get_game_status(self) -> dict:
-        """Get current game status"""
+        """Get current game status (stones are sent sparsely, in move order)"""
         return {
             'game_over': self.game_over,
             'current_turn': self.current_turn,
             'number_of_moves': self.number_of_moves,
             'winning_line': self.winning_line,
-            'board': self.game_board.tolist()
+            'version': self.version,
+            'moves': self.move_log,
         }
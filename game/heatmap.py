@@ -0,0 +1,130 @@
+"""
+Threat heatmap
+How much each empty cell is worth to each player: the sum, over the five-cell
+windows through the cell that the opponent has no stone in, of a weight that
+grows with the player's stones already in the window. A player's value at a
+cell is both what a stone there builds for them and, read for the opponent,
+what an opponent stone there takes away from them, so each player's array is
+sent once. The whole board is scored in one batched pass over the window
+table; after a move only the windows through the played cell are rescored.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .game import Game
+from .tables import board_tables
+
+# Window value by the number of the player's stones in it; a finished five scores nothing
+HEAT_WEIGHTS = np.array([1, 6, 36, 216, 10000, 0], dtype=np.int64)
+
+
+class ThreatHeatmap:
+    """Per-cell heat for both players, kept in step with the board by `play`"""
+
+    def __init__(self, board: np.ndarray):
+        self.rows, self.cols = board.shape
+        self.tables = board_tables(self.rows, self.cols)
+        self.board = board.ravel().astype(np.int8)
+        windows = self.tables.windows
+        cells = self.board[windows]
+        # counts[p - 1, w]: stones of player p in window w
+        self.counts = np.stack([(cells == 1).sum(axis=1), (cells == 2).sum(axis=1)])
+        self.heat = np.zeros((2, self.tables.size), dtype=np.int64)
+        flat_windows = windows.ravel()
+        for index in range(2):
+            values = np.repeat(self._values(index, slice(None)), windows.shape[1])
+            self.heat[index] = np.bincount(flat_windows, weights=values, minlength=self.tables.size)
+        self.payload: Optional[Dict[str, Any]] = None
+
+    def _values(self, index: int, windows) -> np.ndarray:
+        own = self.counts[index, windows]
+        return np.where(self.counts[1 - index, windows] == 0, HEAT_WEIGHTS[own], 0)
+
+    def play(self, row: int, col: int, player: int) -> None:
+        """Place a stone and rescore the windows through it"""
+        cell = row * self.cols + col
+        through = self.tables.cell_windows[cell]
+        before = [self._values(index, through) for index in range(2)]
+        self.counts[player - 1, through] += 1
+        cells = self.tables.windows[through].ravel()
+        width = self.tables.windows.shape[1]
+        for index in range(2):
+            delta = np.repeat(self._values(index, through) - before[index], width)
+            self.heat[index] += np.bincount(cells, weights=delta, minlength=self.tables.size).astype(np.int64)
+        self.board[cell] = player
+        self.payload = None
+
+    def scores(self) -> Dict[str, Any]:
+        """
+        Row-major per-cell scores, zero on occupied cells:
+        heat[p] is the cell's value to player p (and what it blocks for p's opponent)
+        """
+        if self.payload is None:
+            empty = self.board == 0
+            heat = [np.where(empty, self.heat[index], 0).tolist() for index in range(2)]
+            self.payload = {
+                'rows': self.rows,
+                'cols': self.cols,
+                'heat': {'1': heat[0], '2': heat[1]},
+            }
+        return self.payload
+
+
+def threat_heatmap(board: np.ndarray) -> Dict[str, Any]:
+    """Heatmap scores of a position, computed from scratch"""
+    return ThreatHeatmap(np.asarray(board)).scores()
+
+
+class HeatmapCache:
+    """
+    Heatmaps per game, brought up to date with the moves played since they
+    were last asked for, and an LRU of heatmaps for positions posted to the API
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.games: Dict[int, Tuple[int, ThreatHeatmap]] = {}     # game ID -> (version, heatmap)
+        self.positions: 'OrderedDict[Tuple[Tuple[int, int], bytes], Dict[str, Any]]' = OrderedDict()
+        self.stats = {'hits': 0, 'incremental_moves': 0, 'full': 0}
+
+    def for_game(self, game: Game) -> Dict[str, Any]:
+        entry = self.games.get(game.game_id)
+        heatmap = None
+        if entry is not None:
+            version, heatmap = entry
+            moves = game.moves_since(version) if heatmap.board.size == game.game_board.size else None
+            if moves is None:
+                heatmap = None      # rematch or resize: start over
+            elif moves:
+                for row, col, player in moves:
+                    heatmap.play(row, col, player)
+                self.stats['incremental_moves'] += len(moves)
+            else:
+                self.stats['hits'] += 1
+        if heatmap is None:
+            heatmap = ThreatHeatmap(game.game_board)
+            self.stats['full'] += 1
+        self.games[game.game_id] = (game.version, heatmap)
+        return heatmap.scores()
+
+    def for_board(self, board: np.ndarray) -> Dict[str, Any]:
+        key = (board.shape, np.ascontiguousarray(board, dtype=np.int8).tobytes())
+        scores = self.positions.get(key)
+        if scores is not None:
+            self.positions.move_to_end(key)
+            self.stats['hits'] += 1
+            return scores
+        scores = self.positions[key] = ThreatHeatmap(board).scores()
+        self.stats['full'] += 1
+        if len(self.positions) > self.size:
+            self.positions.popitem(last=False)
+        return scores
+
+    def discard(self, game_id: int) -> None:
+        self.games.pop(game_id, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, games=len(self.games), positions=len(self.positions))
@@ -3,8 +3,6 @@ from typing import Optional, Tuple
 from .minimax import generate_next_move
 from config import settings
 
-NUMBER_OF_ROW = settings.number_of_row
-NUMBER_OF_COL = settings.number_of_col
 MAX_NUMBER_OF_ROOM = settings.max_number_of_room
 AI_ID = settings.ai_id
 
@@ -31,5 +29,5 @@ class Helper:
         :param move_index: 2D coordinates of the last move
         :return: next move coordinates or None if no valid move
         """
-        return generate_next_move(game, move_index)
+        return generate_next_move(game.game_board, move_index)
     
\ No newline at end of file
@@ -0,0 +1,92 @@
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+from .game import Game
+
+WAITING = 'waiting'            # PvP room with one player, open to join
+IN_PROGRESS = 'in_progress'
+FINISHED = 'finished'          # game over, waiting for a rematch or for the room to close
+STATES = (WAITING, IN_PROGRESS, FINISHED)
+
+
+def room_state(game: Game) -> str:
+    if game.game_over:
+        return FINISHED
+    if len(game.player_id) < 2:
+        return WAITING
+    return IN_PROGRESS
+
+
+class RoomIndex:
+    """
+    Room listing kept up to date as rooms change instead of rebuilt per request
+    Rooms are bucketed by (game type, state); each bucket is a sorted list of
+    room IDs, so counts are bucket lengths and a page is a bisect from the
+    cursor plus `limit` IDs. Callers report room events with `update` and
+    `remove`; an update that does not change the room's bucket costs a dict lookup
+    """
+
+    def __init__(self, game_types: Tuple[str, ...]):
+        self.game_types = game_types
+        self.buckets: Dict[Tuple[str, str], List[int]] = {
+            (game_type, state): [] for game_type in game_types for state in STATES
+        }
+        self.keys: Dict[int, Tuple[str, str]] = {}     # room ID -> its bucket
+
+    def update(self, game: Game) -> None:
+        """Move the room to the bucket matching its current type and state"""
+        key = (game.game_type, room_state(game))
+        old = self.keys.get(game.game_id)
+        if old == key:
+            return
+        if old is not None:
+            self._discard(old, game.game_id)
+        insort(self.buckets[key], game.game_id)
+        self.keys[game.game_id] = key
+
+    def remove(self, game_id: int) -> None:
+        key = self.keys.pop(game_id, None)
+        if key is not None:
+            self._discard(key, game_id)
+
+    def _discard(self, key: Tuple[str, str], game_id: int) -> None:
+        bucket = self.buckets[key]
+        position = bisect_left(bucket, game_id)
+        if position < len(bucket) and bucket[position] == game_id:
+            del bucket[position]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        return {
+            game_type: {state: len(self.buckets[(game_type, state)]) for state in STATES}
+            for game_type in self.game_types
+        }
+
+    def page(self, game_type: Optional[str] = None, state: Optional[str] = None,
+             cursor: Optional[int] = None, limit: int = 50) -> Tuple[List[int], Optional[int]]:
+        """
+        Room IDs above `cursor` matching the filters, in ID order
+        :return: up to `limit` IDs and the cursor of the next page (None on the last)
+        """
+        if game_type is not None and game_type not in self.game_types:
+            raise ValueError(f"type must be one of {', '.join(self.game_types)}")
+        if state is not None and state not in STATES:
+            raise ValueError(f"state must be one of {', '.join(STATES)}")
+        if limit < 1:
+            raise ValueError('limit must be positive')
+
+        after = 0 if cursor is None else cursor
+        slices = []
+        for (bucket_type, bucket_state), bucket in self.buckets.items():
+            if game_type in (None, bucket_type) and state in (None, bucket_state):
+                start = bisect_right(bucket, after)
+                # One extra ID per bucket tells whether another page follows
+                slices.append(bucket[start:start + limit + 1])
+        ids = list(islice(merge(*slices), limit + 1))
+        if len(ids) > limit:
+            return ids[:limit], ids[limit - 1]
+        return ids, None
+
+    def __len__(self) -> int:
+        return len(self.keys)
@@ -1,9 +1,68 @@
 from config import settings
-from typing import List, Tuple, Optional, Set
+from typing import Any, Dict, Iterable, List, Tuple, Optional, Set
+import threading
+import time
 import numpy as np
 
-NUMBER_OF_ROW = settings.number_of_row
-NUMBER_OF_COL = settings.number_of_col
+from . import position_cache
+from .patterns import load_weights
+from .position_cache import EVALUATION, SEARCH, bits_float, float_bits, pack_line, salt, unpack_line
+from .profiling import spans
+from .tables import board_shape, board_tables
+
+# Score of a forced win, above anything the static evaluation can reach
+WIN_SCORE = 10 ** 9
+
+# Plies a reduced or extended line moves its horizon by: a whole move pair, so the
+# line still ends after the same side's move (the static score favours whoever moved last)
+SELECTIVE_PLIES = 2
+
+# analyze_line_pattern results that threaten to win on the next move
+FOUR_PATTERNS = ('open_four', 'four')
+THREAT_PATTERNS = ('open_four', 'four', 'open_three')
+TACTICAL_PATTERNS = frozenset(('win',) + THREAT_PATTERNS)
+
+
+class TacticalScan:
+    '''
+    The candidate moves of one position, classified for both players
+    scores             cell -> (AI pattern score, human pattern score) of a stone there
+    wins[p]            cells where p completes five
+    fours[p]           cells where p makes a four, which wins next move unless answered
+    open_threes[p]     cells where p makes an open three
+    double_threats[p]  cells where p makes an open four or two threats at once,
+                       which a single reply cannot stop
+    Cell lists keep the candidates' iteration order.
+    '''
+
+    def __init__(self):
+        self.scores = {}
+        self.ai_total = 0
+        self.human_total = 0
+        self.wins = {1: [], 2: []}
+        self.fours = {1: [], 2: []}
+        self.open_threes = {1: [], 2: []}
+        self.double_threats = {1: [], 2: []}
+
+class SearchCancelled(Exception):
+    '''Raised out of a search whose cancellation token has been set'''
+
+def new_stats() -> Dict[str, int]:
+    '''
+    Counters of one search: nodes, depth reached, quiescence nodes, nodes by
+    threat level (the beam they got), reduced moves and how many of those were
+    searched again at full depth, and threat extensions
+    '''
+    return {
+        'nodes': 0,
+        'max_depth': 0,
+        'quiescence_nodes': 0,
+        'quiet_nodes': 0,
+        'sharp_nodes': 0,
+        'reductions': 0,
+        're_searches': 0,
+        'extensions': 0,
+    }
 
 class MiniMax:
     '''
@@ -11,9 +70,42 @@ class MiniMax:
     to predict the next best possible move for Gomoku AI
     '''
 
-    def __init__(self, play_board: np.ndarray):
+    def __init__(self, play_board: np.ndarray, limit_depth: Optional[int] = None,
+                 beam_width: Optional[int] = None, cancel: Optional[threading.Event] = None,
+                 quiescence_depth: Optional[int] = None, quiet_beam: Optional[int] = None,
+                 sharp_beam: Optional[int] = None, lmr_after: Optional[int] = None,
+                 extension_limit: Optional[int] = None):
         self.play_board = play_board.copy()
-        self.LIMIT_DEPTH = 3
+        # Set by another thread to abandon the search; checked once per node
+        self.cancel = cancel
+        # Board dimensions come from the position itself; size-dependent tables are shared
+        self.rows, self.cols = play_board.shape
+        self.tables = board_tables(self.rows, self.cols)
+        self.LIMIT_DEPTH = limit_depth or settings.ai_search_depth
+        self.beam_width = beam_width or settings.ai_beam_width
+        # Selective search; 0 turns each control off. The beam is beam_width in positions with
+        # fours or open threes, narrower when neither side threatens anything, wider once a
+        # double threat is on the board
+        quiet_beam = settings.ai_beam_quiet if quiet_beam is None else quiet_beam
+        sharp_beam = settings.ai_beam_sharp if sharp_beam is None else sharp_beam
+        self.quiet_beam = min(quiet_beam, self.beam_width) if quiet_beam else self.beam_width
+        self.sharp_beam = max(sharp_beam, self.beam_width) if sharp_beam else self.beam_width
+        self.lmr_after = settings.ai_lmr_after if lmr_after is None else lmr_after
+        self.extension_limit = settings.ai_extension_limit if extension_limit is None else extension_limit
+        # Plies of forcing moves searched past LIMIT_DEPTH (0 evaluates the horizon statically)
+        self.quiescence_depth = settings.quiescence_depth if quiescence_depth is None else quiescence_depth
+        self.quiescence_max_nodes = settings.quiescence_max_nodes
+        tuned = load_weights(settings.engine_weights_file)
+        self.pattern_scores = tuned['weights']
+        self.blocking_factor = tuned['blocking_factor']
+        # Cross-search position cache, when this process has one (game.position_cache)
+        self.shared = position_cache.shared
+        if self.shared is not None:
+            weights = position_cache.weights_fingerprint(tuned)
+            self.eval_salt = salt(EVALUATION, self.rows, self.cols, weights)
+            self.search_salt = salt(SEARCH, self.rows, self.cols, weights, self.LIMIT_DEPTH, self.beam_width,
+                                    self.quiescence_depth, self.quiescence_max_nodes, self.quiet_beam,
+                                    self.sharp_beam, self.lmr_after, self.extension_limit)
         
         self.directions = [
             (0, 1),   # horizontal
@@ -25,11 +117,14 @@ class MiniMax:
 
         
         self.eval_cache = {}
-        self.threat_cache = {}
+        self.threat_cache = {}  # board hash -> TacticalScan
+        self.best_moves = {}    # board hash -> best move found there, used to read back the PV
+        self.last_score = 0.0
+        self.stats = new_stats()
 
     def is_playable(self, x: int, y: int) -> bool:
         '''Check whether index (x, y) is within the board boundaries'''
-        return 0 <= x < NUMBER_OF_ROW and 0 <= y < NUMBER_OF_COL
+        return 0 <= x < self.rows and 0 <= y < self.cols
 
     def analyze_line_pattern(self, board: np.ndarray, row: int, col: int, 
                            dr: int, dc: int, target: int) -> Tuple[str, int]:
@@ -77,61 +172,54 @@ class MiniMax:
         else:
             return 'one', consecutive
 
-    def find_threats(self, board: np.ndarray, target: int) -> List[Tuple[int, int, str]]:
+    def scan_tactics(self, board: np.ndarray) -> TacticalScan:
         '''
-        Find all threats for a player
+        Classify every candidate move for both players in one pass
+        Each candidate is tried once per player and its four lines are read
+        with analyze_line_pattern. The scan feeds the static evaluation, move
+        ordering, forced-move pruning and the root's win/block decision, and
+        is cached per position for the rest of the search.
         '''
-        threats = []
-        possible_moves = self.get_available_indexes(board)
-        
-        for row, col in possible_moves:
-            board[row, col] = target
-            
-            for dr, dc in self.directions:
-                pattern_type, _ = self.analyze_line_pattern(board, row, col, dr, dc, target)
-                if pattern_type in ['win', 'open_four', 'four', 'open_three']:
-                    threats.append((row, col, pattern_type))
-                    break  # Found a threat, no need to check other directions
-            
-            board[row, col] = 0  # Undo placement
-        
-        return threats
+        board_hash = self.get_board_hash(board)
+        scan = self.threat_cache.get(board_hash)
+        if scan is not None:
+            return scan
 
-    def evaluate_position_advanced(self, board: np.ndarray, row: int, col: int, target: int) -> int:
-        '''
-        Simple position evaluation based on consecutive pieces
-        '''
-        if board[row, col] != 0:
-            return 0
-        
-        board[row, col] = target  # Temporarily place piece
-        total_score = 0
-        
-        for dr, dc in self.directions:
-            pattern_type, count = self.analyze_line_pattern(board, row, col, dr, dc, target)
-            
-            # Simple scoring based on pattern type
-            if pattern_type == 'win':
-                total_score += 1000000
-            elif pattern_type == 'open_four':
-                total_score += 100000
-            elif pattern_type == 'four':
-                total_score += 50000
-            elif pattern_type == 'open_three':
-                total_score += 10000
-            elif pattern_type == 'three':
-                total_score += 5000
-            elif pattern_type == 'open_two':
-                total_score += 1000
-            elif pattern_type == 'two':
-                total_score += 100
-            else:
-                total_score += count
-        
-        board[row, col] = 0
-        return total_score
+        started = time.perf_counter()
+        scan = TacticalScan()
+        pattern_scores = self.pattern_scores
+        for row, col in self.get_available_indexes(board):
+            cell_scores = [0, 0, 0]
+            for target in (2, 1):
+                board[row, col] = target
+                patterns = [self.analyze_line_pattern(board, row, col, dr, dc, target)[0]
+                            for dr, dc in self.directions]
+                board[row, col] = 0
+                # Pattern weights come from game.patterns (tuned by game.tuning)
+                cell_scores[target] = (pattern_scores[patterns[0]] + pattern_scores[patterns[1]]
+                                       + pattern_scores[patterns[2]] + pattern_scores[patterns[3]])
+                if TACTICAL_PATTERNS.isdisjoint(patterns):
+                    continue    # most candidates threaten nothing
+
+                cell = (row, col)
+                if 'win' in patterns:
+                    scan.wins[target].append(cell)
+                    continue
+                if any(pattern in FOUR_PATTERNS for pattern in patterns):
+                    scan.fours[target].append(cell)
+                if 'open_three' in patterns:
+                    scan.open_threes[target].append(cell)
+                threats = sum(pattern in THREAT_PATTERNS for pattern in patterns)
+                if 'open_four' in patterns or threats >= 2:
+                    scan.double_threats[target].append(cell)
 
+            scan.scores[(row, col)] = (cell_scores[2], cell_scores[1])
+            scan.ai_total += cell_scores[2]
+            scan.human_total += cell_scores[1]
 
+        self.threat_cache[board_hash] = scan
+        spans.record('engine.scan', time.perf_counter() - started)
+        return scan
 
     def evaluate_board_state(self, board: np.ndarray) -> float:
         '''
@@ -143,78 +231,60 @@ class MiniMax:
         board_hash = self.get_board_hash(board)
         if board_hash in self.eval_cache:
             return self.eval_cache[board_hash]
+        if self.shared is not None:
+            entry = self.shared.get(board_hash ^ self.eval_salt)
+            if entry is not None:
+                result = self.eval_cache[board_hash] = bits_float(entry[0])
+                return result
         
-        ai_score = 0
-        human_score = 0
-        
-        # Evaluate potential moves
-        possible_moves = self.get_available_indexes(board)
-        for row, col in possible_moves:
-            ai_score += self.evaluate_position_advanced(board, row, col, 2)
-            human_score += self.evaluate_position_advanced(board, row, col, 1)
-        
-        # Simple evaluation: AI score minus human score
-        result = ai_score - human_score
+        # Simple evaluation: what the AI could make on the candidate cells
+        # minus what the human could
+        scan = self.scan_tactics(board)
+        result = scan.ai_total - scan.human_total
         
         # Cache the result
         self.eval_cache[board_hash] = result
+        if self.shared is not None:
+            self.shared.put(board_hash ^ self.eval_salt, float_bits(result))
         return result
 
-    def get_board_hash(self, board: np.ndarray) -> str:
-        '''Create a hash of the board state for memoization'''
-        return str(board.tobytes())
+    def get_board_hash(self, board: np.ndarray) -> int:
+        '''Create a hash of the board state for memoization (Zobrist)'''
+        return self.tables.hash(board)
 
     def get_available_indexes(self, current_board: np.ndarray) -> Set[Tuple[int, int]]:
         '''Get all available indexes for next move with adaptive radius'''
-        possible_moves = set()
-        
-        # Find all non-empty positions
-        non_empty_positions = np.where(current_board != 0)
+        num_pieces = np.count_nonzero(current_board)
         
         # If board is empty, start from center
-        if len(non_empty_positions[0]) == 0:
-            center_row, center_col = NUMBER_OF_ROW // 2, NUMBER_OF_COL // 2
-            return {(center_row, center_col)}
+        if num_pieces == 0:
+            return {self.tables.center}
         
         # Adaptive search radius based on number of pieces
-        num_pieces = len(non_empty_positions[0])
         if num_pieces <= 4:
             search_radius = 1  # Close moves in early game
-        elif num_pieces <= 10:
-            search_radius = 2  # Medium range in mid game
         else:
-            search_radius = 2  # Keep it manageable in late game
-        
-        for row, col in zip(non_empty_positions[0], non_empty_positions[1]):
-            # Check within radius
-            for dr in range(-search_radius, search_radius + 1):
-                for dc in range(-search_radius, search_radius + 1):
-                    if dr == 0 and dc == 0:
-                        continue
-                    new_row, new_col = row + dr, col + dc
-                    if (0 <= new_row < NUMBER_OF_ROW and 
-                        0 <= new_col < NUMBER_OF_COL and 
-                        current_board[new_row, new_col] == 0):
-                        possible_moves.add((new_row, new_col))
-        
-        return possible_moves
-
-    def get_strategic_moves(self, board: np.ndarray) -> List[Tuple[int, int]]:
+            search_radius = 2  # Medium range in mid and late game
+        
+        # Neighbourhoods are precomputed per board size (game.tables)
+        cells = self.tables.nearby_empty(current_board, search_radius)
+        return {divmod(int(cell), self.cols) for cell in cells}
+
+    def get_strategic_moves(self, board: np.ndarray, player: int = 2) -> List[Tuple[int, int]]:
         '''
         Get strategically prioritized moves for better move ordering
         :param board: current board state
+        :param player: side to move; its double threats come first, then the opponent's
         :return: list of moves sorted by strategic value
         '''
-        possible_moves = self.get_available_indexes(board)
+        scan = self.scan_tactics(board)
         num_pieces = np.count_nonzero(board)
+        own_threats = set(scan.double_threats[player])
+        opponent_threats = set(scan.double_threats[3 - player])
         
         move_scores = []
         
-        for row, col in possible_moves:
-            # Base scores for AI and human
-            ai_score = self.evaluate_position_advanced(board, row, col, 2)
-            human_score = self.evaluate_position_advanced(board, row, col, 1)
-            
+        for (row, col), (ai_score, human_score) in scan.scores.items():
             # Proximity bonus in early game
             if num_pieces <= 6:
                 proximity_bonus = self.calculate_proximity_bonus(board, row, col)
@@ -226,14 +296,38 @@ class MiniMax:
                 ai_score += response_bonus
             
             # Combine scores (prioritize blocking threats)
-            total_score = ai_score + human_score * 1.2  # Give more weight to blocking
-            move_scores.append((total_score, (row, col)))
+            total_score = ai_score + human_score * self.blocking_factor  # Give more weight to blocking
+            # Double threats decide the game, so they stay in the beam whatever their score
+            priority = 2 if (row, col) in own_threats else 1 if (row, col) in opponent_threats else 0
+            move_scores.append((priority, total_score, (row, col)))
         
         # Sort by score and return top moves
         move_scores.sort(reverse=True)
         
-        # Return top 5 moves for simplicity
-        return [move for _, move in move_scores[:5]]
+        # Return the top moves only (beam)
+        ordered = [move for _, _, move in move_scores]
+        beam = self.beam_for(scan)
+        if beam < self.beam_width:
+            # Quiet positions still try the open threes that would be in the full beam,
+            # where a forced win starts
+            threes = set(scan.open_threes[player])
+            return ordered[:beam] + [move for move in ordered[beam:self.beam_width] if move in threes]
+        if beam > self.beam_width:
+            # Sharp positions widen the beam only for moves that make a threat or stop a double threat
+            critical = set(scan.fours[player]).union(scan.double_threats[player], scan.double_threats[3 - player])
+            extra = [move for move in ordered[self.beam_width:] if move in critical]
+            return ordered[:self.beam_width] + extra[:beam - self.beam_width]
+        return ordered[:beam]
+
+    def beam_for(self, scan: TacticalScan) -> int:
+        '''Beam width for a position by its threat level'''
+        if scan.double_threats[1] or scan.double_threats[2]:
+            self.stats['sharp_nodes'] += 1
+            return self.sharp_beam
+        if scan.fours[1] or scan.fours[2]:
+            return self.beam_width
+        self.stats['quiet_nodes'] += 1
+        return self.quiet_beam
 
     def calculate_proximity_bonus(self, board: np.ndarray, row: int, col: int) -> int:
         '''Calculate bonus for moves that are close to existing pieces'''
@@ -275,158 +369,183 @@ class MiniMax:
         
         return bonus
 
-    def find_winning_move(self, board: np.ndarray) -> Optional[Tuple[int, int]]:
-        '''Find immediate winning move for AI'''
-        possible_moves = self.get_available_indexes(board)
-        
-        for row, col in possible_moves:
-            # Check if this move creates a win
-            board[row, col] = 2  # Temporarily place AI piece
-            for dr, dc in self.directions:
-                pattern_type, count = self.analyze_line_pattern(board, row, col, dr, dc, 2)
-                if pattern_type == 'win':
-                    board[row, col] = 0  # Undo placement
-                    return (row, col)
-            board[row, col] = 0  # Undo placement
-        
-        return None
-
-    def find_ai_winning_move(self, board: np.ndarray) -> Optional[Tuple[int, int]]:
-        '''Find immediate winning move for AI (alternative method)'''
-        possible_moves = self.get_available_indexes(board)
-        
-        for row, col in possible_moves:
-            # Check if this move creates a win by counting consecutive pieces
-            board[row, col] = 2  # Temporarily place AI piece
-            
-            # Check all directions
-            for dr, dc in self.directions:
-                count = 1  # Count the current position
-                
-                # Count in positive direction
-                r, c = row + dr, col + dc
-                while self.is_playable(r, c) and board[r, c] == 2:
-                    count += 1
-                    r += dr
-                    c += dc
-                
-                # Count in negative direction
-                r, c = row - dr, col - dc
-                while self.is_playable(r, c) and board[r, c] == 2:
-                    count += 1
-                    r -= dr
-                    c -= dc
-                
-                if count >= 5:
-                    board[row, col] = 0  # Undo placement
-                    return (row, col)
-            
-            board[row, col] = 0  # Undo placement
-        
-        return None
-
-    def find_blocking_move(self, board: np.ndarray) -> Optional[Tuple[int, int]]:
-        '''Find move to block opponent's immediate win'''
-        possible_moves = self.get_available_indexes(board)
-        
-        for row, col in possible_moves:
-            # Check if this move blocks opponent's win
-            board[row, col] = 1  # Temporarily place opponent piece
-            for dr, dc in self.directions:
-                pattern_type, count = self.analyze_line_pattern(board, row, col, dr, dc, 1)
-                if pattern_type == 'win':
-                    board[row, col] = 0  # Undo placement
-                    return (row, col)
-            board[row, col] = 0  # Undo placement
-        
-        return None
-
     def find_critical_move(self, board: np.ndarray) -> Optional[Tuple[int, int]]:
         '''Find critical strategic moves (win or block)'''
+        scan = self.scan_tactics(board)
         
-        # 1. Check for immediate win (try both methods)
-        win_move = self.find_winning_move(board)
-        if win_move:
-            return win_move
-        
-        # Try alternative method
-        win_move = self.find_ai_winning_move(board)
-        if win_move:
-            return win_move
+        # 1. Check for immediate win
+        if scan.wins[2]:
+            return scan.wins[2][0]
         
         # 2. Check for necessary blocks
-        block_move = self.find_blocking_move(board)
-        if block_move:
-            return block_move
+        if scan.wins[1]:
+            return scan.wins[1][0]
         
         return None
 
     def minimax(self, current_board: np.ndarray, depth: int, alpha: float, beta: float, 
-                is_max_player: bool) -> Tuple[float, Optional[Tuple[int, int]]]:
+                is_max_player: bool, horizon: Optional[int] = None,
+                extensions: int = 0) -> Tuple[float, Optional[Tuple[int, int]]]:
         '''
         Enhanced minimax with strategic move ordering
+        `horizon` is the depth where this line hands over to quiescence,
+        LIMIT_DEPTH moved by the reductions and extensions on the way here;
+        `extensions` counts the extensions already used on the line
         '''
-        # Terminal state check
-        if depth == self.LIMIT_DEPTH:
-            return self.evaluate_board_state(current_board), None
-        
-        # Check for critical moves at root level
-        if depth == 0:
-            critical_move = self.find_critical_move(current_board)
-            if critical_move:
-                return 999999, critical_move
+        if horizon is None:
+            horizon = self.LIMIT_DEPTH
+        if self.cancel is not None and self.cancel.is_set():
+            raise SearchCancelled()
+        self.stats['nodes'] += 1
+        if depth > self.stats['max_depth']:
+            self.stats['max_depth'] = depth
+
+        # Terminal state check: past the horizon only forcing moves are searched
+        if depth >= horizon:
+            return self.quiescence(current_board, depth, alpha, beta, is_max_player, horizon), None
+        
+        # Forced moves: the side to move completes five when it can, and
+        # otherwise has to block every five the opponent threatens
+        player = 2 if is_max_player else 1
+        scan = self.scan_tactics(current_board)
+        if scan.wins[player]:
+            win_move = scan.wins[player][0]
+            self.best_moves[self.get_board_hash(current_board)] = win_move
+            # Sooner wins and later losses score better
+            return (WIN_SCORE - depth if is_max_player else depth - WIN_SCORE), win_move
         
         # Get strategically ordered moves
-        possible_moves = self.get_strategic_moves(current_board)
+        if scan.wins[3 - player]:
+            possible_moves = scan.wins[3 - player]
+        else:
+            possible_moves = self.get_strategic_moves(current_board, player)
         if not possible_moves:
             return self.evaluate_board_state(current_board), None
         
         best_move = None
-        
-        if is_max_player:
-            # Maximizing player (AI)
-            best_score = float('-inf')
-            for move in possible_moves:
-                row, col = move
-                current_board[row, col] = 2
-                
-                score, _ = self.minimax(current_board, depth + 1, alpha, beta, False)
-                
-                current_board[row, col] = 0
-                
+        best_score = float('-inf') if is_max_player else float('inf')
+        # Double threats are searched deeper, quiet moves late in the ordering
+        # shallower unless they beat the best so far
+        forcing = set(scan.double_threats[player])
+        reducible = (not scan.wins[3 - player] and self.lmr_after
+                     and horizon - depth > SELECTIVE_PLIES and len(possible_moves) > self.lmr_after)
+        if reducible:
+            tactical = forcing.union(scan.fours[player], scan.open_threes[player], scan.fours[3 - player],
+                                     scan.open_threes[3 - player], scan.double_threats[3 - player])
+        
+        for index, move in enumerate(possible_moves):
+            row, col = move
+            child_horizon, child_extensions = horizon, extensions
+            if move in forcing and extensions < self.extension_limit:
+                child_horizon += SELECTIVE_PLIES
+                child_extensions += 1
+                self.stats['extensions'] += 1
+            current_board[row, col] = player
+            
+            if reducible and index >= self.lmr_after and move not in tactical:
+                self.stats['reductions'] += 1
+                score, _ = self.minimax(current_board, depth + 1, alpha, beta, not is_max_player,
+                                        child_horizon - SELECTIVE_PLIES, child_extensions)
+                # Fail high: the reduced search says this move is better, so verify at full depth
+                if score > alpha if is_max_player else score < beta:
+                    self.stats['re_searches'] += 1
+                    score, _ = self.minimax(current_board, depth + 1, alpha, beta, not is_max_player,
+                                            child_horizon, child_extensions)
+            else:
+                score, _ = self.minimax(current_board, depth + 1, alpha, beta, not is_max_player,
+                                        child_horizon, child_extensions)
+            
+            current_board[row, col] = 0
+            
+            if is_max_player:
+                # Maximizing player (AI)
                 if score > best_score:
                     best_score = score
                     best_move = move
-                
                 alpha = max(alpha, best_score)
-                if beta <= alpha:
-                    break  # Beta cutoff
-        else:
-            # Minimizing player (human)
-            best_score = float('inf')
-            for move in possible_moves:
-                row, col = move
-                current_board[row, col] = 1
-                
-                score, _ = self.minimax(current_board, depth + 1, alpha, beta, True)
-                
-                current_board[row, col] = 0
-                
+            else:
+                # Minimizing player (human)
                 if score < best_score:
                     best_score = score
                     best_move = move
-                
                 beta = min(beta, best_score)
-                if beta <= alpha:
-                    break  # Alpha cutoff
+            if beta <= alpha:
+                break  # Cutoff
         
+        if best_move is not None:
+            self.best_moves[self.get_board_hash(current_board)] = best_move
         return best_score, best_move
 
+    def quiescence(self, board: np.ndarray, depth: int, alpha: float, beta: float,
+                   is_max_player: bool, horizon: Optional[int] = None) -> float:
+        '''
+        Search past the horizon until the position is quiet, so a four or an
+        open three left hanging at the last ply is played out instead of
+        scored statically
+        Only forcing moves are tried: the side to move's fours and double
+        threats, blocks of the opponent's five, and answers to the opponent's
+        open three. The side to move may stand on the static score unless the
+        opponent threatens five or an open four. Bounded by quiescence_depth
+        plies and quiescence_max_nodes nodes per search.
+        '''
+        static_score = self.evaluate_board_state(board)
+        if horizon is None:
+            horizon = self.LIMIT_DEPTH
+        if (depth - horizon >= self.quiescence_depth
+                or self.stats['quiescence_nodes'] >= self.quiescence_max_nodes):
+            return static_score
+        if self.cancel is not None and self.cancel.is_set():
+            raise SearchCancelled()
+        self.stats['quiescence_nodes'] += 1
+        if depth > self.stats['max_depth']:
+            self.stats['max_depth'] = depth
+
+        player = 2 if is_max_player else 1
+        opponent = 3 - player
+        scan = self.scan_tactics(board)
+        if scan.wins[player]:
+            return WIN_SCORE - depth if is_max_player else depth - WIN_SCORE
+        if scan.wins[opponent]:
+            moves = scan.wins[opponent]
+        else:
+            moves = list(dict.fromkeys(
+                scan.fours[player] + scan.double_threats[player] + scan.double_threats[opponent]))
+        if not moves:
+            return static_score
+
+        # Standing pat is only safe when the opponent has nothing that wins by force
+        if scan.wins[opponent] or scan.double_threats[opponent]:
+            best_score = float('-inf') if is_max_player else float('inf')
+        else:
+            best_score = static_score
+            if is_max_player:
+                alpha = max(alpha, best_score)
+            else:
+                beta = min(beta, best_score)
+            if beta <= alpha:
+                return best_score
+
+        for row, col in moves:
+            board[row, col] = player
+            score = self.quiescence(board, depth + 1, alpha, beta, not is_max_player, horizon)
+            board[row, col] = 0
+            if is_max_player:
+                best_score = max(best_score, score)
+                alpha = max(alpha, best_score)
+            else:
+                best_score = min(best_score, score)
+                beta = min(beta, best_score)
+            if beta <= alpha:
+                break
+        return best_score
+
     def calculate_next_move(self, move_index: Tuple[int, int]) -> Optional[Tuple[int, int]]:
         '''Calculate next move based on the human's latest move index'''
         # Clear caches for new move calculation
         self.eval_cache.clear()
         self.threat_cache.clear()
+        self.best_moves.clear()
+        self.stats = new_stats()
         
         current_board = self.play_board.copy()
         
@@ -436,36 +555,97 @@ class MiniMax:
             if current_board[row, col] == 0:  # If not already placed
                 current_board[row, col] = 1
         
-        # First, check for immediate critical moves
-        critical_move = self.find_critical_move(current_board)
-        if critical_move:
-            return critical_move
+        # A search of this position with the same options may already have been done
+        if self.shared is not None:
+            entry = self.shared.get(self.get_board_hash(current_board) ^ self.search_salt)
+            if entry is not None:
+                self.last_score = bits_float(entry[0])
+                return self.restore_line(current_board, unpack_line(entry[1], self.cols))
+
+        # First, check for an immediate win. A forced block is left to the
+        # search, which only tries the blocks there and scores what follows
+        with spans.span('engine.critical'):
+            wins = self.scan_tactics(current_board).wins[2]
+        if wins:
+            self.last_score = WIN_SCORE
+            return wins[0]
         
         # Use minimax to find the best move
-        score, next_move = self.minimax(
-            current_board, depth=0, alpha=float('-inf'), 
-            beta=float('inf'), is_max_player=True
-        )
+        with spans.span('engine.search'):
+            score, next_move = self.minimax(
+                current_board, depth=0, alpha=float('-inf'),
+                beta=float('inf'), is_max_player=True
+            )
+        self.last_score = score
         
         # If minimax fails to find a move, use strategic fallback
         if next_move is None:
             strategic_moves = self.get_strategic_moves(current_board)
             if strategic_moves:
-                return strategic_moves[0]
+                next_move = strategic_moves[0]
         
+        if next_move is not None and self.shared is not None:
+            line = self.principal_variation(next_move, current_board)
+            self.shared.put(self.get_board_hash(current_board) ^ self.search_salt,
+                            float_bits(score), pack_line(line, self.cols))
         return next_move
 
+    def restore_line(self, board: np.ndarray, line: List[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        '''
+        Record a principal variation read from the position cache as the best
+        moves along it, as if the search had just found it
+        :return: its first move
+        '''
+        board = board.copy()
+        player = 2
+        for move in line:
+            self.best_moves[self.get_board_hash(board)] = move
+            board[move] = player
+            player = 3 - player
+        return line[0] if line else None
+
+    def principal_variation(self, first_move: Tuple[int, int],
+                            board: Optional[np.ndarray] = None) -> List[Tuple[int, int]]:
+        '''
+        Read the expected line of play back from the best moves recorded
+        during the last search, starting with `first_move` for the AI
+        from `board` (the searched position by default)
+        '''
+        board = (self.play_board if board is None else board).copy()
+        line = []
+        move, player = first_move, 2
+        while move is not None and board[move] == 0 and len(line) < self.LIMIT_DEPTH:
+            line.append((int(move[0]), int(move[1])))
+            board[move] = player
+            player = 3 - player
+            move = self.best_moves.get(self.get_board_hash(board))
+        return line
+
 
-def generate_next_move(game, move_index_2D: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+def generate_next_move(game_board: np.ndarray, move_index_2D: Tuple[int, int],
+                       cancel: Optional[threading.Event] = None) -> Optional[Tuple[int, int]]:
     """
     Generate the next AI move using enhanced minimax algorithm
-    :param game: Game instance
+    :param game_board: the game's board, or a snapshot of it when searching off the event loop
     :param move_index_2D: 2D coordinates of the last move
+    :param cancel: token that aborts the search with SearchCancelled once set
     :return: next move coordinates or None if no valid move
     """
+    return search_reply(game_board, move_index_2D, cancel)['move']
+
+@spans.timed('engine.generate_next_move')
+def search_reply(game_board: np.ndarray, move_index_2D: Tuple[int, int],
+                 cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Search the AI move like generate_next_move, keeping what the search found
+    about the position after it
+    :return: 'move' (None if no valid move), 'score' from the AI's side, and
+             'reply', the human's expected answer to the move (None when the
+             search did not look past it)
+    """
     # Convert game board to numpy array for better performance
     # The board should already contain the player's move
-    play_board = np.array(game.game_board, dtype=int)
+    play_board = np.array(game_board, dtype=int)
     
     # Verify the player's move is on the board
     if move_index_2D:
@@ -475,18 +655,33 @@ def generate_next_move(game, move_index_2D: Tuple[int, int]) -> Optional[Tuple[i
             # Place it if missing
             play_board[row, col] = 1
     
-    solver = MiniMax(play_board)
+    solver = MiniMax(play_board, cancel=cancel)
     next_move = solver.calculate_next_move(move_index_2D)
     
-    # Debug output
-    if next_move:
-        # Convert NumPy types to native Python types for output
-        if isinstance(next_move, tuple):
-            converted_move = tuple(int(x) if hasattr(x, 'item') else x for x in next_move)
-            print(f"AI move: {converted_move} (after player move: {move_index_2D})")
-        else:
-            print(f"AI move: {next_move} (after player move: {move_index_2D})")
-    else:
+    if next_move is None:
         print(f"No AI move found (after player move: {move_index_2D})")
-    
-    return next_move
\ No newline at end of file
+        return {'move': None, 'score': 0.0, 'reply': None}
+
+    # Convert NumPy types once here so callers can emit the move as-is
+    next_move = (int(next_move[0]), int(next_move[1]))
+    print(f"AI move: {next_move} (after player move: {move_index_2D})")
+    line = solver.principal_variation(next_move)
+    return {
+        'move': next_move,
+        'score': float(solver.last_score),
+        'reply': line[1] if len(line) > 1 else None,
+    }
+
+def warm_up(sizes: Iterable) -> float:
+    """
+    Build the engine tables for each board size and run a shallow search on
+    each, so the first real move in this process pays no setup cost
+    :return: seconds taken
+    """
+    started = time.perf_counter()
+    for size in sizes:
+        rows, cols = board_shape(size)
+        board = np.zeros((rows, cols), dtype=int)
+        board[rows // 2, cols // 2] = 1
+        MiniMax(board, limit_depth=1).calculate_next_move(None)
+    return time.perf_counter() - started
@@ -0,0 +1,156 @@
+"""
+Line patterns and their evaluation weights
+classify() is a batched NumPy version of MiniMax.analyze_line_pattern: for a
+stack of boards it classifies, for every cell and direction, the line a stone
+of `target` would form there. Run lengths are built from shifted views of a
+padded board and the cell beyond each run is gathered by index, so a whole
+batch is classified without Python loops over cells.
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+PATTERNS = (
+    'win', 'open_four', 'four', 'blocked_four',
+    'open_three', 'three', 'blocked_three',
+    'open_two', 'two', 'blocked_two', 'one',
+)
+PATTERN_INDEX = {name: index for index, name in enumerate(PATTERNS)}
+
+# The hand-picked scores MiniMax has always used; blocked patterns and single
+# stones score their stone count
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    'win': 1000000, 'open_four': 100000, 'four': 50000, 'blocked_four': 4,
+    'open_three': 10000, 'three': 5000, 'blocked_three': 3,
+    'open_two': 1000, 'two': 100, 'blocked_two': 2, 'one': 1,
+}
+DEFAULT_BLOCKING_FACTOR = 1.2
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+PAD = 5         # a run can reach 4 stones past the cell, plus the end cell
+WALL = -1       # padding value: neither a stone nor an empty cell
+
+# Pattern index by (stones in line, open ends)
+_LOOKUP = np.array([
+    [PATTERN_INDEX['one']] * 3,     # unused (0 stones)
+    [PATTERN_INDEX['one']] * 3,
+    [PATTERN_INDEX['blocked_two'], PATTERN_INDEX['two'], PATTERN_INDEX['open_two']],
+    [PATTERN_INDEX['blocked_three'], PATTERN_INDEX['three'], PATTERN_INDEX['open_three']],
+    [PATTERN_INDEX['blocked_four'], PATTERN_INDEX['four'], PATTERN_INDEX['open_four']],
+    [PATTERN_INDEX['win']] * 3,
+], dtype=np.int8)
+
+
+def _as_batch(boards: np.ndarray) -> np.ndarray:
+    return boards[None] if boards.ndim == 2 else boards
+
+
+def _pad(boards: np.ndarray) -> np.ndarray:
+    n, rows, cols = boards.shape
+    padded = np.full((n, rows + 2 * PAD, cols + 2 * PAD), WALL, dtype=np.int8)
+    padded[:, PAD:PAD + rows, PAD:PAD + cols] = boards
+    return padded
+
+
+def _shifted(padded: np.ndarray, rows: int, cols: int, dr: int, dc: int, k: int) -> np.ndarray:
+    """View of the cell k steps along (dr, dc) from every board cell"""
+    r0, c0 = PAD + k * dr, PAD + k * dc
+    return padded[:, r0:r0 + rows, c0:c0 + cols]
+
+
+def _run_and_end(padded: np.ndarray, rows: int, cols: int, dr: int, dc: int,
+                 target: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Length of the run of `target` stones next to each cell, and whether the cell after it is empty"""
+    ahead = np.stack([_shifted(padded, rows, cols, dr, dc, k) for k in range(1, PAD + 1)])
+    run = np.cumprod(ahead[:-1] == target, axis=0).sum(axis=0)
+    end = np.take_along_axis(ahead, run[None], axis=0)[0]
+    return run, end == 0
+
+
+def classify(boards: np.ndarray, target: int) -> np.ndarray:
+    """
+    Classify the line a `target` stone would form at every cell
+    :param boards: (rows, cols) or (n, rows, cols) board(s)
+    :return: (n, 4, rows, cols) pattern indexes into PATTERNS, one plane per direction;
+             values at occupied cells are meaningless
+    """
+    boards = _as_batch(boards)
+    n, rows, cols = boards.shape
+    padded = _pad(boards)
+    planes = np.empty((n, len(DIRECTIONS), rows, cols), dtype=np.int8)
+    for index, (dr, dc) in enumerate(DIRECTIONS):
+        forward, forward_open = _run_and_end(padded, rows, cols, dr, dc, target)
+        backward, backward_open = _run_and_end(padded, rows, cols, -dr, -dc, target)
+        stones = np.minimum(1 + forward + backward, 5)
+        planes[:, index] = _LOOKUP[stones, forward_open.astype(np.int8) + backward_open]
+    return planes
+
+
+def candidate_mask(boards: np.ndarray) -> np.ndarray:
+    """
+    Cells MiniMax.get_available_indexes would consider: empty cells within 1
+    (up to 4 stones) or 2 cells of a stone, or the centre of an empty board
+    """
+    boards = _as_batch(boards)
+    n, rows, cols = boards.shape
+    stones = boards != 0
+    counts = stones.reshape(n, -1).sum(axis=1)
+    radius = np.where(counts <= 4, 1, 2)
+
+    padded = np.zeros((n, rows + 4, cols + 4), dtype=bool)
+    padded[:, 2:2 + rows, 2:2 + cols] = stones
+    near = {1: np.zeros_like(stones), 2: np.zeros_like(stones)}
+    for dr in range(-2, 3):
+        for dc in range(-2, 3):
+            shifted = padded[:, 2 + dr:2 + dr + rows, 2 + dc:2 + dc + cols]
+            near[2] |= shifted
+            if abs(dr) <= 1 and abs(dc) <= 1:
+                near[1] |= shifted
+
+    mask = np.where((radius == 1)[:, None, None], near[1], near[2]) & ~stones
+    empty = counts == 0
+    mask[empty, rows // 2, cols // 2] = True
+    return mask
+
+
+def pattern_counts(boards: np.ndarray, target: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Count patterns `target` could form over the candidate cells
+    :return: (n, len(PATTERNS)) counts summed over cells and directions
+    """
+    boards = _as_batch(boards)
+    if mask is None:
+        mask = candidate_mask(boards)
+    planes = classify(boards, target)
+    n = boards.shape[0]
+    selected = np.broadcast_to(mask[:, None], planes.shape)
+    batch = np.broadcast_to(np.arange(n)[:, None, None, None], planes.shape)
+    flat = batch[selected].astype(np.int64) * len(PATTERNS) + planes[selected]
+    return np.bincount(flat, minlength=n * len(PATTERNS)).reshape(n, len(PATTERNS))
+
+
+def weight_vector(weights: Dict[str, float]) -> np.ndarray:
+    return np.array([weights[name] for name in PATTERNS], dtype=np.float64)
+
+
+@lru_cache(maxsize=8)
+def load_weights(path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load pattern weights and the blocking factor from a JSON weights file
+    Falls back to the built-in defaults when no file is configured; missing
+    patterns keep their default weight
+    """
+    weights = dict(DEFAULT_WEIGHTS)
+    blocking_factor = DEFAULT_BLOCKING_FACTOR
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        unknown = set(data.get('weights', {})) - set(PATTERNS)
+        if unknown:
+            raise ValueError(f"Unknown patterns in {path}: {', '.join(sorted(unknown))}")
+        weights.update(data.get('weights', {}))
+        blocking_factor = data.get('blocking_factor', blocking_factor)
+    return {'weights': weights, 'blocking_factor': float(blocking_factor)}
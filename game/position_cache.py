@@ -0,0 +1,262 @@
+"""
+Shared position cache
+A fixed-size table in shared memory that every engine worker reads and
+writes: the AI search threads of the server process and the analysis worker
+processes. It outlives single searches and games, so a position evaluated
+or searched once is answered from the table by whichever worker meets it
+next. Two kinds of entries share the table:
+    evaluation  static evaluation of a search leaf
+    search      result of a root search at a given depth and beam: the score
+                and the first moves of the principal variation
+Keys are the board's 64-bit Zobrist hash mixed with a salt for the entry
+kind, board size, search options and engine weights, so entries made under
+other settings never match.
+
+Slots are written without locks: an entry is stored as
+(key ^ data ^ extra, data, extra), the newcomer always replaces what was
+there, and a reader only accepts a slot whose words XOR back to its key, so
+a slot torn by a concurrent write reads as a miss. An empty slot is all
+zeros and so XORs back to key 0; that key is reserved and stored as
+ZERO_KEY, so any data (a 0.0 evaluation included) can be stored. Hit and
+miss counters are kept per process in the segment and summed for the stats;
+they are updated without a lock, so concurrent threads may rarely lose a
+count.
+
+The owner (the server, or python -m game.bulk) creates the segment and
+passes its name to worker processes, which attach with `attach`. The table
+can be saved to disk on shutdown and loaded into the next run.
+"""
+
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+MAGIC = 0x50435348          # header[0] of a ready segment
+HEADER_WORDS = 8            # [magic, entries]
+MAX_PROCESSES = 64          # processes with their own counter row
+COUNTERS = ('hits', 'misses', 'stores')
+MASK = (1 << 64) - 1
+ZERO_KEY = MASK             # stands in for key 0, which empty slots match
+EVALUATION = 1
+SEARCH = 2
+PV_MOVES = 4                # moves of the principal variation kept per search entry
+
+
+def mix(value: int) -> int:
+    """splitmix64 finaliser: spreads a 64-bit value over all bits"""
+    value = (value + 0x9E3779B97F4A7C15) & MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK
+    return value ^ (value >> 31)
+
+
+def weights_fingerprint(tuned: Dict[str, Any]) -> int:
+    """64-bit digest of the engine weights an entry was computed with"""
+    data = json.dumps(tuned, sort_keys=True).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+@lru_cache(maxsize=None)
+def salt(kind: int, rows: int, cols: int, weights: int, *options: int) -> int:
+    """Key salt for entries of one kind, board size, weights and search options"""
+    value = weights
+    for part in (kind, rows, cols) + options:
+        value = mix(value ^ part)
+    return value
+
+
+def pack_line(line, cols: int) -> int:
+    """Up to PV_MOVES moves as 16-bit flat indexes plus one (0 ends the line)"""
+    packed = 0
+    for shift, (row, col) in zip(range(0, 16 * PV_MOVES, 16), line):
+        packed |= (row * cols + col + 1) << shift
+    return packed
+
+
+def unpack_line(packed: int, cols: int):
+    line = []
+    while packed & 0xFFFF:
+        line.append(divmod((packed & 0xFFFF) - 1, cols))
+        packed >>= 16
+    return line
+
+
+def float_bits(value: float) -> int:
+    return int(np.float64(value).view(np.uint64))
+
+
+def bits_float(bits: int) -> float:
+    return float(np.uint64(bits).view(np.float64))
+
+
+class SharedPositionCache:
+    """A direct-mapped table of (check, data, extra) uint64 slots in shared memory"""
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool):
+        self.memory = memory
+        self.owner = owner
+        header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=memory.buf)
+        self.entries = int(header[1])
+        self.mask = self.entries - 1
+        self.header = header
+        self.counters = np.ndarray((MAX_PROCESSES, 1 + len(COUNTERS)), dtype=np.int64, buffer=memory.buf,
+                                   offset=HEADER_WORDS * 8)
+        self.table = np.ndarray((self.entries, 3), dtype=np.uint64, buffer=memory.buf,
+                                offset=(HEADER_WORDS + self.counters.size) * 8)
+        self.row: Optional[int] = None      # this process's counter row
+        self.local = [0] * len(COUNTERS)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @classmethod
+    def create(cls, entries: int) -> 'SharedPositionCache':
+        """A new, empty segment of `entries` slots (rounded up to a power of two)"""
+        entries = 1 << max(0, entries - 1).bit_length()
+        size = (HEADER_WORDS + MAX_PROCESSES * (1 + len(COUNTERS)) + entries * 3) * 8
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=memory.buf)[:2] = (MAGIC, entries)
+        cache = cls(memory, owner=True)
+        cache.claim_row()
+        return cache
+
+    @classmethod
+    def open(cls, name: str) -> 'SharedPositionCache':
+        memory = shared_memory.SharedMemory(name=name)
+        if np.ndarray((1,), dtype=np.int64, buffer=memory.buf)[0] != MAGIC:
+            memory.close()
+            raise ValueError(f'{name} is not a position cache segment')
+        return cls(memory, owner=False)
+
+    def claim_row(self) -> None:
+        """Take a counter row for this process (pool workers claim theirs under the owner's lock)"""
+        free = np.flatnonzero(self.counters[:, 0] == 0)
+        if len(free):
+            self.row = int(free[0])
+            self.counters[self.row] = (os.getpid(), *self.local)
+
+    def get(self, key: int) -> Optional[Tuple[int, int]]:
+        """(data, extra) stored under `key`, or None"""
+        key = key or ZERO_KEY
+        check, data, extra = (int(word) for word in self.table[key & self.mask])
+        if check ^ data ^ extra == key:
+            self.count(0)
+            return data, extra
+        self.count(1)
+        return None
+
+    def put(self, key: int, data: int, extra: int = 0) -> None:
+        key = key or ZERO_KEY
+        self.table[key & self.mask] = (key ^ data ^ extra, data, extra)
+        self.count(2)
+
+    def count(self, counter: int) -> None:
+        self.local[counter] += 1
+        if self.row is not None:
+            self.counters[self.row, 1 + counter] = self.local[counter]
+
+    def occupied(self) -> int:
+        return int(np.count_nonzero(self.table.any(axis=1)))
+
+    def save(self, path: str) -> int:
+        """
+        Write the occupied slots to `path` (replaced atomically)
+        :return: entries written
+        """
+        slots = self.table[self.table.any(axis=1)]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial = path + '.partial'
+        with open(partial, 'wb') as f:
+            np.save(f, slots)
+        os.replace(partial, path)
+        return len(slots)
+
+    def load(self, path: str) -> int:
+        """
+        Insert the slots saved in `path` (a torn slot loads but never matches)
+        :return: entries loaded (0 when the file does not exist)
+        """
+        try:
+            slots = np.load(path)
+        except FileNotFoundError:
+            return 0
+        if slots.ndim != 2 or slots.shape[1] != 3 or slots.dtype != np.uint64:
+            raise ValueError(f'{path} is not a saved position cache')
+        keys = slots[:, 0] ^ slots[:, 1] ^ slots[:, 2]
+        self.table[keys & np.uint64(self.mask)] = slots
+        return len(slots)
+
+    def get_stats(self) -> Dict[str, Any]:
+        rows = self.counters[self.counters[:, 0] != 0]
+        totals = dict(zip(COUNTERS, (int(total) for total in rows[:, 1:].sum(axis=0))))
+        lookups = totals['hits'] + totals['misses']
+        return dict(
+            totals,
+            hit_rate=round(totals['hits'] / lookups, 4) if lookups else None,
+            entries=self.entries,
+            occupied=self.occupied(),
+            processes=len(rows),
+            bytes=self.memory.size,
+        )
+
+    def release(self) -> None:
+        """
+        Remove the owner's segment name so no new process can attach; the
+        mapping itself stays valid for searches still running until exit
+        """
+        if self.owner:
+            self.memory.unlink()
+            self.owner = False
+
+
+# The cache engine searches in this process use, if any
+shared: Optional[SharedPositionCache] = None
+
+
+def create(entries: int) -> SharedPositionCache:
+    """Create the segment for this process and its workers"""
+    global shared
+    shared = SharedPositionCache.create(entries)
+    return shared
+
+
+def attach(name: str, lock) -> None:
+    """Worker process initializer: use the owner's segment `name`"""
+    global shared
+    if shared is not None and shared.name == name:
+        # Forked from the owner: the mapping is inherited, only the counters are its own
+        shared = SharedPositionCache(shared.memory, owner=False)
+    else:
+        shared = SharedPositionCache.open(name)
+    with lock:
+        shared.claim_row()
+
+
+def release() -> None:
+    """Stop using the cache for new searches and remove the segment if this process owns it"""
+    global shared
+    if shared is not None:
+        shared.release()
+        shared = None
+
+
+def warm_load(path: Optional[str]) -> Dict[str, Any]:
+    """Load a saved table into the shared segment; returns what was loaded and how long it took"""
+    if shared is None or not path:
+        return {'entries': 0, 'ms': 0.0}
+    started = time.perf_counter()
+    try:
+        entries = shared.load(path)
+    except (OSError, ValueError) as e:
+        print(f'Position cache not loaded from {path}: {e}')
+        entries = 0
+    return {'entries': entries, 'ms': round((time.perf_counter() - started) * 1000.0, 3)}
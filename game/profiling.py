@@ -0,0 +1,256 @@
+"""
+On-demand profiling for a live server
+Timing spans are always on: named sections of the engine and the event
+handlers add their wall time to a shared table, which costs about a
+microsecond per span. Profiling sessions are started by an admin while the
+server runs, for a number of seconds or of handled events, in one of two modes:
+    cprofile  deterministic profile of the event loop and of the AI searches,
+              downloadable as a pstats file
+    sample    a thread reads every thread's stack at a fixed interval,
+              downloadable as folded stacks for flamegraph.pl or speedscope
+"""
+
+import cProfile
+import functools
+import inspect
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+MODES = ('cprofile', 'sample')
+FORMATS = {'cprofile': 'pstats', 'sample': 'folded'}
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# From 3.12 cProfile hooks sys.monitoring, which sees every thread but admits one profiler at a time
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class SpanStats:
+    """Call count, total and worst wall time per named span, safe to use from any thread"""
+
+    def __init__(self):
+        self.spans: Dict[str, List[float]] = {}     # name -> [count, total seconds, max seconds]
+        self.lock = threading.Lock()
+
+    def record(self, name: str, elapsed: float) -> None:
+        with self.lock:
+            entry = self.spans.get(name)
+            if entry is None:
+                self.spans[name] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name: str) -> Callable:
+        """Decorator recording every call of a function or coroutine function as a span"""
+        def decorator(func: Callable) -> Callable:
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.record(name, time.perf_counter() - started)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            items = sorted(self.spans.items(), key=lambda item: -item[1][1])
+        return {
+            name: {
+                'count': count,
+                'total_ms': round(total * 1000.0, 3),
+                'mean_ms': round(total * 1000.0 / count, 4),
+                'max_ms': round(worst * 1000.0, 3),
+            }
+            for name, (count, total, worst) in items
+        }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.spans.clear()
+
+
+def frame_label(code) -> str:
+    """Folded stack frame name: path relative to the project (or file name) and function"""
+    path = code.co_filename
+    if path.startswith(ROOT_DIR):
+        path = os.path.relpath(path, ROOT_DIR)
+    else:
+        path = os.path.basename(path)
+    return f'{path}:{code.co_name}'
+
+
+class Profiler:
+    """
+    One profiling session at a time
+    Sessions end after `seconds`, after `events` handled Socket.IO events,
+    or when stopped; the last finished session's result stays downloadable
+    until the next one starts. In cprofile mode start() and stop() must be
+    called from the event loop thread, which is the thread it profiles.
+    """
+
+    def __init__(self):
+        self.mode: Optional[str] = None
+        self.started_at = 0.0
+        self.deadline: Optional[float] = None
+        self.events_left: Optional[int] = None
+        self.events = 0
+        self.interval = 0.0
+        self.profile: Optional[cProfile.Profile] = None
+        self.thread_profiles: List[cProfile.Profile] = []
+        self.samples: Counter = Counter()
+        self.sampler: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.result: Optional[bytes] = None
+        self.result_format: Optional[str] = None
+        self.last_session: Dict[str, Any] = {}
+
+    @property
+    def active(self) -> bool:
+        return self.mode is not None
+
+    def start(self, mode: str, seconds: Optional[float] = None, events: Optional[int] = None,
+              interval: float = 0.005) -> Dict[str, Any]:
+        """Start a session; raises ValueError for bad options or when one is running"""
+        if self.active:
+            raise ValueError('a profiling session is already running')
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if seconds is None and events is None:
+            raise ValueError('give seconds, events or both')
+        if (seconds is not None and seconds <= 0) or (events is not None and events <= 0) or interval <= 0:
+            raise ValueError('seconds, events and interval must be positive')
+
+        self.mode = mode
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + seconds if seconds is not None else None
+        self.events_left = events
+        self.events = 0
+        self.interval = interval
+        self.result = self.result_format = None
+        if mode == 'cprofile':
+            self.thread_profiles = []
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.samples = Counter()
+            self.stopping.clear()
+            self.sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+            self.sampler.start()
+        return self.get_status()
+
+    def stop(self) -> Dict[str, Any]:
+        """End the running session and keep its result"""
+        if not self.active:
+            return self.get_status()
+        if self.mode == 'cprofile':
+            self.profile.disable()
+            stats = pstats.Stats(self.profile)
+            with self.lock:
+                for profile in self.thread_profiles:
+                    stats.add(profile)
+                self.thread_profiles = []
+            self.result = marshal.dumps(stats.stats)
+            self.profile = None
+        else:
+            self.stopping.set()
+            self.sampler.join()
+            self.sampler = None
+            self.result = ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common()).encode()
+        self.result_format = FORMATS[self.mode]
+        self.last_session = {
+            'mode': self.mode,
+            'seconds': round(time.monotonic() - self.started_at, 3),
+            'events': self.events,
+            'samples': sum(self.samples.values()) if self.mode == 'sample' else None,
+            'format': self.result_format,
+            'bytes': len(self.result),
+        }
+        self.mode = None
+        return self.get_status()
+
+    def expired(self) -> bool:
+        return self.active and self.deadline is not None and time.monotonic() >= self.deadline
+
+    def count_event(self) -> bool:
+        """
+        Count a handled event towards the session's limit
+        :return: True once the session has reached its event limit or its time
+        """
+        if not self.active:
+            return False
+        self.events += 1
+        return (self.events_left is not None and self.events >= self.events_left) or self.expired()
+
+    def call(self, func: Callable, *args) -> Any:
+        """
+        Run `func` in a worker thread, profiled into the session when a
+        cprofile session is running (before 3.12 cProfile only sees its own thread)
+        """
+        if self.mode != 'cprofile' or PROFILES_ALL_THREADS:
+            return func(*args)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            with self.lock:
+                if self.mode == 'cprofile':
+                    self.thread_profiles.append(profile)
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {'active': self.active, 'last_session': self.last_session or None}
+        if self.active:
+            status.update({
+                'mode': self.mode,
+                'elapsed_s': round(time.monotonic() - self.started_at, 3),
+                'seconds_left': round(max(0.0, self.deadline - time.monotonic()), 3) if self.deadline else None,
+                'events': self.events,
+                'events_limit': self.events_left,
+            })
+        return status
+
+
+spans = SpanStats()
+profiler = Profiler()
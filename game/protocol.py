@@ -0,0 +1,144 @@
+"""
+Compact wire protocol for game updates
+Clients opt in per connection; everyone else keeps the JSON messages.
+
+Binary messages share one fixed header:
+    protocol version (B), message type (B), state version (I), flags (B),
+    winner (B), cell count (H)
+followed by `cell count` cells of (row, col, player) bytes and, when the
+winning-line flag is set, a (B) count and that many (row, col) byte pairs.
+A snapshot additionally carries (rows, cols, current turn) right after the header.
+"""
+
+import struct
+from typing import Any, Dict, Iterable, Sequence, Tuple
+
+PROTOCOL_JSON = 'json'
+PROTOCOL_BINARY = 'binary'
+PROTOCOL_VERSION = 1
+SUPPORTED_PROTOCOLS = (PROTOCOL_JSON, PROTOCOL_BINARY)
+
+# Message types
+MSG_DELTA = 1       # only the cells changed since the previous version
+MSG_SNAPSHOT = 2    # full state, sent on join and resync
+
+# Flags
+FLAG_GAME_OVER = 0x01
+FLAG_YOUR_TURN = 0x02
+FLAG_WINNING_LINE = 0x04
+
+HEADER = struct.Struct('!BBIBBH')
+SNAPSHOT_EXTRA = struct.Struct('!BBB')
+CELL = struct.Struct('!BBB')
+POINT = struct.Struct('!BB')
+
+Cell = Tuple[int, int, int]
+
+
+def _pack_flags(game_over: bool, your_turn: bool, winning_line: Sequence) -> int:
+    flags = 0
+    if game_over:
+        flags |= FLAG_GAME_OVER
+    if your_turn:
+        flags |= FLAG_YOUR_TURN
+    if winning_line:
+        flags |= FLAG_WINNING_LINE
+    return flags
+
+
+def _pack_body(cells: Sequence[Cell], winning_line: Sequence[Tuple[int, int]]) -> bytes:
+    parts = [CELL.pack(*cell) for cell in cells]
+    if winning_line:
+        parts.append(struct.pack('!B', len(winning_line)))
+        parts.extend(POINT.pack(row, col) for row, col in winning_line)
+    return b''.join(parts)
+
+
+def encode_delta(version: int, cells: Sequence[Cell], game_over: bool = False,
+                 your_turn: bool = False, winner: int = 0,
+                 winning_line: Sequence[Tuple[int, int]] = ()) -> bytes:
+    """
+    Encode a delta update carrying only the changed cells
+    :param version: game state version after applying `cells`
+    :param cells: (row, col, player) triples in the order they were played
+    """
+    header = HEADER.pack(PROTOCOL_VERSION, MSG_DELTA, version,
+                         _pack_flags(game_over, your_turn, winning_line),
+                         winner or 0, len(cells))
+    return header + _pack_body(cells, winning_line)
+
+
+def encode_snapshot(game, your_turn: bool = False) -> bytes:
+    """Encode the full state of a game (every stone in move order)"""
+    rows, cols = game.game_board.shape
+    header = HEADER.pack(PROTOCOL_VERSION, MSG_SNAPSHOT, game.version,
+                         _pack_flags(game.game_over, your_turn, game.winning_line),
+                         game.get_winner(), len(game.move_log))
+    extra = SNAPSHOT_EXTRA.pack(rows, cols, game.current_turn)
+    return header + extra + _pack_body(game.move_log, game.winning_line)
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """Decode a binary message into the same shape as the JSON messages"""
+    protocol_version, message_type, version, flags, winner, count = HEADER.unpack_from(data)
+    if protocol_version != PROTOCOL_VERSION:
+        raise ValueError(f'Unsupported protocol version {protocol_version}')
+
+    offset = HEADER.size
+    message: Dict[str, Any] = {
+        'type': 'snapshot' if message_type == MSG_SNAPSHOT else 'delta',
+        'version': version,
+        'game_over': bool(flags & FLAG_GAME_OVER),
+        'your_turn': bool(flags & FLAG_YOUR_TURN),
+        'winner': winner,
+    }
+    if message_type == MSG_SNAPSHOT:
+        rows, cols, current_turn = SNAPSHOT_EXTRA.unpack_from(data, offset)
+        offset += SNAPSHOT_EXTRA.size
+        message.update({'rows': rows, 'cols': cols, 'current_turn': current_turn})
+
+    cells = []
+    for _ in range(count):
+        cells.append(list(CELL.unpack_from(data, offset)))
+        offset += CELL.size
+    message['cells'] = cells
+
+    winning_line = []
+    if flags & FLAG_WINNING_LINE:
+        (length,) = struct.unpack_from('!B', data, offset)
+        offset += 1
+        for _ in range(length):
+            winning_line.append(list(POINT.unpack_from(data, offset)))
+            offset += POINT.size
+    message['winning_line'] = winning_line
+    return message
+
+
+def snapshot_message(game) -> Dict[str, Any]:
+    """
+    JSON equivalent of encode_snapshot
+    Stones are flat cell indexes (row * cols + col) in move order; players alternate
+    starting from `first_player`
+    """
+    rows, cols = game.game_board.shape
+    return {
+        'type': 'snapshot',
+        'version': game.version,
+        'rows': rows,
+        'cols': cols,
+        'current_turn': game.current_turn,
+        'game_over': game.game_over,
+        'winner': game.get_winner(),
+        'first_player': game.move_log[0][2] if game.move_log else game.current_turn,
+        'moves': [row * cols + col for row, col, _ in game.move_log],
+        'winning_line': [list(point) for point in game.winning_line],
+    }
+
+
+def delta_message(version: int, cells: Iterable[Cell]) -> Dict[str, Any]:
+    """JSON delta carrying the cells played after a client's known version"""
+    return {
+        'type': 'delta',
+        'version': version,
+        'cells': [list(cell) for cell in cells],
+    }
@@ -0,0 +1,99 @@
+import time
+from typing import Dict, Hashable, List, Optional
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by connection or room
+    Each key may spend `burst` events at once and then `rate` events per second.
+    Buckets refill lazily when used, so idle keys cost nothing but their entry,
+    which callers drop with `discard` when the connection or room goes away
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[Hashable, List[float]] = {}   # key -> [tokens, last refill time]
+
+    def allow(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """
+        Spend `cost` tokens from the key's bucket
+        :return: 0 if the event is allowed, otherwise seconds until it would be
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / self.rate
+
+    def charge(self, key: Hashable, cost: float, now: Optional[float] = None) -> None:
+        """
+        Spend `cost` after the fact, for work whose price is only known once it
+        is done; the balance may go negative and must refill before `allow`
+        lets the key through again
+        """
+        if self.rate <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        bucket = self.buckets.setdefault(key, [self.burst, now])
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate) - cost
+        bucket[1] = now
+
+    def discard(self, key: Hashable) -> None:
+        self.buckets.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+
+class SearchSlots:
+    """
+    Admission control for AI searches
+    A search holds a slot from the move that triggers it until its reply is
+    sent, whether it is running or waiting for a worker thread. At most
+    `per_room` slots per room and `limit` slots overall are handed out, so a
+    flood of moves is refused up front instead of queueing behind everyone else
+    """
+
+    ROOM_BUSY = 'room'
+    SERVER_BUSY = 'server'
+
+    def __init__(self, limit: int, per_room: int):
+        self.limit = limit
+        self.per_room = per_room
+        self.active = 0
+        self.rooms: Dict[int, int] = {}     # game ID -> slots held
+        self.peak = 0
+
+    def acquire(self, game_id: int, force: bool = False) -> Optional[str]:
+        """
+        Take a slot for a search in `game_id`
+        :param force: skip the server-wide limit, for searches owed to a player
+        :return: None when admitted, otherwise ROOM_BUSY or SERVER_BUSY
+        """
+        if self.rooms.get(game_id, 0) >= self.per_room:
+            return self.ROOM_BUSY
+        if self.active >= self.limit and not force:
+            return self.SERVER_BUSY
+        self.rooms[game_id] = self.rooms.get(game_id, 0) + 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        return None
+
+    def release(self, game_id: int) -> None:
+        held = self.rooms.get(game_id, 0)
+        if held <= 0:
+            return
+        if held == 1:
+            del self.rooms[game_id]
+        else:
+            self.rooms[game_id] = held - 1
+        self.active -= 1
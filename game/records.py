@@ -0,0 +1,390 @@
+"""
+Append-only store of finished games
+Games are encoded on the event loop (a few dozen bytes) and handed to a writer
+thread through a queue, so handle_move never waits on disk. The writer appends
+them to size-capped segment files and adds one fixed-size entry per game to an
+index file; readers memory-map both.
+
+Record layout (little-endian):
+    header  magic "GR", format version, flags, record ID, room ID,
+            finished at (epoch seconds), rows, cols, winner, first player,
+            move count
+    moves   flat cell indexes (row * cols + col) in move order, one byte each
+            when rows * cols <= 255, two bytes otherwise
+Index entry: record ID, finished at, segment number, offset in segment, plus
+a copy of the room ID, move count, winner and flags so that summary scans never
+touch the segments.
+
+Record IDs are consecutive and index timestamps never decrease, so a lookup by
+ID is a direct index access and a lookup by date a binary search over the
+memory-mapped index.
+
+Usage:
+    python -m game.records data/records --stats
+    python -m game.records data/records --id 42
+    python -m game.records data/records --since 2026-10-18 --until 2026-10-19 > games.jsonl
+"""
+
+import argparse
+import json
+import mmap
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+MAGIC = b'GR'
+FORMAT_VERSION = 1
+
+# Flags
+FLAG_WIDE_MOVES = 0x01      # moves take two bytes (boards above 255 cells)
+FLAG_PVP = 0x02             # player vs player, otherwise single player vs AI
+FLAG_ABANDONED = 0x04       # the room closed before the game finished
+
+HEADER = np.dtype([
+    ('magic', 'S2'), ('version', 'u1'), ('flags', 'u1'),
+    ('record_id', '<u8'), ('room_id', '<u4'), ('finished_at', '<u4'),
+    ('rows', 'u1'), ('cols', 'u1'), ('winner', 'u1'), ('first_player', 'u1'),
+    ('move_count', '<u2'),
+])
+INDEX_ENTRY = np.dtype([
+    ('record_id', '<u8'), ('finished_at', '<u4'), ('segment', '<u4'), ('offset', '<u8'),
+    ('room_id', '<u4'), ('move_count', '<u2'), ('winner', 'u1'), ('flags', 'u1'),
+])
+
+SEGMENT_NAME = 'games-{:06d}.log'
+SEGMENT_GLOB = 'games-*.log'
+INDEX_NAME = 'index.bin'
+
+
+def record_flags(rows: int, cols: int, pvp: bool, abandoned: bool = False) -> int:
+    return ((FLAG_WIDE_MOVES if rows * cols > 255 else 0) | (FLAG_PVP if pvp else 0)
+            | (FLAG_ABANDONED if abandoned else 0))
+
+
+def encode_record(record_id: int, room_id: int, finished_at: int, rows: int, cols: int,
+                  winner: int, moves: List[Tuple[int, int, int]], flags: int) -> bytes:
+    """Encode one game; `moves` are (row, col, player) in the order played"""
+    header = np.zeros(1, dtype=HEADER)
+    header[0] = (MAGIC, FORMAT_VERSION, flags, record_id, room_id, finished_at,
+                 rows, cols, winner, moves[0][2] if moves else 1, len(moves))
+    cells = np.fromiter((row * cols + col for row, col, _ in moves),
+                        dtype='<u2' if flags & FLAG_WIDE_MOVES else 'u1', count=len(moves))
+    return header.tobytes() + cells.tobytes()
+
+
+def record_length(header: np.void) -> int:
+    width = 2 if header['flags'] & FLAG_WIDE_MOVES else 1
+    return HEADER.itemsize + int(header['move_count']) * width
+
+
+class RecordWriter:
+    """Background writer for the segmented game log"""
+
+    def __init__(self, directory: str, segment_bytes: int, queue_size: int):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.queue: 'queue.Queue[Optional[Tuple[tuple, bytes]]]' = queue.Queue(maxsize=queue_size)
+        self.thread: Optional[threading.Thread] = None
+        self.segment = 0
+        self.offset = 0
+        self.next_id = 1
+        self.last_time = 0
+        self.stats = {
+            'written': 0,
+            'dropped': 0,
+            'bytes': 0,
+        }
+
+    def start(self) -> None:
+        """Open the store and start the writer thread (idempotent)"""
+        if self.thread is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._recover()
+        self.thread = threading.Thread(target=self._run, name='record-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush queued games and stop the writer"""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def submit(self, game, abandoned: bool = False) -> Optional[int]:
+        """
+        Queue a game for writing without blocking
+        :return: the record ID, or None if the queue is full and the game was dropped
+        """
+        self.start()
+        rows, cols = game.game_board.shape
+        finished_at = max(int(time.time()), self.last_time)
+        winner = game.get_winner()
+        flags = record_flags(rows, cols, game.game_type == settings.game_type_pvp, abandoned)
+        data = encode_record(self.next_id, game.game_id, finished_at, rows, cols, winner,
+                             game.move_log, flags)
+        # Index entry without its segment and offset, which the writer fills in
+        summary = (self.next_id, finished_at, game.game_id, len(game.move_log), winner, flags)
+        try:
+            self.queue.put_nowait((summary, data))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return None
+        self.last_time = finished_at
+        self.next_id += 1
+        return self.next_id - 1
+
+    def _recover(self) -> None:
+        """
+        Continue after the last indexed record, dropping any half-written tail:
+        bytes after that record in its segment (all of segment 0 when the
+        index is empty) and any later segment are not indexed and are removed
+        """
+        index_path = self.directory / INDEX_NAME
+        size = index_path.stat().st_size if index_path.exists() else 0
+        if size % INDEX_ENTRY.itemsize:
+            with open(index_path, 'r+b') as f:
+                f.truncate(size - size % INDEX_ENTRY.itemsize)
+            size -= size % INDEX_ENTRY.itemsize
+
+        segment = end = 0
+        if size:
+            with open(index_path, 'rb') as f:
+                f.seek(size - INDEX_ENTRY.itemsize)
+                last = np.frombuffer(f.read(INDEX_ENTRY.itemsize), dtype=INDEX_ENTRY)[0]
+            segment = int(last['segment'])
+            with open(self.directory / SEGMENT_NAME.format(segment), 'rb') as f:
+                f.seek(int(last['offset']))
+                header = np.frombuffer(f.read(HEADER.itemsize), dtype=HEADER)[0]
+            end = int(last['offset']) + record_length(header)
+            self.next_id = int(last['record_id']) + 1
+            self.last_time = int(last['finished_at'])
+
+        segment_path = self.directory / SEGMENT_NAME.format(segment)
+        if segment_path.exists():
+            with open(segment_path, 'r+b') as f:
+                f.truncate(end)
+        for path in self.directory.glob(SEGMENT_GLOB):
+            if path.name > segment_path.name:
+                path.unlink()
+        self.segment, self.offset = segment, end
+
+    def _run(self) -> None:
+        segment_file = open(self.directory / SEGMENT_NAME.format(self.segment), 'ab')
+        index_file = open(self.directory / INDEX_NAME, 'ab')
+        entry = np.zeros(1, dtype=INDEX_ENTRY)
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                (record_id, finished_at, room_id, move_count, winner, flags), data = item
+                if self.offset and self.offset + len(data) > self.segment_bytes:
+                    segment_file.close()
+                    self.segment, self.offset = self.segment + 1, 0
+                    segment_file = open(self.directory / SEGMENT_NAME.format(self.segment), 'ab')
+
+                # Record first, then its index entry: an entry never points at missing data,
+                # and recovery drops a record whose entry did not make it
+                segment_file.write(data)
+                segment_file.flush()
+                entry[0] = (record_id, finished_at, self.segment, self.offset,
+                            room_id, move_count, winner, flags)
+                index_file.write(entry.tobytes())
+                index_file.flush()
+                self.offset += len(data)
+                self.stats['written'] += 1
+                self.stats['bytes'] += len(data)
+        finally:
+            segment_file.close()
+            index_file.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, queued=self.queue.qsize(), segment=self.segment)
+
+
+class RecordReader:
+    """Memory-mapped access to the game log"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.index = np.zeros(0, dtype=INDEX_ENTRY)
+        self.segments: Dict[int, mmap.mmap] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Pick up games written since the reader was opened"""
+        index_path = self.directory / INDEX_NAME
+        size = index_path.stat().st_size if index_path.exists() else 0
+        count = size // INDEX_ENTRY.itemsize
+        self.index = (np.memmap(index_path, dtype=INDEX_ENTRY, mode='r', shape=(count,))
+                      if count else np.zeros(0, dtype=INDEX_ENTRY))
+        for segment in self.segments.values():
+            segment.close()
+        self.segments = {}
+
+    def close(self) -> None:
+        for segment in self.segments.values():
+            segment.close()
+        self.segments = {}
+        self.index = np.zeros(0, dtype=INDEX_ENTRY)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _segment(self, number: int) -> mmap.mmap:
+        segment = self.segments.get(number)
+        if segment is None:
+            with open(self.directory / SEGMENT_NAME.format(number), 'rb') as f:
+                segment = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.segments[number] = segment
+        return segment
+
+    def _decode(self, entry: np.void) -> Dict[str, Any]:
+        segment = self._segment(int(entry['segment']))
+        offset = int(entry['offset'])
+        header = np.frombuffer(segment, dtype=HEADER, count=1, offset=offset)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError(f"Corrupt record {int(entry['record_id'])}")
+        wide = header['flags'] & FLAG_WIDE_MOVES
+        cells = np.frombuffer(segment, dtype='<u2' if wide else 'u1',
+                              count=int(header['move_count']), offset=offset + HEADER.itemsize)
+        cols = int(header['cols'])
+        return {
+            'id': int(header['record_id']),
+            'room_id': int(header['room_id']),
+            'finished_at': int(header['finished_at']),
+            'rows': int(header['rows']),
+            'cols': cols,
+            'winner': int(header['winner']),
+            'first_player': int(header['first_player']),
+            'pvp': bool(header['flags'] & FLAG_PVP),
+            'abandoned': bool(header['flags'] & FLAG_ABANDONED),
+            'moves': [divmod(int(cell), cols) for cell in cells],
+        }
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """Look a game up by record ID"""
+        if not len(self.index):
+            return None
+        position = record_id - int(self.index[0]['record_id'])
+        if not 0 <= position < len(self.index):
+            return None
+        return self._decode(self.index[position])
+
+    def range_by_time(self, start: Optional[float] = None, end: Optional[float] = None) -> slice:
+        """Index positions of games finished in [start, end) (epoch seconds)"""
+        times = self.index['finished_at']
+        low = int(np.searchsorted(times, start, side='left')) if start is not None else 0
+        high = int(np.searchsorted(times, end, side='left')) if end is not None else len(times)
+        return slice(low, high)
+
+    def by_date(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Games finished in [start, end), oldest first"""
+        for entry in self.index[self.range_by_time(start, end)]:
+            yield self._decode(entry)
+
+    def summaries(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """Index entries (ID, time, room, move count, winner, flags) of games in a time range"""
+        return self.index[self.range_by_time(start, end)]
+
+    def scan(self, start: Optional[float] = None,
+             end: Optional[float] = None) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Fast path over the raw moves of games in a time range
+        Yields (record ID, winner, flat cell indexes) where the cells are bytes,
+        or a uint16 array for boards above 255 cells; nothing is decoded
+        """
+        entries = self.summaries(start, end)
+        for number in np.unique(entries['segment']):
+            segment = self._segment(int(number))
+            selected = entries[entries['segment'] == number]
+            for record_id, offset, count, winner, flags in zip(
+                    selected['record_id'].tolist(), selected['offset'].tolist(),
+                    selected['move_count'].tolist(), selected['winner'].tolist(),
+                    selected['flags'].tolist()):
+                first = offset + HEADER.itemsize
+                if flags & FLAG_WIDE_MOVES:
+                    yield record_id, winner, np.frombuffer(segment, dtype='<u2', count=count, offset=first)
+                else:
+                    yield record_id, winner, segment[first:first + count]
+
+
+def _parse_date(text: str) -> float:
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _export(game: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Game in the gomoku-arena record format, so tuning and bulk analysis can read it
+    Abandoned games keep their `abandoned` flag, which tuning uses to skip them
+    """
+    from .arena import format_move
+
+    winner = game['winner']
+    return dict(
+        game, black='A', opening=0,
+        winner={1: 'A', 2: 'B'}.get(winner) if winner else None,
+        moves=' '.join(format_move(row, col) for row, col in game['moves']),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Read the finished-game log')
+    parser.add_argument('directory', help='Record store directory (records_dir setting)')
+    parser.add_argument('--id', type=int, help='Print one game by record ID')
+    parser.add_argument('--since', help='ISO date/time (UTC unless given), inclusive')
+    parser.add_argument('--until', help='ISO date/time (UTC unless given), exclusive')
+    parser.add_argument('--stats', action='store_true', help='Summarise the selected games')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f'{args.directory} is not a directory')
+    reader = RecordReader(args.directory)
+    start = _parse_date(args.since) if args.since else None
+    end = _parse_date(args.until) if args.until else None
+
+    if args.id is not None:
+        game = reader.get(args.id)
+        if game is None:
+            print(f'No game with ID {args.id}', file=sys.stderr)
+            return 1
+        print(json.dumps(_export(game)))
+    elif args.stats:
+        started = time.perf_counter()
+        games = reader.summaries(start, end)
+        moves = int(games['move_count'].sum())
+        wins = {str(player): int((games['winner'] == player).sum()) for player in (1, 2)}
+        elapsed = time.perf_counter() - started
+        print(json.dumps({
+            'games': len(games),
+            'moves': moves,
+            'wins': wins,
+            'draws': int(((games['winner'] == 0) & ~(games['flags'] & FLAG_ABANDONED).astype(bool)).sum()),
+            'abandoned': int((games['flags'] & FLAG_ABANDONED).astype(bool).sum()),
+            'pvp': int((games['flags'] & FLAG_PVP).astype(bool).sum()),
+            'scan_s': round(elapsed, 4),
+            'games_per_s': round(len(games) / elapsed, 1) if elapsed else None,
+        }, indent=2))
+    else:
+        for game in reader.by_date(start, end):
+            print(json.dumps(_export(game)))
+    reader.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+from array import array
+from random import Random
+from typing import Optional
+
+import numpy as np
+
+
+class RoomIdAllocator:
+    """
+    Allocate room IDs (1..capacity) from a shuffled free-list
+    Every operation is O(1): the free-list is a shuffled array of unused IDs and
+    `positions` maps each ID to its slot in that array (-1 when reserved), so an
+    arbitrary ID can be removed by swapping it with the last free entry
+    """
+
+    def __init__(self, capacity: int, seed: Optional[int] = None):
+        self.capacity = capacity
+        self.random = Random(seed)
+
+        # Built with NumPy: a Python-level shuffle of every ID dominated import time
+        ids = np.random.default_rng(seed).permutation(np.arange(1, capacity + 1, dtype=np.int64))
+        self.free = array('q', ids.tobytes())
+        # ID 0 is never handed out: clients treat a falsy room ID as missing
+        positions = np.full(capacity + 1, -1, dtype=np.int64)
+        positions[ids] = np.arange(capacity, dtype=np.int64)
+        self.positions = array('q', positions.tobytes())
+
+    def __len__(self) -> int:
+        """Number of free IDs"""
+        return len(self.free)
+
+    def is_free(self, room_id: int) -> bool:
+        return (isinstance(room_id, int) and 0 < room_id <= self.capacity
+                and self.positions[room_id] >= 0)
+
+    def peek(self) -> int:
+        """
+        Propose a free ID without reserving it (used when rendering pages)
+        :return: a random free ID, or -1 if every ID is in use
+        """
+        if not self.free:
+            return -1
+        return self.free[self.random.randrange(len(self.free))]
+
+    def allocate(self) -> int:
+        """
+        Reserve any free ID
+        :return: reserved ID, or -1 if every ID is in use
+        """
+        if not self.free:
+            return -1
+        room_id = self.free.pop()
+        self.positions[room_id] = -1
+        return room_id
+
+    def reserve(self, room_id: int) -> bool:
+        """
+        Reserve a specific ID
+        :return: True if the ID was free and is now reserved
+        """
+        if not self.is_free(room_id):
+            return False
+
+        slot = self.positions[room_id]
+        last_id = self.free[-1]
+        self.free[slot] = last_id
+        self.positions[last_id] = slot
+        self.free.pop()
+        self.positions[room_id] = -1
+        return True
+
+    def release(self, room_id: int) -> None:
+        """Return a reserved ID to the free-list"""
+        if (not isinstance(room_id, int) or not 0 < room_id <= self.capacity
+                or self.positions[room_id] >= 0):
+            return
+        self.positions[room_id] = len(self.free)
+        self.free.append(room_id)
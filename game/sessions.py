@@ -0,0 +1,82 @@
+import secrets
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class SessionManager:
+    """
+    Reconnect tokens for players
+    A token is issued when a player creates or joins a room. When the player's
+    connection drops the session is suspended instead of destroying the room,
+    and the same token can resume it from a new connection within the grace period
+    """
+
+    def __init__(self, grace_period: float):
+        self.grace_period = grace_period
+        self.tokens: Dict[str, Tuple[int, str]] = {}    # token -> (game ID, sid)
+        self.sid_tokens: Dict[str, str] = {}             # sid -> token
+        self.suspended: Dict[str, float] = {}            # token -> resume deadline
+        self.game_tokens: Dict[int, List[str]] = {}      # game ID -> tokens of its players
+        self.stats = {
+            'issued': 0,
+            'suspended': 0,
+            'resumed': 0,
+            'expired': 0,
+        }
+
+    def issue(self, sid: str, game_id: int) -> str:
+        """Create a reconnect token for a player of `game_id`"""
+        token = secrets.token_urlsafe(16)
+        self.tokens[token] = (game_id, sid)
+        self.sid_tokens[sid] = token
+        self.game_tokens.setdefault(game_id, []).append(token)
+        self.stats['issued'] += 1
+        return token
+
+    def game_id_of(self, sid: str) -> Optional[int]:
+        """Return the room a connected player belongs to"""
+        token = self.sid_tokens.get(sid)
+        if token is None:
+            return None
+        return self.tokens[token][0]
+
+    def suspend(self, sid: str) -> Optional[Tuple[str, float]]:
+        """
+        Mark the player's session as suspended
+        :return: (token, resume deadline), or None if the sid has no session
+        """
+        token = self.sid_tokens.pop(sid, None)
+        if token is None or token not in self.tokens:
+            return None
+        deadline = time.monotonic() + self.grace_period
+        self.suspended[token] = deadline
+        self.stats['suspended'] += 1
+        return token, deadline
+
+    def is_expired(self, token: str, deadline: float) -> bool:
+        """True if the suspension identified by `deadline` was never resumed"""
+        return self.suspended.get(token) == deadline
+
+    def resume(self, token: str, sid: str) -> Optional[Tuple[int, str]]:
+        """
+        Attach a suspended session to a new connection
+        :return: (game ID, previous sid), or None if the token is unknown or expired
+        """
+        deadline = self.suspended.get(token)
+        if deadline is None or deadline < time.monotonic():
+            return None
+
+        del self.suspended[token]
+        game_id, old_sid = self.tokens[token]
+        self.tokens[token] = (game_id, sid)
+        self.sid_tokens[sid] = token
+        self.stats['resumed'] += 1
+        return game_id, old_sid
+
+    def discard_game(self, game_id: int) -> None:
+        """Forget every session of a room that is being torn down"""
+        for token in self.game_tokens.pop(game_id, []):
+            _, sid = self.tokens.pop(token)
+            self.sid_tokens.pop(sid, None)
+            if self.suspended.pop(token, None) is not None:
+                self.stats['expired'] += 1
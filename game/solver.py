@@ -0,0 +1,407 @@
+"""
+Proof-number search for forced wins
+A depth-first proof-number (df-pn) solver over threat sequences. The attacker
+only plays moves that make a four or an open three; the defender only answers
+with the cells that stop the threat on the board or with fours of its own.
+Every other defence is useless against a four or an open three, so a proof in
+this space is a real forced win. A disproof only means there is no win by
+continuous threats: quiet moves may still win, which is what MiniMax is for.
+
+Proof and disproof numbers live in a bounded table keyed by Zobrist hash.
+When it is full, the half of it with the least search work behind it is
+dropped, solved positions last, and the search carries on.
+
+Usage:
+    python -m game.solver "h8 i9 h9 i10 h10"       # moves in arena notation, black first
+    python -m game.solver --records data/records --id 42 --ply 30
+    python -m game.solver --records data/records --id 42 --review --max-nodes 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from .arena import format_move, parse_move
+from .tables import board_tables
+
+INFINITY = 10 ** 9
+WIN = 'win'
+LOSS = 'loss'
+NO_FORCED_WIN = 'no_forced_win'
+UNKNOWN = 'unknown'
+
+
+class BudgetExhausted(Exception):
+    """Raised out of the search once its node or time budget is spent"""
+
+
+def _empty_cells(windows: np.ndarray, values: np.ndarray, mask: np.ndarray) -> List[int]:
+    """Empty cells of the selected windows, cells shared by most windows first"""
+    cells = windows[mask][values[mask] == 0]
+    if not len(cells):
+        return []
+    unique, counts = np.unique(cells, return_counts=True)
+    return unique[np.argsort(-counts, kind='stable')].tolist()
+
+
+class Threats:
+    """
+    Threat cells of one position for both players
+    wins[p]      cells where p completes five
+    fours[p]     cells where p makes a four
+    threes[p]    cells where p makes an open three
+    defences[p]  cells that stop the open threes p has on the board
+    """
+
+    def __init__(self, flat: np.ndarray, tables):
+        fives = flat[tables.windows]
+        sixes = flat[tables.six_windows]
+        inner = sixes[:, 1:5]
+        ends_open = (sixes[:, 0] == 0) & (sixes[:, 5] == 0)
+        self.wins, self.fours, self.threes, self.defences = {}, {}, {}, {}
+        for player in (1, 2):
+            own, other = (fives == player).sum(axis=1), (fives == 3 - player).sum(axis=1)
+            self.wins[player] = _empty_cells(tables.windows, fives, (other == 0) & (own == 4))
+            self.fours[player] = _empty_cells(tables.windows, fives, (other == 0) & (own == 3))
+            own, other = (inner == player).sum(axis=1), (inner == 3 - player).sum(axis=1)
+            open_line = ends_open & (other == 0)
+            self.threes[player] = _empty_cells(tables.six_windows[:, 1:5], inner, open_line & (own == 2))
+            self.defences[player] = _empty_cells(tables.six_windows, sixes, open_line & (own == 3))
+
+
+class ProofTable:
+    """
+    Proof and disproof numbers by position hash, bounded to `capacity` entries
+    Each entry is [proof number, disproof number, nodes searched below it,
+    moves]. A full table drops the half of its entries with the least work
+    behind them, keeping solved entries over unsolved ones.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(2, capacity)
+        self.entries: Dict[int, List[Any]] = {}
+        self.collections = 0
+        self.collected = 0
+
+    def get(self, key: int) -> Optional[List[Any]]:
+        return self.entries.get(key)
+
+    def store(self, key: int, entry: List[Any]) -> None:
+        self.entries[key] = entry
+        if len(self.entries) > self.capacity:
+            self.collect()
+
+    def collect(self) -> None:
+        ranked = sorted(self.entries, key=lambda key: (self.entries[key][0] == 0 or self.entries[key][1] == 0,
+                                                        self.entries[key][2]))
+        for key in ranked[:len(ranked) // 2]:
+            del self.entries[key]
+        self.collections += 1
+        self.collected += len(ranked) // 2
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'entries': len(self.entries), 'collections': self.collections, 'collected': self.collected}
+
+
+class ProofNumberSolver:
+    """
+    df-pn search for a forced win of `attacker` from one position
+    The budget is shared by every prove() call on the same solver.
+    """
+
+    def __init__(self, board: np.ndarray, attacker: int, max_nodes: int,
+                 time_limit: Optional[float] = None, table_size: int = settings.solver_table_size):
+        self.rows, self.cols = board.shape
+        self.tables = board_tables(self.rows, self.cols)
+        self.flat = np.ascontiguousarray(board, dtype=np.int8).ravel().copy()
+        self.attacker = attacker
+        self.table = ProofTable(table_size)
+        self.max_nodes = max_nodes
+        self.deadline = time.perf_counter() + time_limit if time_limit else None
+        self.nodes = 0
+        self.max_depth = 0
+
+    def prove(self, to_move: int) -> Tuple[str, List[Tuple[int, int]]]:
+        """
+        Search until the position with `to_move` to play is solved or the budget runs out
+        :return: WIN (attacker wins, with the line), NO_FORCED_WIN or UNKNOWN
+        """
+        key = self.tables.hash(self.flat.reshape(self.rows, self.cols))
+        try:
+            self._mid(key, to_move, INFINITY, INFINITY, 0)
+        except BudgetExhausted:
+            return UNKNOWN, []
+        entry = self.table.get(key)
+        if entry is None:
+            return UNKNOWN, []
+        proof, disproof = entry[:2]
+        if proof == 0:
+            return WIN, self._line(key, to_move)
+        return (NO_FORCED_WIN if disproof == 0 else UNKNOWN), []
+
+    def _expand(self, player: int) -> List[Any]:
+        """
+        New entry for the position with `player` to move: solved when the
+        threats on the board decide it, otherwise unsolved with its moves
+        """
+        attacker = self.attacker
+        defender = 3 - attacker
+        threats = Threats(self.flat, self.tables)
+        if player == attacker:
+            if threats.wins[attacker]:
+                return [0, INFINITY, 0, threats.wins[attacker][:1]]
+            if len(threats.wins[defender]) > 1:
+                return [INFINITY, 0, 0, []]
+            if threats.wins[defender]:
+                moves = threats.wins[defender]
+            else:
+                moves = list(dict.fromkeys(threats.fours[attacker] + threats.threes[attacker]))
+        else:
+            if threats.wins[defender]:
+                return [INFINITY, 0, 0, []]
+            if len(threats.wins[attacker]) > 1:
+                return [0, INFINITY, 0, threats.wins[attacker][:2]]
+            if threats.wins[attacker]:
+                moves = threats.wins[attacker]
+            else:
+                moves = list(dict.fromkeys(threats.defences[attacker] + threats.fours[defender]))
+        if not moves:
+            return [INFINITY, 0, 0, []]
+        return [1, 1, 0, moves]
+
+    def _mid(self, key: int, player: int, proof_threshold: int, disproof_threshold: int, depth: int) -> None:
+        """Expand the position until its proof or disproof number reaches its threshold"""
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise BudgetExhausted()
+        if self.deadline is not None and not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise BudgetExhausted()
+        self.max_depth = max(self.max_depth, depth)
+
+        entry = self.table.get(key)
+        if entry is None:
+            entry = self._expand(player)
+        if entry[0] == 0 or entry[1] == 0:
+            self.table.store(key, entry)
+            return
+
+        or_node = player == self.attacker
+        zobrist = self.tables.zobrist[player]
+        started = self.nodes
+        while True:
+            # Children not in the table yet count as (1, 1)
+            best_cell, best, second, best_child = None, INFINITY + 1, INFINITY + 1, (1, 1)
+            total = 0
+            for cell in entry[3]:
+                child = self.table.get(key ^ int(zobrist[cell]))
+                proof, disproof = (child[0], child[1]) if child is not None else (1, 1)
+                value, summed = (proof, disproof) if or_node else (disproof, proof)
+                total += summed
+                if value < best:
+                    best_cell, second, best, best_child = cell, best, value, (proof, disproof)
+                elif value < second:
+                    second = value
+            total = min(total, INFINITY)
+            entry[0], entry[1] = (best, total) if or_node else (total, best)
+            if entry[0] >= proof_threshold or entry[1] >= disproof_threshold:
+                break
+
+            if or_node:
+                child_proof = min(proof_threshold, second + 1)
+                child_disproof = disproof_threshold - entry[1] + best_child[1]
+            else:
+                child_proof = proof_threshold - entry[0] + best_child[0]
+                child_disproof = min(disproof_threshold, second + 1)
+            self.flat[best_cell] = player
+            try:
+                self._mid(key ^ int(zobrist[best_cell]), 3 - player, child_proof, child_disproof, depth + 1)
+            finally:
+                self.flat[best_cell] = 0
+
+        entry[2] += self.nodes - started
+        self.table.store(key, entry)
+
+    def _line(self, key: int, player: int) -> List[Tuple[int, int]]:
+        """
+        Read the winning line back from the table: the attacker's proven
+        moves and the defender's longest resistance. Stops early if the
+        table has dropped a position on the way
+        """
+        line = []
+        while True:
+            entry = self.table.get(key)
+            if entry is None or not entry[3]:
+                break
+            or_node = player == self.attacker
+            if entry[2] == 0:
+                # Decided by the board: the attacker's five, or the defender's
+                # block of one of two fives and the attacker's other one
+                line.extend(divmod(cell, self.cols) for cell in entry[3])
+                break
+            children = [(cell, self.table.get(key ^ int(self.tables.zobrist[player][cell])))
+                        for cell in entry[3]]
+            proven = [(cell, child) for cell, child in children if child is not None and child[0] == 0]
+            if not proven:
+                break
+            # The quickest proof for the attacker, the hardest one for the defender
+            pick = min if or_node else max
+            cell, _ = pick(proven, key=lambda item: item[1][2])
+            line.append(divmod(cell, self.cols))
+            key ^= int(self.tables.zobrist[player][cell])
+            player = 3 - player
+        return [(int(row), int(col)) for row, col in line]
+
+
+def solve(board: np.ndarray, side: int, max_nodes: int = settings.solver_max_nodes,
+          time_limit: Optional[float] = None, table_size: int = settings.solver_table_size) -> Dict[str, Any]:
+    """
+    Look for a forced win for either player in a position
+    First tries to prove that `side`, to move, wins; once that is disproved,
+    tries to prove the opponent wins whatever `side` plays
+    :param board: (rows, cols) board of 0, 1 and 2
+    :param side: player to move
+    :return: result (WIN, LOSS, NO_FORCED_WIN or UNKNOWN for `side`), the line
+             from `side`'s move to the five, nodes, time and table statistics;
+             raises ValueError for invalid positions
+    """
+    board = np.asarray(board)
+    if side not in (1, 2):
+        raise ValueError('side must be 1 or 2')
+    if board.ndim != 2 or not np.isin(board, (0, 1, 2)).all():
+        raise ValueError('board must be a 2D grid of 0, 1 and 2')
+    tables = board_tables(*board.shape)
+    fives = board.ravel()[tables.windows]
+    if ((fives == fives[:, :1]) & (fives[:, :1] != 0)).all(axis=1).any():
+        raise ValueError('position already has five in a row')
+
+    started = time.perf_counter()
+    nodes = 0
+    table_stats = []
+    line: List[Tuple[int, int]] = []
+    result = UNKNOWN
+    for attacker in (side, 3 - side):
+        remaining_time = time_limit - (time.perf_counter() - started) if time_limit else None
+        solver = ProofNumberSolver(board, attacker, max_nodes - nodes, remaining_time, table_size)
+        status, line = solver.prove(side)
+        nodes += solver.nodes
+        table_stats.append(dict(solver.table.get_stats(), max_depth=solver.max_depth))
+        if status == WIN:
+            result = WIN if attacker == side else LOSS
+            break
+        if status == UNKNOWN:
+            result = UNKNOWN
+            break
+        result = NO_FORCED_WIN
+
+    elapsed = time.perf_counter() - started
+    return {
+        'result': result,
+        'side': side,
+        'line': [list(move) for move in line],
+        'nodes': nodes,
+        'time_ms': round(elapsed * 1000.0, 3),
+        'nodes_per_s': round(nodes / elapsed, 1) if elapsed else 0.0,
+        'table': table_stats,
+    }
+
+
+def solve_game(game, **options) -> Dict[str, Any]:
+    """Solve a Game's current position for the player whose turn it is"""
+    return solve(game.game_board, game.current_turn, **options)
+
+
+def replay(moves: List[Tuple[int, int]], rows: int, cols: int, first_player: int = 1) -> Tuple[np.ndarray, int]:
+    """
+    Board after a move list, players alternating from `first_player`
+    :return: the board and the player to move
+    """
+    board = np.zeros((rows, cols), dtype=np.int8)
+    player = first_player
+    for row, col in moves:
+        if board[row, col]:
+            raise ValueError(f'{format_move(row, col)} is played twice')
+        board[row, col] = player
+        player = 3 - player
+    return board, player
+
+
+def review(moves: List[Tuple[int, int]], rows: int, cols: int, first_player: int,
+           **options) -> List[Dict[str, Any]]:
+    """
+    Solve the position before every move of a game
+    :return: the positions where the player to move had a forced win or a
+             forced loss, and whether the move played follows the line found
+    """
+    findings = []
+    for ply, played in enumerate(moves):
+        board, side = replay(moves[:ply], rows, cols, first_player)
+        result = solve(board, side, **options)
+        if result['result'] in (WIN, LOSS):
+            findings.append({
+                'ply': ply,
+                'side': side,
+                'result': result['result'],
+                'played': format_move(*played),
+                'line': ' '.join(format_move(*move) for move in result['line']),
+                'follows_line': bool(result['line']) and tuple(result['line'][0]) == tuple(played),
+                'nodes': result['nodes'],
+            })
+    return findings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Prove forced wins with proof-number search')
+    parser.add_argument('moves', nargs='?', default='', help='Moves in arena notation, black first ("h8 i9 ...")')
+    parser.add_argument('--size', type=int, default=settings.number_of_row, help='Board size for a move list')
+    parser.add_argument('--records', help='Record store directory (records_dir setting)')
+    parser.add_argument('--id', type=int, help='Game to load from the record store')
+    parser.add_argument('--ply', type=int, help='Solve the position after this many moves of the game')
+    parser.add_argument('--review', action='store_true', help='Solve the position before every move of the game')
+    parser.add_argument('--max-nodes', type=int, default=settings.solver_max_nodes, help='Node budget per position')
+    parser.add_argument('--time-limit', type=float, help='Seconds per position')
+    parser.add_argument('--table-size', type=int, default=settings.solver_table_size)
+    args = parser.parse_args(argv)
+    options = {'max_nodes': args.max_nodes, 'time_limit': args.time_limit, 'table_size': args.table_size}
+
+    if args.records:
+        from .records import RecordReader
+
+        if args.id is None or not os.path.isdir(args.records):
+            parser.error('--records needs a record store directory and --id')
+        reader = RecordReader(args.records)
+        game = reader.get(args.id)
+        reader.close()
+        if game is None:
+            print(f'No game with ID {args.id}', file=sys.stderr)
+            return 1
+        moves, rows, cols, first_player = game['moves'], game['rows'], game['cols'], game['first_player'] or 1
+    else:
+        try:
+            moves = [parse_move(move) for move in args.moves.split()]
+        except (ValueError, IndexError):
+            parser.error('moves must look like "h8 i9 h9"')
+        rows = cols = args.size
+        first_player = 1
+
+    try:
+        if args.review:
+            print(json.dumps(review(moves, rows, cols, first_player, **options), indent=2))
+            return 0
+        board, side = replay(moves[:args.ply] if args.ply is not None else moves, rows, cols, first_player)
+        result = solve(board, side, **options)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    result['line'] = ' '.join(format_move(*move) for move in result['line'])
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
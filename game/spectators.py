@@ -0,0 +1,184 @@
+"""
+Read-only room subscriptions for spectators
+Moves are not forwarded to viewers one by one: rooms are marked dirty and a
+background tick broadcasts one coalesced delta per room and protocol, so the
+cost on the event loop does not grow with moves x viewers.
+"""
+
+import time
+from typing import Dict, Optional, Set
+
+import socketio
+
+from .protocol import PROTOCOL_BINARY, PROTOCOL_JSON, encode_delta, encode_snapshot, snapshot_message
+
+
+def spectator_room(game_id: int, protocol: str) -> str:
+    """Socket.IO room holding the viewers of a game that share a protocol"""
+    return f'spectate:{game_id}:{protocol}'
+
+
+class SpectatorHub:
+    """Track viewers per game and broadcast coalesced updates on a fixed tick"""
+
+    def __init__(self, tick_interval: float, max_queue: int, drop_after: float):
+        self.tick_interval = tick_interval
+        self.max_queue = max_queue        # queued packets before a viewer counts as slow
+        self.drop_after = drop_after      # seconds a slow viewer may lag before it is dropped
+        self.sio: Optional[socketio.AsyncServer] = None
+        self.games: Dict = {}
+        self.viewers: Dict[int, Dict[str, str]] = {}     # game ID -> {sid: protocol}
+        self.viewer_games: Dict[str, int] = {}            # sid -> game ID
+        self.sent_versions: Dict[int, int] = {}           # game ID -> last broadcast version
+        self.dirty: Set[int] = set()
+        self.lagging: Dict[str, float] = {}               # sid -> time it fell behind
+        self.running = False
+        self.stats = {
+            'ticks': 0,
+            'broadcasts': 0,
+            'resyncs': 0,
+            'dropped': 0,
+        }
+
+    def start(self, sio: socketio.AsyncServer, games: Dict) -> None:
+        """Start the broadcast tick over the server's game table (idempotent)"""
+        self.sio = sio
+        self.games = games
+        if not self.running:
+            self.running = True
+            sio.start_background_task(self._run)
+
+    def stop(self) -> None:
+        """Stop the broadcast tick after its current sleep"""
+        self.running = False
+
+    async def add(self, sid: str, game, protocol: str) -> None:
+        """Subscribe a viewer and send it a snapshot"""
+        self.remove_sid(sid)
+        protocol = protocol if protocol == PROTOCOL_BINARY else PROTOCOL_JSON
+        self.viewers.setdefault(game.game_id, {})[sid] = protocol
+        self.viewer_games[sid] = game.game_id
+        self.sent_versions.setdefault(game.game_id, game.version)
+        await self.sio.enter_room(sid, spectator_room(game.game_id, protocol))
+        await self._send_snapshot(sid, game, protocol)
+
+    def remove_sid(self, sid: str) -> None:
+        """Unsubscribe a viewer (Socket.IO rooms are cleaned up on disconnect)"""
+        game_id = self.viewer_games.pop(sid, None)
+        self.lagging.pop(sid, None)
+        if game_id is None:
+            return
+        room_viewers = self.viewers.get(game_id)
+        if room_viewers is not None:
+            protocol = room_viewers.pop(sid, None)
+            if protocol is not None and self.sio is not None:
+                self.sio.manager.basic_leave_room(sid, '/', spectator_room(game_id, protocol))
+            if not room_viewers:
+                self.viewers.pop(game_id, None)
+                self.sent_versions.pop(game_id, None)
+                self.dirty.discard(game_id)
+
+    def mark_dirty(self, game_id: int) -> None:
+        """Schedule a broadcast for a game on the next tick"""
+        if game_id in self.viewers:
+            self.dirty.add(game_id)
+
+    async def close_game(self, game_id: int) -> None:
+        """Tell viewers the game is gone and drop their subscriptions"""
+        room_viewers = self.viewers.get(game_id)
+        if not room_viewers:
+            return
+        for protocol in set(room_viewers.values()):
+            await self.sio.emit('end_game', '', room=spectator_room(game_id, protocol))
+        for sid in list(room_viewers):
+            self.remove_sid(sid)
+
+    def queued_packets(self, sid: str) -> int:
+        """Packets waiting in the viewer's Engine.IO send queue"""
+        try:
+            eio_sid = self.sio.manager.eio_sid_from_sid(sid, '/')
+            return self.sio.eio.sockets[eio_sid].queue.qsize()
+        except (AttributeError, KeyError):
+            return 0
+
+    async def _send_snapshot(self, sid: str, game, protocol: str) -> None:
+        if protocol == PROTOCOL_BINARY:
+            await self.sio.emit('spectate', encode_snapshot(game), room=sid)
+        else:
+            message = snapshot_message(game)
+            message['game_id'] = game.game_id
+            await self.sio.emit('spectate', message, room=sid)
+
+    async def _apply_backpressure(self, game, now: float) -> None:
+        """
+        Pull slow viewers out of the broadcast room instead of queueing more for them
+        Once their queue drains they are resynced with a snapshot; if it does not
+        drain within `drop_after` seconds they are disconnected
+        """
+        for sid, protocol in list(self.viewers.get(game.game_id, {}).items()):
+            queued = self.queued_packets(sid)
+            room = spectator_room(game.game_id, protocol)
+            if sid not in self.lagging:
+                if queued > self.max_queue:
+                    self.lagging[sid] = now
+                    await self.sio.leave_room(sid, room)
+            elif queued == 0:
+                del self.lagging[sid]
+                await self.sio.enter_room(sid, room)
+                await self._send_snapshot(sid, game, protocol)
+                self.stats['resyncs'] += 1
+            elif now - self.lagging[sid] > self.drop_after:
+                self.remove_sid(sid)
+                self.stats['dropped'] += 1
+                await self.sio.disconnect(sid)
+
+    async def broadcast(self) -> None:
+        """Send one coalesced update per dirty game and protocol"""
+        dirty, self.dirty = self.dirty, set()
+        now = time.monotonic()
+        for game_id in dirty:
+            game = self.games.get(game_id)
+            if game is None or game_id not in self.viewers:
+                continue
+            await self._apply_backpressure(game, now)
+
+            cells = game.moves_since(self.sent_versions.get(game_id, game.version))
+            protocols = set(self.viewers.get(game_id, {}).values())
+            for protocol in protocols:
+                room = spectator_room(game_id, protocol)
+                if cells is None:
+                    # A rematch reset the board: everyone needs a fresh snapshot
+                    payload = (encode_snapshot(game) if protocol == PROTOCOL_BINARY
+                               else dict(snapshot_message(game), game_id=game_id))
+                elif protocol == PROTOCOL_BINARY:
+                    payload = encode_delta(game.version, cells, game.game_over, False,
+                                           game.get_winner(), game.winning_line)
+                else:
+                    payload = {
+                        'type': 'delta',
+                        'game_id': game_id,
+                        'version': game.version,
+                        'cells': [list(cell) for cell in cells],
+                        'game_over': game.game_over,
+                        'winner': game.get_winner(),
+                        'winning_line': [list(point) for point in game.winning_line],
+                    }
+                await self.sio.emit('spectate', payload, room=room)
+                self.stats['broadcasts'] += 1
+            self.sent_versions[game_id] = game.version
+
+    async def _run(self) -> None:
+        while self.running:
+            await self.sio.sleep(self.tick_interval)
+            self.stats['ticks'] += 1
+            if self.dirty or self.lagging:
+                # Lagging viewers are re-checked even when nothing moved
+                self.dirty.update(self.viewer_games[sid] for sid in self.lagging
+                                  if sid in self.viewer_games)
+                await self.broadcast()
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats,
+                    viewers=len(self.viewer_games),
+                    rooms=len(self.viewers),
+                    lagging=len(self.lagging))
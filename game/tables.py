@@ -0,0 +1,100 @@
+"""
+Per-board-size engine tables
+Everything the engine needs that depends only on the board dimensions is built
+once per size and shared by every game and search on a board of that size.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class BoardTables:
+    """
+    Precomputed tables for a rows x cols board
+    zobrist      (3, rows * cols) uint64 keys; row 0 is all zeros so an empty
+                 cell contributes nothing and a board hashes in one gather
+                 with `cells` (0 .. rows * cols - 1) as the column index
+    neighbours   radius -> per-cell arrays of flat indexes within that
+                 Chebyshev distance (the cell itself excluded)
+    windows      (n, 5) flat indexes of every five-cell line segment, the
+                 places a five can be made
+    six_windows  (m, 6) flat indexes of every six-cell line segment, the
+                 places an open four (four stones, both ends empty) fits
+    cell_windows per-cell arrays of the rows of `windows` through that cell
+    """
+
+    def __init__(self, rows: int, cols: int):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.center = (rows // 2, cols // 2)
+
+        # Seeded per size so hashes are reproducible across processes
+        rng = np.random.default_rng(rows * 1000 + cols)
+        self.zobrist = np.zeros((3, self.size), dtype=np.uint64)
+        self.zobrist[1:] = rng.integers(1, 2 ** 63, size=(2, self.size), dtype=np.uint64)
+        self.cells = np.arange(self.size)
+
+        self.neighbours = {radius: self._neighbours(radius) for radius in (1, 2)}
+        self.windows = self._windows(5)
+        self.six_windows = self._windows(6)
+        self.cell_windows = self._cell_windows()
+
+    def _neighbours(self, radius: int) -> List[np.ndarray]:
+        table = []
+        for row in range(self.rows):
+            for col in range(self.cols):
+                cells = [r * self.cols + c
+                         for r in range(max(0, row - radius), min(self.rows, row + radius + 1))
+                         for c in range(max(0, col - radius), min(self.cols, col + radius + 1))
+                         if (r, c) != (row, col)]
+                table.append(np.array(cells, dtype=np.intp))
+        return table
+
+    def _windows(self, length: int) -> np.ndarray:
+        windows = []
+        for dr, dc in DIRECTIONS:
+            for row in range(self.rows):
+                for col in range(self.cols):
+                    end_row, end_col = row + (length - 1) * dr, col + (length - 1) * dc
+                    if 0 <= end_row < self.rows and 0 <= end_col < self.cols:
+                        windows.append([(row + k * dr) * self.cols + col + k * dc for k in range(length)])
+        return np.array(windows, dtype=np.intp)
+
+    def _cell_windows(self) -> List[np.ndarray]:
+        order = np.argsort(self.windows.ravel(), kind='stable')
+        bounds = np.searchsorted(self.windows.ravel()[order], np.arange(self.size + 1))
+        length = self.windows.shape[1]
+        return [order[bounds[cell]:bounds[cell + 1]] // length for cell in range(self.size)]
+
+    def hash(self, board: np.ndarray) -> int:
+        """Zobrist hash of a board of this size"""
+        flat = board.ravel()
+        return int(np.bitwise_xor.reduce(self.zobrist[flat, self.cells]))
+
+    def nearby_empty(self, board: np.ndarray, radius: int) -> np.ndarray:
+        """Flat indexes of empty cells within `radius` of any stone"""
+        flat = board.ravel()
+        stones = np.flatnonzero(flat)
+        if not len(stones):
+            return np.zeros(0, dtype=np.intp)
+        table = self.neighbours[radius]
+        cells = np.unique(np.concatenate([table[cell] for cell in stones]))
+        return cells[flat[cells] == 0]
+
+
+@lru_cache(maxsize=None)
+def board_tables(rows: int, cols: int) -> BoardTables:
+    """Tables for a board size, built on first use and cached for the process"""
+    return BoardTables(rows, cols)
+
+
+def board_shape(size) -> Tuple[int, int]:
+    """Normalise a board size given as N or [rows, cols]"""
+    if isinstance(size, (list, tuple)) and len(size) == 2:
+        return int(size[0]), int(size[1])
+    return int(size), int(size)
@@ -0,0 +1,201 @@
+"""
+Texel-style tuning of the evaluation weights
+Replays recorded games (gomoku-arena --records), extracts pattern-count
+features for every position in batched NumPy and fits the pattern weights so
+that sigmoid(eval / K) predicts the game result from the side to move's point
+of view.
+
+The model mirrors MiniMax.evaluate_board_state: eval = w . own - w . opponent,
+where own and opponent count the patterns each side could form on the
+candidate cells. The blocking factor only weighs the opponent's patterns when
+get_strategic_moves orders moves, never the evaluation, so it is not fitted
+here and the weights file leaves it at its default. Weights are fitted in log
+space, which keeps them positive and copes with values that differ by six
+orders of magnitude.
+
+Usage:
+    gomoku-arena --games 2000 --records games.jsonl
+    python -m game.tuning games.jsonl --output weights.json
+    ENGINE_WEIGHTS_FILE=weights.json python main.py
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from .arena import parse_move
+from .patterns import DEFAULT_WEIGHTS, PATTERN_INDEX, PATTERNS, candidate_mask, pattern_counts, weight_vector
+
+
+def load_positions(paths: Iterable[str], skip_plies: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Replay game records into positions, skipping abandoned games
+    :return: boards (n, rows, cols), side to move (n,), result for the side to move (n,)
+    """
+    boards, sides, results = [], [], []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                # Games cut short by a disconnect or a closed room have no result
+                if record.get('abandoned'):
+                    continue
+                moves = [parse_move(move) for move in record['moves'].split()]
+                black = record['black']
+                winner = record.get('winner')
+                board = np.zeros((settings.number_of_row, settings.number_of_col), dtype=np.int8)
+                for ply, (row, col) in enumerate(moves):
+                    side = 1 if ply % 2 == 0 else 2
+                    if ply >= max(skip_plies, record.get('opening', 0)):
+                        owner = black if side == 1 else ('B' if black == 'A' else 'A')
+                        boards.append(board.copy())
+                        sides.append(side)
+                        results.append(0.5 if winner is None else float(winner == owner))
+                    board[row, col] = side
+    if not boards:
+        return (np.zeros((0, settings.number_of_row, settings.number_of_col), dtype=np.int8),
+                np.zeros(0, dtype=np.int8), np.zeros(0))
+    return np.stack(boards), np.array(sides, dtype=np.int8), np.array(results)
+
+
+def extract_features(boards: np.ndarray, sides: np.ndarray,
+                     batch_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+    """Pattern counts for the side to move and its opponent, in batches"""
+    own = np.empty((len(boards), len(PATTERNS)))
+    opponent = np.empty_like(own)
+    for start in range(0, len(boards), batch_size):
+        batch = boards[start:start + batch_size]
+        to_move = sides[start:start + batch_size]
+        mask = candidate_mask(batch)
+        black, white = pattern_counts(batch, 1, mask), pattern_counts(batch, 2, mask)
+        black_to_move = (to_move == 1)[:, None]
+        own[start:start + len(batch)] = np.where(black_to_move, black, white)
+        opponent[start:start + len(batch)] = np.where(black_to_move, white, black)
+    return own, opponent
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def texel_loss(weights: np.ndarray, scale: float, own: np.ndarray,
+               opponent: np.ndarray, results: np.ndarray) -> float:
+    evals = (own - opponent) @ weights
+    return float(np.mean((_sigmoid(evals / scale) - results) ** 2))
+
+
+def fit_scale(weights: np.ndarray, own: np.ndarray, opponent: np.ndarray, results: np.ndarray) -> float:
+    """Pick K for the starting weights (log-spaced search), as Texel tuning does"""
+    candidates = np.logspace(1, 7, 121)
+    losses = [texel_loss(weights, k, own, opponent, results) for k in candidates]
+    return float(candidates[int(np.argmin(losses))])
+
+
+def fit(own: np.ndarray, opponent: np.ndarray, results: np.ndarray, scale: float,
+        initial: Dict[str, float], iterations: int = 500,
+        learning_rate: float = 0.05, l2: float = 1e-3) -> Tuple[np.ndarray, List[float]]:
+    """
+    Adam on log-weights
+    The L2 term pulls towards the starting weights so patterns that rarely
+    occur in the data keep their prior value
+    """
+    theta = np.log(weight_vector(initial))
+    prior = theta.copy()
+    difference = own - opponent
+    m = np.zeros_like(theta)
+    v = np.zeros_like(theta)
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    history = []
+
+    for step in range(1, iterations + 1):
+        weights = np.exp(theta)
+        predicted = _sigmoid((difference @ weights) / scale)
+        error = predicted - results
+        history.append(float(np.mean(error ** 2)))
+
+        # d loss / d eval, then chain through eval = w.own - w.opp and w = exp(theta)
+        d_eval = 2.0 * error * predicted * (1.0 - predicted) / (scale * len(results))
+        grad = (difference.T @ d_eval) * weights
+        grad += 2.0 * l2 * (theta - prior)
+
+        m = beta1 * m + (1 - beta1) * grad
+        v = beta2 * v + (1 - beta2) * grad * grad
+        m_hat = m / (1 - beta1 ** step)
+        v_hat = v / (1 - beta2 ** step)
+        theta -= learning_rate * m_hat / (np.sqrt(v_hat) + epsilon)
+
+    return np.exp(theta), history
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Fit evaluation weights to recorded games')
+    parser.add_argument('records', nargs='+', help='JSONL game records (gomoku-arena --records)')
+    parser.add_argument('--output', default='weights.json', help='Weights file to write')
+    parser.add_argument('--skip-plies', type=int, default=4,
+                        help='Ignore positions before this ply (and before the random opening ends)')
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--learning-rate', type=float, default=0.05)
+    parser.add_argument('--l2', type=float, default=1e-3, help='Pull towards the starting weights')
+    parser.add_argument('--validation', type=float, default=0.2,
+                        help='Fraction of positions held out to report generalisation')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    boards, sides, results = load_positions(args.records, args.skip_plies)
+    if len(boards) == 0:
+        print('No positions found in the given records', file=sys.stderr)
+        return 1
+    own, opponent = extract_features(boards, sides)
+    # Positions where the side to move can win at once tell us nothing about the weights
+    quiet = own[:, PATTERN_INDEX['win']] == 0
+    own, opponent, results = own[quiet], opponent[quiet], results[quiet]
+    extracted = time.perf_counter() - started
+
+    order = np.random.default_rng(args.seed).permutation(len(results))
+    held_out = int(len(order) * args.validation)
+    test, train = order[:held_out], order[held_out:]
+
+    initial = dict(DEFAULT_WEIGHTS)
+    start_weights = weight_vector(initial)
+    scale = fit_scale(start_weights, own[train], opponent[train], results[train])
+    weights, history = fit(own[train], opponent[train], results[train], scale, initial,
+                           args.iterations, args.learning_rate, args.l2)
+
+    def losses(w: np.ndarray) -> Dict[str, float]:
+        return {
+            'train': round(texel_loss(w, scale, own[train], opponent[train], results[train]), 6),
+            'validation': round(texel_loss(w, scale, own[test], opponent[test], results[test]), 6)
+            if held_out else None,
+        }
+
+    output = {
+        'weights': {name: round(float(value), 3) for name, value in zip(PATTERNS, weights)},
+        'scale': scale,
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'records': args.records,
+            'positions': int(len(results)),
+            'loss_before': losses(start_weights),
+            'loss_after': losses(weights),
+            'extract_s': round(extracted, 3),
+            'fit_s': round(time.perf_counter() - started - extracted, 3),
+        },
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+        f.write('\n')
+    print(json.dumps(output, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,59 +3,317 @@ FastAPI-compatible game views and Socket.IO event handlers
 This module contains all the game logic and Socket.IO event handlers for the Gomoku game
 """
 
+import asyncio
+import functools
+import json
+import threading
+import time
 import socketio
-import numpy as np
-from typing import Dict, Any, Optional, Tuple
-from .helper import Helper
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
 from .game import Game
-from .minimax import generate_next_move
+from .room_ids import RoomIdAllocator
+from .lobby import RoomIndex
+from .minimax import SearchCancelled, search_reply, warm_up
+from .sessions import SessionManager
+from .spectators import SpectatorHub
+from .analysis import AnalysisRequest, AnalysisService, HeatmapRequest, validate_position
+from .heatmap import HeatmapCache
+from .bulk import parse_positions
+from .records import RecordWriter
+from .ratelimit import SearchSlots, TokenBucketLimiter
+from .profiling import profiler, spans
+from . import position_cache
+from .tables import board_shape
+from .protocol import (
+    PROTOCOL_BINARY,
+    PROTOCOL_VERSION,
+    SUPPORTED_PROTOCOLS,
+    delta_message,
+    encode_delta,
+    encode_snapshot,
+    snapshot_message,
+)
 from config import settings
 
 # Game constants
 REMATCH_REQUEST_COMMAND = 'request'
 REMATCH_ACCEPT_COMMAND = 'accept'
 REMATCH_START_COMMAND = 'start_rematch'
-
-def convert_numpy_types(obj):
-    """Convert NumPy types to JSON-serializable types"""
-    if isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, tuple):
-        return tuple(convert_numpy_types(item) for item in obj)
-    elif isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    return obj
+RATE_LIMITED_ERROR = 'Too many requests, slow down'
+NO_HINTS_ERROR = 'No hints left for now, try again later'
+AI_BUSY_ERRORS = {
+    SearchSlots.ROOM_BUSY: 'The computer is still thinking',
+    SearchSlots.SERVER_BUSY: 'Server is busy, try again shortly',
+}
 
 # Store all current games
 games: Dict[int, Game] = {}
+# Room IDs are reserved when a room is created and released on teardown
+room_ids = RoomIdAllocator(settings.max_number_of_room)
+# Lobby listing by game type and state, updated on room events (see game.lobby)
+lobby = RoomIndex((settings.game_type_single, settings.game_type_pvp))
+# Reconnect tokens: dropped players are suspended instead of destroying their room
+sessions = SessionManager(settings.reconnect_grace_period)
+# Read-only viewers, updated in coalesced ticks
+spectators = SpectatorHub(
+    settings.spectator_tick_interval,
+    settings.spectator_max_queue,
+    settings.spectator_drop_after,
+)
+# Position analysis for the HTTP API, searched in worker processes
+analysis = AnalysisService(
+    settings.analysis_workers,
+    settings.analysis_cache_size,
+    settings.analysis_max_depth,
+    settings.analysis_max_beam,
+)
+# Threat heatmaps, per room (updated from the moves since the last request) and per posted position
+heatmaps = HeatmapCache(settings.heatmap_cache_size)
+# Finished games, appended to disk by a background thread
+records = (RecordWriter(settings.records_dir, settings.records_segment_bytes, settings.records_queue_size)
+           if settings.records_dir else None)
+# Flood protection: event budgets per connection and per room (spent by its players only,
+# so outsiders naming a room cannot use it up), admission for AI searches
+sid_limiter = TokenBucketLimiter(settings.rate_limit_rate, settings.rate_limit_burst)
+room_limiter = TokenBucketLimiter(settings.room_rate_limit_rate, settings.room_rate_limit_burst)
+# Moves that start an AI search also need search time left in the connection's budget,
+# charged with each search's duration once it finishes
+ai_limiter = TokenBucketLimiter(settings.ai_time_budget, settings.ai_time_burst)
+ai_slots = SearchSlots(settings.ai_max_searches, settings.ai_max_searches_per_room)
+# AI replies are searched in worker threads so a long search never stalls other rooms
+ai_executor = ThreadPoolExecutor(max_workers=settings.ai_workers, thread_name_prefix='ai-search')
+# Running AI searches per room: the token that stops the search thread and the
+# future play_ai_move awaits, so a search can be abandoned as soon as its reply is moot
+ai_searches: Dict[int, List[Tuple[threading.Event, asyncio.Future]]] = {}
+search_stats = {
+    'searches': 0,
+    'completed': 0,
+    'restarted': 0,
+    'cancelled_disconnect': 0,
+    'cancelled_rematch': 0,
+    'cancelled_closed': 0,
+}
+# Hints: the human's expected reply found by the last AI search, valid while
+# the room is still at `version`; other positions are searched on a tight budget
+hint_cache: Dict[int, Dict[str, Any]] = {}
+hint_limiter = TokenBucketLimiter(settings.hint_rate, settings.hint_burst)
+hint_stats = {
+    'requests': 0,
+    'from_ai_search': 0,
+    'searched': 0,
+    'refused': 0,
+    'stale': 0,
+    'failed': 0,
+}
+limit_stats = {
+    'rate_limited_sid': 0,
+    'rate_limited_room': 0,
+    'ai_room_busy': 0,
+    'ai_server_busy': 0,
+    'ai_rate_limited': 0,
+    'stale_ai_moves': 0,
+}
+# Ends a profiling session once its time is up (profiler also counts its events)
+profile_timer: Optional[asyncio.TimerHandle] = None
+# Wire protocol negotiated by each connection (JSON unless the client opts in)
+protocols: Dict[str, str] = {}
 sio: Optional[socketio.AsyncServer] = None
+# Set once startup() has finished warming up; /ready answers 503 until then
+ready = False
+startup_timings: Dict[str, float] = {}
 
 def set_socketio_server(socketio_server: socketio.AsyncServer) -> None:
     """Set the Socket.IO server instance for use in event handlers"""
     global sio
     sio = socketio_server
+
+def rate_limited(handler: Callable[[str, Any], Awaitable[None]]) -> Callable[[str, Any], Awaitable[None]]:
+    """
+    Refuse the event when its connection has used up its event budget, or,
+    for a player, when the room it names has. Everyone else naming a room
+    (spectators, join attempts) is only limited per connection, so viewers
+    cannot use up a room's budget or queue behind each other. Every refused
+    event gets an error saying how long to wait. Events of a connection are
+    handled one at a time (async_handlers=False), so waiting out the refill
+    here stops the server reading from a flooding client: TCP pushes back on
+    it instead of the server spending CPU on every event
+    """
+    @functools.wraps(handler)
+    async def wrapper(sid: str, data: Any = None) -> None:
+        scope = 'sid'
+        wait = sid_limiter.allow(sid)
+        game_id = data.get('gameID') if isinstance(data, dict) else None
+        game = games.get(game_id) if isinstance(game_id, int) else None
+        if not wait and game is not None and sid in game.player_id:
+            scope = 'room'
+            wait = room_limiter.allow(game_id)
+        if not wait:
+            await handler(sid, data)
+            return
+
+        limit_stats[f'rate_limited_{scope}'] += 1
+        if sio:
+            await sio.emit('error', {
+                'status': 'failed',
+                'error_msg': RATE_LIMITED_ERROR,
+                'retry_after': round(wait, 3),
+            }, room=sid)
+        await asyncio.sleep(wait)
+    return wrapper
+
+def traced(handler: Callable[..., Awaitable[None]]) -> Callable[..., Awaitable[None]]:
+    """
+    Time the handler as a `handler.<event>` span and count the event towards
+    the running profiling session, ending the session at its event limit
+    """
+    timed = spans.timed(f"handler.{handler.__name__[len('handle_'):]}")(handler)
+
+    @functools.wraps(handler)
+    async def wrapper(*args: Any) -> None:
+        try:
+            await timed(*args)
+        finally:
+            if profiler.count_event():
+                stop_profiling()
+    return wrapper
+
+async def emit_move(game: Game, payload: Dict[str, Any], recipients: List[str],
+                    cells: List[Tuple[int, int, int]]) -> None:
+    """
+    Emit a move update to each recipient in its negotiated protocol
+    JSON clients receive `payload`; binary clients receive a delta carrying only `cells`
+    """
+    payload['version'] = game.version
+    binary_payload = None
+    with spans.span('emit.move'):
+        for recipient in recipients:
+            if protocols.get(recipient) == PROTOCOL_BINARY:
+                if binary_payload is None:
+                    binary_payload = encode_delta(
+                        game.version, cells,
+                        game_over=game.game_over,
+                        your_turn=not game.game_over,
+                        winner=game.get_winner(),
+                        winning_line=game.winning_line,
+                    )
+                await sio.emit('move', binary_payload, room=recipient)
+            else:
+                await sio.emit('move', payload, room=recipient)
+    spectators.mark_dirty(game.game_id)
+
+async def emit_snapshot(game: Game, sid: str) -> None:
+    """Send the full game state to one client"""
+    if protocols.get(sid) == PROTOCOL_BINARY:
+        your_turn = not game.game_over and game.current_turn == game.get_player_index(sid)
+        await sio.emit('sync', encode_snapshot(game, your_turn), room=sid)
+    else:
+        await sio.emit('sync', snapshot_message(game), room=sid)
+@traced
 async def handle_connect(sid: str, environ: Dict[str, Any]) -> None:
     """Handle client connection"""
     print(f"Client connected: {sid}")
     print(f"Connection environment: {environ}")
 
+async def send_session(sid: str, game_id: int) -> None:
+    """Issue a reconnect token to a player who just entered a room"""
+    token = sessions.issue(sid, game_id)
+    await sio.emit('session', {
+        'token': token,
+        'game_id': game_id,
+        'grace_period': settings.reconnect_grace_period,
+    }, room=sid)
+
+async def send_sync(game: Game, sid: str, version: Optional[int]) -> None:
+    """
+    Bring a client up to date from the version it last applied
+    Sends a delta when the version belongs to the current game, otherwise a full snapshot
+    """
+    cells = game.moves_since(version) if isinstance(version, int) else None
+    if cells is None:
+        await emit_snapshot(game, sid)
+    elif protocols.get(sid) == PROTOCOL_BINARY:
+        await sio.emit('sync', encode_delta(
+            game.version, cells,
+            game_over=game.game_over,
+            your_turn=game.current_turn == game.get_player_index(sid),
+            winner=game.get_winner(),
+            winning_line=game.winning_line,
+        ), room=sid)
+    else:
+        await sio.emit('sync', delta_message(game.version, cells), room=sid)
+
+def record_game(game: Game, abandoned: bool = False) -> None:
+    """Queue a game for the record store (never blocks)"""
+    if records is not None and game.move_log:
+        records.submit(game, abandoned)
+
+async def teardown_game(game_id: int) -> None:
+    """Delete a room, release its ID and tell the remaining players"""
+    game = games.pop(game_id, None)
+    if game is None:
+        return
+    lobby.remove(game_id)
+    if not game.game_over:
+        record_game(game, abandoned=True)
+    cancel_ai_searches(game_id, 'closed')
+    room_ids.release(game_id)
+    room_limiter.discard(game_id)
+    hint_limiter.discard(game_id)
+    hint_cache.pop(game_id, None)
+    heatmaps.discard(game_id)
+    sessions.discard_game(game_id)
+    if sio:
+        await sio.emit('end_game', '', room=game_id)
+        await spectators.close_game(game_id)
+
+async def leave_current_game(sid: str) -> None:
+    """
+    Close the room a connection is playing in before it creates or joins
+    another, so a client cannot hold more than one room at a time
+    """
+    game_id = sessions.game_id_of(sid)
+    if game_id is not None and game_id in games:
+        await sio.leave_room(sid, game_id)
+        await teardown_game(game_id)
+
+async def expire_session(token: str, game_id: int, deadline: float) -> None:
+    """Tear the room down if the suspended player has not resumed in time"""
+    await sio.sleep(settings.reconnect_grace_period)
+    if sessions.is_expired(token, deadline):
+        await teardown_game(game_id)
+
+@traced
 async def handle_disconnect(sid: str) -> None:
-    """Handle client disconnection"""
+    """
+    Handle client disconnection
+    The player's session is suspended for the grace period instead of destroying the room
+    """
     print(f"Client disconnected: {sid}")
-    # Clean up games when player disconnects
-    for game_id, game in list(games.items()):
-        if game.player_index.get(sid) is not None:
-            del games[game_id]
-            if sio:
-                await sio.emit('end_game', '', room=game_id)
-            break
+    protocols.pop(sid, None)
+    sid_limiter.discard(sid)
+    ai_limiter.discard(sid)
+    spectators.remove_sid(sid)
+    game_id = sessions.game_id_of(sid)
+    if game_id is None or game_id not in games:
+        return
+    # Nobody is left to receive the AI reply; it is searched again on resume
+    cancel_ai_searches(game_id, 'disconnect')
+
+    suspended = sessions.suspend(sid) if settings.reconnect_grace_period > 0 else None
+    if suspended is None:
+        await teardown_game(game_id)
+        return
+
+    token, deadline = suspended
+    if sio:
+        await sio.emit('player_suspended', {
+            'grace_period': settings.reconnect_grace_period,
+        }, room=game_id)
+        sio.start_background_task(expire_session, token, game_id, deadline)
 
+@rate_limited
+@traced
 async def handle_init_game(sid: str, data: Dict[str, Any]) -> None:
     """
     Handle game initialization
@@ -68,6 +326,7 @@ async def handle_init_game(sid: str, data: Dict[str, Any]) -> None:
     game_type = data.get('gameType')
     player_name = data.get('playerName')
     game_id = data.get('gameID')
+    board_size = parse_board_size(data.get('boardSize'))
     error_msg = ''
 
     if not game_id:
@@ -76,35 +335,47 @@ async def handle_init_game(sid: str, data: Dict[str, Any]) -> None:
         error_msg = 'Missing game type'
     elif not player_name:
         error_msg = 'Missing player name'
-    elif games.get(game_id):
+    elif board_size is None:
+        error_msg = 'Unsupported board size'
+    elif not room_ids.is_free(game_id):
         error_msg = 'Cannot create, room exists'
+    elif game_type not in (settings.game_type_single, settings.game_type_pvp):
+        error_msg = 'Unrecognized game type'
     else:
+        await leave_current_game(sid)
+        rows, cols = board_size
         if game_type == settings.game_type_single:
             # Create single player game
-            game = Game(game_id, game_type)
+            game = Game(game_id, game_type, rows, cols)
             game.add_player(sid, player_name)
             game.add_player(settings.ai_id, 'Computer')
+            room_ids.reserve(game_id)
             await sio.enter_room(sid, game_id)
             
             games[game_id] = game
-            await sio.emit('start_game', {'status': 'success'}, room=sid)
+            lobby.update(game)
+            await send_session(sid, game_id)
+            await sio.emit('start_game', {'status': 'success', 'rows': rows, 'cols': cols}, room=sid)
             return
 
         elif game_type == settings.game_type_pvp:
             # Create PvP game
-            game = Game(game_id, game_type)
+            game = Game(game_id, game_type, rows, cols)
             game.add_player(sid, player_name)
+            room_ids.reserve(game_id)
             games[game_id] = game
+            lobby.update(game)
             await sio.enter_room(sid, game_id)
-        else:
-            error_msg = 'Unrecognized game type'
+            await send_session(sid, game_id)
 
     if error_msg:
-        await sio.emit('error', convert_numpy_types({
+        await sio.emit('error', {
             'status': 'failed',
             'error_msg': error_msg,
-        }), room=sid)
+        }, room=sid)
 
+@rate_limited
+@traced
 async def handle_join_current_game(sid: str, data: Dict[str, Any]) -> None:
     """
     Handle joining existing PvP game
@@ -123,9 +394,13 @@ async def handle_join_current_game(sid: str, data: Dict[str, Any]) -> None:
     elif not games.get(game_id):
         error_msg = 'Cannot join, room does not exist'
     else:
+        if sessions.game_id_of(sid) != game_id:
+            await leave_current_game(sid)
         game = games[game_id]
         game.add_player(sid, player_name)
+        lobby.update(game)
         await sio.enter_room(sid, game_id)
+        await send_session(sid, game_id)
         
         await sio.emit('start_game', {
             'status': 'success',
@@ -133,15 +408,22 @@ async def handle_join_current_game(sid: str, data: Dict[str, Any]) -> None:
                 'player_1': game.player_names[0],
                 'player_2': game.player_names[1],
             },
-            'turn': game.current_turn
+            'turn': game.current_turn,
+            'rows': game.rows,
+            'cols': game.cols,
         }, room=game_id)
+        for player_id in game.player_id:
+            if protocols.get(player_id) == PROTOCOL_BINARY:
+                await emit_snapshot(game, player_id)
 
     if error_msg:
-        await sio.emit('error', convert_numpy_types({
+        await sio.emit('error', {
             'status': 'failed',
             'error_msg': error_msg,
-        }), room=sid)
+        }, room=sid)
 
+@rate_limited
+@traced
 async def handle_move(sid: str, data: Dict[str, Any]) -> None:
     """
     Handle game moves
@@ -162,69 +444,155 @@ async def handle_move(sid: str, data: Dict[str, Any]) -> None:
     else:
         game = games[game_id]
         move_index = data['moveIndex']
+        start_version = game.version
         
         if game.game_type == settings.game_type_single:
-            # Single player mode
-            if game.process_move(player_id, move_index):
-                if game.game_over:
-                    await sio.emit('move', convert_numpy_types({
-                        'status': 'success',
-                        'game_over': True,
-                        'winner': 1 if game.winning_line else 0,
-                        'winning_line': game.winning_line,
-                        'move_index': [],
-                    }), room=player_id)
-                else:
-                    # AI move
-                    ai_move = generate_next_move(game, move_index)
-                    print(f"AI move: {ai_move} -- class: {type(ai_move)}")
-                    if ai_move:
-                        game.process_move(settings.ai_id, ai_move)
+            # Single player mode: the slot is taken before the move so a refused
+            # move leaves the board untouched. The AI reply is searched in the
+            # background, which releases the slot when it is done
+            refused = ai_slots.acquire(game_id)
+            if refused:
+                limit_stats[f'ai_{refused}_busy'] += 1
+                error_msg = AI_BUSY_ERRORS[refused]
+            elif ai_limiter.allow(sid, cost=0.0):
+                ai_slots.release(game_id)
+                limit_stats['ai_rate_limited'] += 1
+                error_msg = RATE_LIMITED_ERROR
+            else:
+                searching = False
+                try:
+                    if game.process_move(player_id, move_index):
                         if game.game_over:
-                            await sio.emit('move', convert_numpy_types({
+                            await emit_move(game, {
                                 'status': 'success',
                                 'game_over': True,
-                                'winner': 2,
+                                'winner': 1 if game.winning_line else 0,
                                 'winning_line': game.winning_line,
-                                'move_index': ai_move,
-                            }), room=player_id)
+                                'move_index': [],
+                            }, [player_id], game.moves_since(start_version))
                         else:
-                            await sio.emit('move', convert_numpy_types({
-                                'status': 'success',
-                                'game_over': False,
-                                'your_turn': True,
-                                'move_index': ai_move,
-                            }), room=player_id)
-            else:
-                error_msg = 'Invalid Move'
+                            sio.start_background_task(play_ai_move, game, player_id, move_index, start_version)
+                            searching = True
+                    else:
+                        error_msg = 'Invalid Move'
+                finally:
+                    if not searching:
+                        ai_slots.release(game_id)
         else:
             # PvP mode
             if game.process_move(player_id, move_index):
                 if game.game_over:
                     winner_index = game.get_player_index(player_id)
-                    await sio.emit('move', convert_numpy_types({
+                    await emit_move(game, {
                         'status': 'success',
                         'game_over': True,
                         'winner': winner_index if game.winning_line else False,
                         'winning_line': game.winning_line,
                         'move_index': move_index,
-                    }), room=game_id)
+                    }, game.player_id, game.moves_since(start_version))
                 else:
                     opponent_id = game.get_opponent_id(player_id)
-                    await sio.emit('move', convert_numpy_types({
+                    await emit_move(game, {
                         'status': 'success',
                         'game_over': False,
                         'move_index': move_index,
-                    }), room=opponent_id)
+                    }, [opponent_id], game.moves_since(start_version))
             else:
                 error_msg = 'Invalid Move'
 
+        if game.game_over and game.version != start_version:
+            record_game(game)
+            lobby.update(game)
+
     if error_msg:
-        await sio.emit('error', convert_numpy_types({
+        await sio.emit('error', {
             'status': 'failed',
             'error_msg': error_msg,
-        }), room=game_id)
+        }, room=game_id)
+
+def timed_search(game_board, move_index: Tuple[int, int],
+                 cancel: threading.Event) -> Tuple[Dict[str, Any], float]:
+    """Worker thread entry point: the AI reply (see search_reply) and the seconds spent searching it"""
+    started = time.perf_counter()
+    result = profiler.call(search_reply, game_board, move_index, cancel)
+    return result, time.perf_counter() - started
+
+def cancel_ai_searches(game_id: int, reason: str) -> int:
+    """
+    Abandon the AI searches running for a room
+    The search thread stops at its next node and play_ai_move returns at
+    once, releasing the room's search slot without waiting for the thread
+    :return: number of searches cancelled
+    """
+    running = ai_searches.pop(game_id, [])
+    for cancel, future in running:
+        cancel.set()
+        future.cancel()
+    search_stats[f'cancelled_{reason}'] += len(running)
+    return len(running)
+
+async def play_ai_move(game: Game, player_id: str, move_index: Tuple[int, int], start_version: int) -> None:
+    """
+    Search the AI reply in a worker thread and play it, unless the room was
+    rematched or closed while the search ran. Holds the room's search slot
+    taken by handle_move until the reply is sent
+    """
+    searched_version = game.version
+    cancel = threading.Event()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(ai_executor, timed_search, game.game_board.copy(), move_index, cancel)
+    search = (cancel, future)
+    ai_searches.setdefault(game.game_id, []).append(search)
+    search_stats['searches'] += 1
+    try:
+        try:
+            result, elapsed = await future
+        except (SearchCancelled, asyncio.CancelledError):
+            if not cancel.is_set():
+                raise   # the task itself is being cancelled
+            return
+        search_stats['completed'] += 1
+        ai_limiter.charge(player_id, elapsed)
+        if games.get(game.game_id) is not game or game.version != searched_version:
+            limit_stats['stale_ai_moves'] += 1
+            return
 
+        ai_move = result['move']
+        if ai_move:
+            game.process_move(settings.ai_id, ai_move)
+            if result['reply'] and not game.game_over:
+                hint_cache[game.game_id] = {
+                    'version': game.version,
+                    'move': list(result['reply']),
+                    'score': -result['score'],
+                }
+            if game.game_over:
+                await emit_move(game, {
+                    'status': 'success',
+                    'game_over': True,
+                    'winner': 2,
+                    'winning_line': game.winning_line,
+                    'move_index': ai_move,
+                }, [player_id], game.moves_since(start_version))
+                record_game(game)
+                lobby.update(game)
+            else:
+                await emit_move(game, {
+                    'status': 'success',
+                    'game_over': False,
+                    'your_turn': True,
+                    'move_index': ai_move,
+                }, [player_id], game.moves_since(start_version))
+    finally:
+        running = ai_searches.get(game.game_id)
+        if running and search in running:
+            running.remove(search)
+            if not running:
+                del ai_searches[game.game_id]
+        ai_slots.release(game.game_id)
+
+@rate_limited
+@traced
 async def handle_rematch(sid: str, data: Dict[str, Any]) -> None:
     """
     Handle rematch requests
@@ -245,10 +613,14 @@ async def handle_rematch(sid: str, data: Dict[str, Any]) -> None:
         game = games[game_id]
         if game.game_type == settings.game_type_single:
             if command == REMATCH_REQUEST_COMMAND:
+                cancel_ai_searches(game_id, 'rematch')
                 game.rematch()
+                lobby.update(game)
+                spectators.mark_dirty(game_id)
                 await sio.emit('rematch', {
                     'status': 'success',
                     'your_turn': True,
+                    'version': game.version,
                 }, room=player_id)
         elif game.game_type == settings.game_type_pvp:
             opponent_id = game.get_opponent_id(player_id)
@@ -259,23 +631,271 @@ async def handle_rematch(sid: str, data: Dict[str, Any]) -> None:
                 }, room=opponent_id)
             elif command == REMATCH_ACCEPT_COMMAND:
                 game.rematch()
+                lobby.update(game)
                 player_turn = 1 if game.number_of_games % 2 else 2
                 game.current_turn = player_turn
+                spectators.mark_dirty(game_id)
                 
                 await sio.emit('rematch', {
                     'status': 'success',
                     'command': REMATCH_START_COMMAND,
-                    'player_turn': player_turn
+                    'player_turn': player_turn,
+                    'version': game.version,
                 }, room=game_id)
             else:
                 error_msg = 'Unknown command'
 
     if error_msg:
-        await sio.emit('error', convert_numpy_types({
+        await sio.emit('error', {
             'status': 'failed',
             'error_msg': error_msg,
-        }), room=sid)
+        }, room=sid)
+
+@rate_limited
+@traced
+async def handle_set_protocol(sid: str, data: Dict[str, Any]) -> None:
+    """
+    Negotiate the wire protocol for this connection ('json' or 'binary')
+    """
+    if not sio:
+        return
 
+    protocol = data.get('protocol') if isinstance(data, dict) else None
+    if protocol not in SUPPORTED_PROTOCOLS:
+        await sio.emit('error', {
+            'status': 'failed',
+            'error_msg': 'Unsupported protocol',
+        }, room=sid)
+        return
+
+    protocols[sid] = protocol
+    await sio.emit('protocol', {
+        'status': 'success',
+        'protocol': protocol,
+        'version': PROTOCOL_VERSION,
+    }, room=sid)
+
+@rate_limited
+@traced
+async def handle_resync(sid: str, data: Dict[str, Any]) -> None:
+    """
+    Handle a client asking for the moves it missed
+    """
+    if not sio:
+        return
+
+    game_id = data.get('gameID')
+    game = games.get(game_id)
+    error_msg = ''
+
+    if not game_id:
+        error_msg = 'Missing game ID'
+    elif game is None:
+        error_msg = 'Room does not exist'
+    elif game.get_player_index(sid) is None:
+        error_msg = 'Not a player of this room'
+    else:
+        await send_sync(game, sid, data.get('version'))
+
+    if error_msg:
+        await sio.emit('error', {
+            'status': 'failed',
+            'error_msg': error_msg,
+        }, room=sid)
+
+@rate_limited
+@traced
+async def handle_resume_session(sid: str, data: Dict[str, Any]) -> None:
+    """
+    Handle a player reconnecting with its session token
+    The new connection takes the player's seat, then receives the game state
+    (delta from `version` when given, otherwise a full snapshot)
+    """
+    if not sio:
+        return
+
+    token = data.get('token') if isinstance(data, dict) else None
+    resumed = sessions.resume(token, sid) if token else None
+
+    if resumed is None or resumed[0] not in games:
+        await sio.emit('error', {
+            'status': 'failed',
+            'error_msg': 'Session expired',
+        }, room=sid)
+        return
+
+    game_id, old_sid = resumed
+    game = games[game_id]
+    game.replace_player(old_sid, sid)
+    await sio.enter_room(sid, game_id)
+
+    player_index = game.get_player_index(sid)
+    await sio.emit('resume', {
+        'status': 'success',
+        'game_id': game_id,
+        'game_type': game.game_type,
+        'player_index': player_index,
+        'player_names': game.player_names,
+        'turn': game.current_turn,
+    }, room=sid)
+    await send_sync(game, sid, data.get('version'))
+    await sio.emit('player_resumed', {'player_index': player_index}, room=game_id, skip_sid=sid)
+
+    # The AI reply cancelled when the player dropped is still owed
+    if (game.game_type == settings.game_type_single and not game.game_over
+            and game.current_turn == 2 and not ai_searches.get(game_id)
+            and ai_slots.acquire(game_id, force=True) is None):
+        search_stats['restarted'] += 1
+        sio.start_background_task(play_ai_move, game, sid, None, game.version)
+
+@rate_limited
+@traced
+async def handle_hint(sid: str, data: Dict[str, Any]) -> None:
+    """
+    Suggest a move to the player whose turn it is, in single-player games
+    The answer comes from the last AI search when it already looked at this
+    position, otherwise from a shallow search in the analysis pool, so the
+    handler never waits on a search. Each room has a hint budget. Replies,
+    refusals included, go out as 'hint' events so they never end the game
+    """
+    if not sio:
+        return
+
+    hint_stats['requests'] += 1
+    game_id = data.get('gameID') if isinstance(data, dict) else None
+    game = games.get(game_id)
+    player_index = game.get_player_index(sid) if game is not None else None
+    error_msg = ''
+    retry_after = 0.0
+
+    if game is None:
+        error_msg = 'Room does not exist'
+    elif player_index is None:
+        error_msg = 'Not a player of this room'
+    elif game.game_type != settings.game_type_single:
+        error_msg = 'Hints are only available against the AI'
+    elif game.game_over:
+        error_msg = 'The game is over'
+    elif game.current_turn != player_index:
+        error_msg = 'Not your turn'
+    else:
+        retry_after = hint_limiter.allow(game_id)
+        if retry_after:
+            hint_stats['refused'] += 1
+            error_msg = NO_HINTS_ERROR
+
+    if error_msg:
+        await sio.emit('hint', {
+            'status': 'failed',
+            'error_msg': error_msg,
+            'retry_after': round(retry_after, 3),
+        }, room=sid)
+        return
+
+    cached = hint_cache.get(game_id)
+    if cached is not None and cached['version'] == game.version:
+        hint_stats['from_ai_search'] += 1
+        await sio.emit('hint', {
+            'status': 'success',
+            'move_index': cached['move'],
+            'score': cached['score'],
+            'source': 'ai_search',
+            'version': game.version,
+        }, room=sid)
+        return
+
+    sio.start_background_task(search_hint, game, sid, player_index)
+
+async def search_hint(game: Game, sid: str, player_index: int) -> None:
+    """
+    Search a hint on the analysis pool's tight hint budget and send it, unless
+    the position changed in the meantime
+    """
+    version = game.version
+    request = AnalysisRequest(
+        board=game.game_board.tolist(),
+        side=player_index,
+        depth=settings.hint_search_depth,
+        beam=settings.hint_beam_width,
+    )
+    try:
+        result = await analysis.analyze(request)
+    except Exception as e:
+        hint_stats['failed'] += 1
+        print(f"Hint search failed in room {game.game_id}: {e}")
+        await sio.emit('hint', {'status': 'failed', 'error_msg': 'No hint available'}, room=sid)
+        return
+    if games.get(game.game_id) is not game or game.version != version:
+        hint_stats['stale'] += 1
+        return
+
+    hint_stats['searched'] += 1
+    await sio.emit('hint', {
+        'status': 'success',
+        'move_index': result['best_move'],
+        'score': result['score'],
+        'source': 'search' if result['source'] == 'search' else 'cache',
+        'version': version,
+    }, room=sid)
+
+@rate_limited
+@traced
+async def handle_heatmap(sid: str, data: Dict[str, Any]) -> None:
+    """
+    Send a player the threat heatmap of its room's position: per-cell threat
+    scores for both players (see game.heatmap)
+    """
+    if not sio:
+        return
+
+    game_id = data.get('gameID') if isinstance(data, dict) else None
+    game = games.get(game_id)
+    error_msg = ''
+
+    if game is None:
+        error_msg = 'Room does not exist'
+    elif game.get_player_index(sid) is None:
+        error_msg = 'Not a player of this room'
+
+    if error_msg:
+        await sio.emit('error', {
+            'status': 'failed',
+            'error_msg': error_msg,
+        }, room=sid)
+        return
+
+    await sio.emit('heatmap', dict(heatmaps.for_game(game), status='success', version=game.version), room=sid)
+
+@rate_limited
+@traced
+async def handle_spectate(sid: str, data: Dict[str, Any]) -> None:
+    """
+    Subscribe to a room as a read-only viewer
+    The viewer gets a snapshot now and coalesced updates on every broadcast tick
+    """
+    if not sio:
+        return
+
+    game_id = data.get('gameID') if isinstance(data, dict) else None
+    game = games.get(game_id)
+
+    if game is None:
+        await sio.emit('error', {
+            'status': 'failed',
+            'error_msg': 'Room does not exist',
+        }, room=sid)
+        return
+
+    spectators.start(sio, games)
+    await spectators.add(sid, game, protocols.get(sid))
+
+@rate_limited
+@traced
+async def handle_stop_spectating(sid: str, data: Any = None) -> None:
+    """Leave the room currently being watched"""
+    spectators.remove_sid(sid)
+
+@traced
 async def handle_disconnect_request(sid: str) -> None:
     """Handle disconnect request"""
     if sio:
@@ -284,49 +904,184 @@ async def handle_disconnect_request(sid: str) -> None:
 # Game utility functions
 def generate_game_id() -> int:
     """
-    Generate a unique game ID
+    Propose a free game ID in O(1)
+    The ID is only reserved once the room is actually created in handle_init_game
     """
-    try_times = 0
-    while True:
-        try_times += 1
-        game_id = Helper.generate_random_number()
-
-        if games.get(game_id) is None:
-            break
-    
-        if try_times >= settings.max_number_of_room:
-            game_id = -1
-            break
+    return room_ids.peek()
 
-    return game_id
+def parse_board_size(size: Any) -> Optional[Tuple[int, int]]:
+    """
+    Board dimensions requested by a client (N or [rows, cols])
+    Returns the default size when none is given, None when it is not allowed
+    """
+    if size is None:
+        return settings.number_of_row, settings.number_of_col
+    try:
+        rows, cols = board_shape(size)
+    except (TypeError, ValueError):
+        return None
+    if rows != cols or rows not in settings.board_sizes:
+        return None
+    return rows, cols
 
-def get_game_context() -> Dict[str, Any]:
+def get_game_context(size: Optional[int] = None) -> Dict[str, Any]:
     """
     Get context data for the game template
+    The page only depends on the board size, so it is rendered once per size;
+    the start form fetches a proposed room ID from /api/game-id
     """
-    game_id = generate_game_id()
+    rows, cols = parse_board_size(size) or parse_board_size(None)
     return {
-        'game_id': game_id,
-        'num_of_cells_background': range(14),
-        'num_of_cells_board': range(15),
+        'board_size': rows,
+        'board_sizes': settings.board_sizes,
+        'num_of_cells_background': range(rows - 1),
+        'num_of_cells_board': range(cols),
     }
 
-def get_active_games() -> Dict[str, Any]:
+def get_active_games(game_type: Optional[str] = None, state: Optional[str] = None,
+                     cursor: Optional[int] = None, limit: int = 50) -> Dict[str, Any]:
     """
-    Get information about active games
+    Get a page of active games, optionally of one type and state
+    ('waiting', 'in_progress' or 'finished'), with the room counts. Pass
+    `next_cursor` back as `cursor` for the following page; raises ValueError
+    for unknown filters
     """
+    game_ids, next_cursor = lobby.page(game_type, state, cursor, min(limit, settings.lobby_page_limit))
+    page = []
+    for game_id in game_ids:
+        game = games[game_id]
+        page.append({
+            'id': game_id,
+            'type': game.game_type,
+            'state': lobby.keys[game_id][1],
+            'players': len(game.player_id),
+            'moves': game.number_of_moves,
+            'size': [game.rows, game.cols],
+            'game_over': game.game_over
+        })
     return {
         'total_games': len(games),
-        'games': [
-            {
-                'id': game_id,
-                'type': game.game_type,
-                'players': len(game.player_id),
-                'moves': game.number_of_moves,
-                'game_over': game.game_over
-            }
-            for game_id, game in games.items()
-        ]
+        'counts': lobby.counts(),
+        'games': page,
+        'next_cursor': next_cursor,
+    }
+
+async def analyze_position(request: AnalysisRequest) -> Dict[str, Any]:
+    """
+    Best move, score and principal variation for a posted position
+    Raises ValueError when the position is invalid
+    """
+    return await analysis.analyze(request)
+
+def get_heatmap(request: HeatmapRequest) -> Dict[str, Any]:
+    """Threat heatmap of a posted position; raises ValueError for invalid boards"""
+    return heatmaps.for_board(validate_position(request.board, 1))
+
+async def stream_bulk_analysis(chunks: AsyncIterator[bytes], content_type: str,
+                               depth: Optional[int] = None,
+                               beam: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Analyse an uploaded stream of positions (NDJSON or binary records)
+    Yields one NDJSON line per result as soon as it is ready, then a summary line
+    """
+    positions = parse_positions(chunks, content_type, depth, beam)
+    try:
+        async for result in analysis.analyze_stream(positions, settings.bulk_max_inflight):
+            yield json.dumps(result).encode() + b'\n'
+    except ValueError as e:
+        yield json.dumps({'done': True, 'error': str(e)}).encode() + b'\n'
+
+async def startup() -> None:
+    """
+    Prepare what the first requests would otherwise pay for: engine tables for
+    every board size, the analysis worker pool, the spectator tick and the
+    record writer. Run by the app's lifespan hook before it accepts traffic
+    """
+    global ready
+    started = time.perf_counter()
+    # Before the analysis pool starts, so its workers attach to the cache
+    if settings.position_cache_entries > 0:
+        position_cache.create(settings.position_cache_entries)
+        startup_timings['position_cache'] = position_cache.warm_load(settings.position_cache_file)
+    if settings.startup_prewarm:
+        startup_timings['engine_ms'] = round(warm_up(settings.board_sizes) * 1000.0, 3)
+        startup_timings['analysis_pool_ms'] = round(await analysis.warm_up(settings.board_sizes) * 1000.0, 3)
+    if sio:
+        spectators.start(sio, games)
+    if records is not None:
+        records.start()
+    startup_timings['total_ms'] = round((time.perf_counter() - started) * 1000.0, 3)
+    ready = True
+
+async def shutdown() -> None:
+    """Stop background work and flush queued game records"""
+    global ready
+    ready = False
+    spectators.stop()
+    analysis.shutdown()
+    for game_id in list(ai_searches):
+        cancel_ai_searches(game_id, 'closed')
+    ai_executor.shutdown(wait=False, cancel_futures=True)
+    stop_profiling()
+    save_position_cache()
+    position_cache.release()
+    if records is not None:
+        records.stop()
+
+def save_position_cache() -> None:
+    """Write the shared position cache to position_cache_file for the next start"""
+    if position_cache.shared is None or not settings.position_cache_file:
+        return
+    try:
+        position_cache.shared.save(settings.position_cache_file)
+    except OSError as e:
+        print(f'Position cache not saved to {settings.position_cache_file}: {e}')
+
+def start_profiling(mode: str, seconds: Optional[float] = None, events: Optional[int] = None,
+                    interval_ms: float = 5.0) -> Dict[str, Any]:
+    """
+    Start a profiling session of this server process; it ends after `seconds`
+    (at most profile_max_seconds), after `events` handled Socket.IO events,
+    or when stopped. Raises ValueError for bad options or a running session
+    """
+    global profile_timer
+    seconds = min(seconds or settings.profile_max_seconds, settings.profile_max_seconds)
+    status = profiler.start(mode, seconds, events, interval_ms / 1000.0)
+    profile_timer = asyncio.get_running_loop().call_later(seconds, stop_profiling)
+    return status
+
+def stop_profiling() -> Dict[str, Any]:
+    """End the running profiling session, keeping its result for download"""
+    global profile_timer
+    if profile_timer is not None:
+        profile_timer.cancel()
+        profile_timer = None
+    return profiler.stop()
+
+def get_profiling_status(reset_spans: bool = False) -> Dict[str, Any]:
+    """
+    The profiling session and the timing spans collected since start (or the last reset)
+    """
+    status = dict(profiler.get_status(), spans=spans.snapshot())
+    if reset_spans:
+        spans.reset()
+    return status
+
+def get_profile_result() -> Optional[Tuple[bytes, str]]:
+    """
+    The last finished session's result and its format ('pstats' or 'folded'), if any
+    """
+    if profiler.result is None:
+        return None
+    return profiler.result, profiler.result_format
+
+def get_readiness_status() -> Dict[str, Any]:
+    """
+    Whether this instance has finished warming up and can take traffic
+    """
+    return {
+        'ready': ready,
+        'startup': dict(startup_timings),
     }
 
 def get_health_status() -> Dict[str, Any]:
@@ -335,6 +1090,19 @@ def get_health_status() -> Dict[str, Any]:
     """
     return {
         'status': 'healthy',
+        'ready': ready,
         'games_active': len(games),
+        'sessions': dict(sessions.stats),
+        'spectators': spectators.get_stats(),
+        'analysis': analysis.get_stats(),
+        'heatmaps': heatmaps.get_stats(),
+        'position_cache': position_cache.shared.get_stats() if position_cache.shared else None,
+        'records': records.get_stats() if records else None,
+        'limits': dict(limit_stats,
+                       ai_searches=ai_slots.active,
+                       ai_searches_peak=ai_slots.peak,
+                       tracked_connections=len(sid_limiter)),
+        'ai': dict(search_stats, running=sum(map(len, ai_searches.values()))),
+        'hints': dict(hint_stats, cached=len(hint_cache)),
         'version': settings.version
     }
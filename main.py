@@ -3,18 +3,20 @@ FastAPI Gomoku Game Application
 Main application entry point
 """
 
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+import hmac
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
-import eventlet
-import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Optional
 
 from config import settings
+from game.analysis import AnalysisRequest, HeatmapRequest
+from game.assets import DIST_DIR, PageCache, PrecompressedStaticFiles, asset_url
 from game.views import (
     set_socketio_server,
     handle_connect,
@@ -23,17 +25,70 @@ from game.views import (
     handle_join_current_game,
     handle_move,
     handle_rematch,
+    handle_set_protocol,
+    handle_resync,
+    handle_resume_session,
+    handle_hint,
+    handle_heatmap,
+    handle_spectate,
+    handle_stop_spectating,
     handle_disconnect_request,
     get_game_context,
+    generate_game_id,
     get_active_games,
-    get_health_status
+    get_health_status,
+    get_readiness_status,
+    startup,
+    shutdown,
+    analyze_position,
+    get_heatmap,
+    stream_bulk_analysis,
+    start_profiling,
+    stop_profiling,
+    get_profiling_status,
+    get_profile_result,
 )
 
+PROFILE_DOWNLOADS = {
+    'pstats': ('application/octet-stream', 'gomoku.pstats'),
+    'folded': ('text/plain', 'gomoku.folded'),
+}
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streaming response that may start while the request body is still being read
+    StreamingResponse listens for client disconnects on the same receive channel,
+    which would swallow the remaining body messages of a streamed upload
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+def require_admin(x_admin_token: Optional[str] = Header(None), authorization: Optional[str] = Header(None)):
+    """
+    Admin endpoints do not exist unless ADMIN_TOKEN is set, and need the token
+    in an X-Admin-Token or `Authorization: Bearer` header
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = x_admin_token
+    if token is None and authorization and authorization.startswith("Bearer "):
+        token = authorization[len("Bearer "):]
+    if token is None or not hmac.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the engine and worker pools before serving, stop background work on exit"""
+    await startup()
+    yield
+    await shutdown()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.version,
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -46,9 +101,12 @@ app.add_middleware(
 )
 
 # Create Socket.IO server
+# Events of one connection are handled in order, one at a time: a rate limited
+# client is slowed down by not reading from it (see game.views.rate_limited)
 sio = socketio.AsyncServer(
-    async_mode='asgi',
-    cors_allowed_origins='*'
+    async_mode=settings.async_mode,
+    cors_allowed_origins='*',
+    async_handlers=False,
 )
 
 # Create Socket.IO app
@@ -58,10 +116,16 @@ socket_app = socketio.ASGIApp(sio, app)
 static_path = Path(__file__).parent / "static"
 templates_path = Path(__file__).parent / "templates"
 
+# Hashed builds (python -m game.assets) are mounted first so /static does not shadow them
+if DIST_DIR.exists():
+    app.mount("/static/dist", PrecompressedStaticFiles(directory=str(DIST_DIR)), name="dist")
 if static_path.exists():
     app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
 
 templates = Jinja2Templates(directory=str(templates_path))
+templates.env.globals['asset_url'] = asset_url
+# Rendered index pages per board size
+index_pages = PageCache()
 
 # Set up Socket.IO server in views module
 set_socketio_server(sio)
@@ -97,6 +161,41 @@ async def rematch(sid, data):
     print(f"Socket.IO rematch event: {sid}, {data}")
     await handle_rematch(sid, data)
 
+@sio.event
+async def set_protocol(sid, data):
+    print(f"Socket.IO set_protocol event: {sid}, {data}")
+    await handle_set_protocol(sid, data)
+
+@sio.event
+async def resync(sid, data):
+    print(f"Socket.IO resync event: {sid}, {data}")
+    await handle_resync(sid, data)
+
+@sio.event
+async def resume_session(sid, data):
+    print(f"Socket.IO resume_session event: {sid}")
+    await handle_resume_session(sid, data)
+
+@sio.event
+async def hint(sid, data):
+    print(f"Socket.IO hint event: {sid}, {data}")
+    await handle_hint(sid, data)
+
+@sio.event
+async def heatmap(sid, data):
+    print(f"Socket.IO heatmap event: {sid}, {data}")
+    await handle_heatmap(sid, data)
+
+@sio.event
+async def spectate(sid, data):
+    print(f"Socket.IO spectate event: {sid}, {data}")
+    await handle_spectate(sid, data)
+
+@sio.event
+async def stop_spectating(sid):
+    print(f"Socket.IO stop_spectating event: {sid}")
+    await handle_stop_spectating(sid)
+
 @sio.event
 async def disconnect_request(sid):
     print(f"Socket.IO disconnect_request event: {sid}")
@@ -104,36 +203,101 @@ async def disconnect_request(sid):
 
 # FastAPI routes
 @app.get("/", response_class=HTMLResponse)
-async def index(request: Request):
-    """Main page route"""
-    context = get_game_context()
-    return templates.TemplateResponse("board_game.html", {
-        "request": request,
-        **context
-    })
+async def index(request: Request, size: Optional[int] = None):
+    """Main page route (?size=19 renders a 19x19 board)"""
+    context = get_game_context(size)
+    page = index_pages.get(context['board_size'], lambda: templates.get_template("board_game.html").render(context))
+    return index_pages.response(page, request.headers)
+
+@app.get("/api/game-id")
+async def propose_game_id():
+    """A free room ID for the start form, reserved only once the room is created"""
+    return JSONResponse({'game_id': generate_game_id()}, headers={'Cache-Control': 'no-store'})
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return get_health_status()
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until startup warm-up has finished"""
+    status = get_readiness_status()
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
 @app.get("/api/games")
-async def get_games():
-    """API endpoint to get active games"""
-    return get_active_games()
-
-# WebSocket endpoint for Socket.IO
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for Socket.IO"""
-    await websocket.accept()
+async def get_games(game_type: Optional[str] = Query(None, alias="type"), state: Optional[str] = None,
+                    cursor: Optional[int] = None, limit: int = 50):
+    """
+    API endpoint to get active games, a page at a time: ?type=pvp&state=waiting,
+    then ?cursor=<next_cursor> for the next page
+    """
+    try:
+        return get_active_games(game_type, state, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/analyze")
+async def analyze(request: AnalysisRequest):
+    """Analyse a position: best move, score, principal variation and search stats"""
     try:
-        while True:
-            data = await websocket.receive_text()
-            # Handle WebSocket messages if needed
-            await websocket.send_text(f"Message received: {data}")
-    except WebSocketDisconnect:
-        print("WebSocket disconnected")
+        return await analyze_position(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/heatmap")
+async def heatmap_position(request: HeatmapRequest):
+    """Per-cell threat scores of a position for both players"""
+    try:
+        return get_heatmap(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/analyze/bulk")
+async def analyze_bulk(request: Request, depth: Optional[int] = None, beam: Optional[int] = None):
+    """
+    Analyse a stream of positions: NDJSON lines, or 226-byte binary records
+    with Content-Type application/octet-stream. Results stream back as NDJSON
+    in completion order, each tagged with the position's input index
+    """
+    return DuplexStreamingResponse(
+        stream_bulk_analysis(request.stream(), request.headers.get("content-type", ""), depth, beam),
+        media_type="application/x-ndjson",
+    )
+
+# Admin routes
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_start(mode: str = "sample", seconds: Optional[float] = None, events: Optional[int] = None,
+                        interval_ms: float = 5.0):
+    """
+    Profile the running server for `seconds` or `events` handled Socket.IO
+    events: mode=cprofile (pstats) or mode=sample (folded stacks every interval_ms)
+    """
+    try:
+        return start_profiling(mode, seconds, events, interval_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+async def profile_stop():
+    """End the running profiling session early"""
+    return stop_profiling()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_status(reset_spans: bool = False):
+    """Profiling session status and the timing spans of the engine and event handlers"""
+    return get_profiling_status(reset_spans)
+
+@app.get("/admin/profile/result", dependencies=[Depends(require_admin)])
+async def profile_result():
+    """Download the last finished session: a pstats file or folded stacks"""
+    result = get_profile_result()
+    if result is None:
+        raise HTTPException(status_code=404, detail="No finished profiling session")
+    data, fmt = result
+    media_type, filename = PROFILE_DOWNLOADS[fmt]
+    return Response(data, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 if __name__ == "__main__":
     import uvicorn
@@ -25,9 +25,19 @@ setup(
     author='Original Author + Contributors',
     author_email='',
     url='https://github.com/yourusername/python-gomoku',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     include_package_data=True,
     install_requires=read_requirements(),
+    extras_require={
+        'assets': [
+            'brotli>=1.1.0',
+        ],
+        'bench': [
+            'aiohttp>=3.9.0',
+            'psutil>=5.9.0',
+            'pytest-benchmark>=4.0.0',
+        ],
+    },
     python_requires='>=3.11',
     classifiers=[
         'Development Status :: 4 - Beta',
@@ -49,6 +59,7 @@ setup(
     entry_points={
         'console_scripts': [
             'gomoku=manage:main',
+            'gomoku-arena=game.arena:main',
         ],
     },
 ) 
\ No newline at end of file
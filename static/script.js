@@ -20,6 +20,9 @@ const initialState = {
     isTurn: true,
     score: [0, 0],
     lastMoveIndex: [],
+    sessionToken: '',
+    version: 0,
+    boardSize: parseInt($('#game-board').data('size')) || 15,
 };
 
 const state = initialState;
@@ -56,7 +59,34 @@ const removeColorOfLastMove = () =>{
     $(`#cell-${state.lastMoveIndex[0]}-${state.lastMoveIndex[1]}`).removeClass('latest-index');
 };
 
+// Rebuild the board grid for another size (rooms can be 15x15 up to 19x19)
+const renderBoard = (size) =>{
+    if(size === state.boardSize){
+        return;
+    }
+    state.boardSize = size;
+    const background = [];
+    for(let row = 0; row < size - 1; row++){
+        background.push(`<div class="table-row d-flex" id="${row}">${'<div class="border background-board-cell"></div>'.repeat(size - 1)}</div>`);
+    }
+    $('#play-board').html(background.join(''));
+    const cells = [];
+    for(let row = 0; row < size; row++){
+        const rowCells = [];
+        for(let col = 0; col < size; col++){
+            rowCells.push(`<div class="table-cell node" id="cell-${row}-${col}" ></div>`);
+        }
+        cells.push(`<div class="table-row d-flex" id="${row}">${rowCells.join('')}</div>`);
+    }
+    $('#game-board').html(cells.join(''));
+};
+
+$('#start-form input[name=board-size]').on('change', ()=>{
+    renderBoard(parseInt($('#start-form input[name=board-size]:checked').val()));
+});
+
 const resetBoard =() =>{
+    clearHint();
     for(let node of $('.winning-index')){
         node.removeChild(node.firstChild);
     };
@@ -89,10 +119,11 @@ $('#start-form').submit( (event) =>{
     }
     else{
         // Create new game
-        state.gameID = parseInt($('#game-id').text())
-        state.playerIndex = 1;
-
-        initGame();
+        gameIdRequest.then((gameID) =>{
+            state.gameID = gameID;
+            state.playerIndex = 1;
+            initGame();
+        });
     }
 });
 
@@ -189,8 +220,13 @@ const gameOver = (data) =>{
     }
 };
 
+const clearHint = () =>{
+    $('.hint-index').removeClass('hint-index');
+};
+
 const updateBoard = (moveIndex)=>{
     removeColorOfLastMove();
+    clearHint();
 
     if (!(moveIndex[0] === state.lastMoveIndex[0]
             && moveIndex[1] === state.lastMoveIndex[1])){
@@ -205,6 +241,33 @@ const updateBoard = (moveIndex)=>{
     }
 };
 
+const placeStone = (row, col, isMine)=>{
+    const cellID = `#cell-${row}-${col}`;
+    $(cellID).removeClass('node');
+    $(cellID).addClass(isMine ? 'my-node' : 'opponent-node');
+};
+
+// Apply a snapshot or delta received on the 'sync' event
+const applySync = (data)=>{
+    if(data.type === 'snapshot'){
+        renderBoard(data.rows);
+        resetBoard();
+        let player = data.first_player;
+        for(let index of data.moves){
+            placeStone(Math.floor(index / data.cols), index % data.cols, player === state.playerIndex);
+            player = 3 - player;
+        }
+        state.isTurn = !data.game_over && data.current_turn === state.playerIndex;
+    }
+    else {
+        for(let [row, col, player] of data.cells){
+            placeStone(row, col, player === state.playerIndex);
+        }
+    }
+    state.version = data.version;
+    updateTurnStatus();
+};
+
 const updateTurnStatus = ()=>{
     if(state.isTurn) {
         document.getElementById('turn-status').childNodes[1].textContent= 'Your Turn';
@@ -287,6 +350,8 @@ const initPvPGame = (data) =>{
 
 const startGame = ()=>{
     addGameBoardHandler();
+    // Hints are only served in single-player games
+    $('#hint-btn').toggleClass('hidden', state.gameType !== GAME_TYPE_SINGLE);
     hideGreetingCard();
 }
 
@@ -315,6 +380,7 @@ const initGame= ()=>{
         gameID: state.gameID,
         gameType: state.gameType,
         playerName: state.playerName,
+        boardSize: state.boardSize,
     }
     socket.emit('init_game', data);
     
@@ -354,6 +420,12 @@ const acceptRematch =   () =>{
     socket.emit('rematch', data);
 }
 
+const requestHint = () =>{
+    if(state.isTurn){
+        socket.emit('hint', {gameID: state.gameID});
+    }
+};
+
 /*
  * Socket IO messages handler
  * Handle all incoming messages from socketIO
@@ -361,6 +433,9 @@ const acceptRematch =   () =>{
 
 socket.on('start_game', (data) =>{
     if(data.status === 'success'){
+        if(data.rows){
+            renderBoard(data.rows);
+        }
         if(state.gameType === GAME_TYPE_SINGLE){
             initSinglePlayerGame();
         }
@@ -373,6 +448,9 @@ socket.on('start_game', (data) =>{
 
 
 socket.on('move', function (data) {
+    if(data.version){
+        state.version = data.version;
+    }
     if(!state.your_turn && data.status === 'success'){
         updateBoard(data.move_index);
         state.isTurn = !state.isTurn;
@@ -384,6 +462,9 @@ socket.on('move', function (data) {
 });
 
 socket.on('rematch', (data) =>{
+    if(data.version){
+        state.version = data.version;
+    }
     $('#game-over-banner').addClass('hidden');
     const command = data.command;
     if (state.gameType === GAME_TYPE_SINGLE){
@@ -431,9 +512,54 @@ socket.on('rematch', (data) =>{
 });
 
 socket.on('end_game', (data)=>{
+    state.sessionToken = '';
     endGame();
 });
 
+// Session resume: keep the seat when the connection drops for a moment
+socket.on('session', (data)=>{
+    state.sessionToken = data.token;
+});
+
+socket.on('connect', ()=>{
+    if(state.sessionToken){
+        socket.emit('resume_session', {token: state.sessionToken, version: state.version});
+    }
+});
+
+socket.on('resume', (data)=>{
+    state.gameID = data.game_id;
+    state.playerIndex = data.player_index;
+    hideGreetingCard();
+});
+
+socket.on('hint', (data)=>{
+    if(data.status === 'success'){
+        // Stale hints are dropped by the server; this only skips one landing after our own move
+        if(state.isTurn && data.move_index){
+            clearHint();
+            $(`#cell-${data.move_index[0]}-${data.move_index[1]}`).addClass('hint-index');
+        }
+        return;
+    }
+    $('#hint-btn').prop('disabled', true).attr('title', data.error_msg);
+    setTimeout(() => {
+        $('#hint-btn').prop('disabled', false).attr('title', 'Suggest a move');
+    }, Math.max(data.retry_after || 0, 1) * 1000);
+});
+
+socket.on('sync', (data)=>{
+    applySync(data);
+});
+
+socket.on('player_suspended', (data)=>{
+    displayLoadingCard('Your friend lost connection');
+});
+
+socket.on('player_resumed', (data)=>{
+    hideGreetingCard();
+});
+
 socket.on('error', (data)=>{
     const markup = `
         <div class=" greeting-wrapper p-3 w-100">
@@ -452,10 +578,22 @@ socket.on('error', (data)=>{
 socket.on("connect_error", () => {
 });
 
+// The page is cached and shared, so the proposed room ID is fetched separately
+const fetchGameId = () =>{
+    return fetch('/api/game-id')
+        .then((response) => response.json())
+        .then((data) =>{
+            $('#game-id').text(data.game_id);
+            return data.game_id;
+        });
+};
+
+let gameIdRequest;
+
 const init= () =>{
     showGreetingCard();
     $('#game-over-banner').addClass('hidden');
-
+    gameIdRequest = fetchGameId();
 };
 
 // Copy game ID to clipboard
@@ -0,0 +1,36 @@
+"""
+MiniMax root decisions: immediate wins and forced blocks
+
+Usage:
+    python -m pytest tests
+"""
+
+import numpy as np
+
+from config import settings
+from game.analysis import search_position
+from game.minimax import WIN_SCORE, MiniMax
+
+
+def board_with(human, ai) -> np.ndarray:
+    board = np.zeros((settings.number_of_row, settings.number_of_col), dtype=int)
+    for cell in human:
+        board[cell] = 1
+    for cell in ai:
+        board[cell] = 2
+    return board
+
+
+def test_immediate_win_scores_as_win():
+    board = board_with(human=[(0, 0), (0, 2), (0, 4), (0, 6)], ai=[(7, 3), (7, 4), (7, 5), (7, 6)])
+    solver = MiniMax(board)
+    assert solver.calculate_next_move(None) in [(7, 2), (7, 7)]
+    assert solver.last_score == WIN_SCORE
+
+
+def test_forced_block_is_not_scored_as_win():
+    # The human's four is closed at (7, 2): the AI has to block at (7, 7) and the game goes on
+    board = board_with(human=[(7, 3), (7, 4), (7, 5), (7, 6)], ai=[(7, 2), (8, 4), (6, 5)])
+    result = search_position(board, settings.ai_search_depth, settings.ai_beam_width)
+    assert result['move'] == (7, 7)
+    assert abs(result['score']) < WIN_SCORE // 2